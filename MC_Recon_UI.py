@@ -1,407 +1,89 @@
 import sys
 import os
-import pandas as pd
-import numpy as np
-import re
 import logging
+import multiprocessing
 from datetime import datetime
-from openpyxl import Workbook
-from openpyxl.styles import Alignment, Font, PatternFill, Border, Side, Color
-from openpyxl.utils import get_column_letter
-from openpyxl.worksheet.page import PageMargins, PrintPageSetup
-from openpyxl.worksheet.properties import PageSetupProperties
+
+# 启动计时从这里开始；pandas、numpy、openpyxl等数据处理模块不在启动时导入，
+# 窗口显示后在后台线程中预热导入
+from startup_timing import StartupTimer
+STARTUP = StartupTimer()
+
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-                             QLabel, QPushButton, QTextEdit, QProgressBar, QFrame,
-                             QFileDialog, QMessageBox, QListWidget, QListWidgetItem)
+                             QLabel, QPushButton, QProgressBar, QFrame,
+                             QFileDialog, QMessageBox, QListWidget, QListWidgetItem, QCheckBox)
 from PyQt5.QtCore import Qt, QThread, pyqtSignal, QTimer, QRect
 from PyQt5.QtGui import QFont, QPalette, QColor, QIcon
 from PyQt5.QtWidgets import QDesktopWidget
+STARTUP.mark('qt_imported')
+
+from log_panel import LogPanel
+from progress import format_progress
+from log_setup import get_log_manager, setup_logging
+from worker_process import WorkerProcess, WorkerUnavailableError, process_job
 
 class DataProcessThread(QThread):
-    progress_signal = pyqtSignal(str)
+    # 结构化进度事件（阶段、已完成数、总数、剩余时间），已在处理线程中限速
+    progress_event_signal = pyqtSignal(dict)
     finished_signal = pyqtSignal(bool, str)
     
-    def __init__(self, input_files):
+    def __init__(self, input_files, parse_workers=None, render_workers=None, use_parse_cache=True,
+                 force_rebuild=False, worker=None):
         super().__init__()
         self.input_files = input_files
-
-    def format_mixed_text(self, text):
-        if pd.isna(text):
-            return text
-        text = str(text)
-        chinese_pattern = re.compile('[\u4e00-\u9fff]')
-        match = chinese_pattern.search(text)
-        if match:
-            english_part = text[:match.start()].strip()
-            chinese_part = text[match.start():].strip()
-            if english_part and chinese_part:
-                return f'{english_part}\n{chinese_part}'
-        return text
+        # 解析和生成对账单的进程数，None表示自动选择，1表示串行处理
+        self.parse_workers = parse_workers
+        self.render_workers = render_workers
+        # 是否使用按文件内容缓存的解析结果
+        self.use_parse_cache = use_parse_cache
+        # 是否忽略输出清单，重新生成所有供应商的对账单
+        self.force_rebuild = force_rebuild
+        # 常驻的后台处理进程（WorkerProcess），为None或不可用时在本线程中处理
+        self.worker = worker
+        # 各阶段耗时、吞吐量和峰值内存的摘要，处理完成后填充
+        self.stage_summary = []
 
     def run(self):
-        try:
-            # 创建日志目录
-            if not os.path.exists('logs'):
-                os.makedirs('logs')
-            
-            # 配置日志
-            log_filename = os.path.join('logs', f'process_{datetime.now().strftime("%Y%m%d_%H%M%S")}.log')
-            logging.basicConfig(
-                level=logging.INFO,
-                format='%(asctime)s - %(levelname)s - %(message)s',
-                handlers=[
-                    logging.FileHandler(log_filename, encoding='utf-8'),
-                    logging.StreamHandler()
-                ]
-            )
-            
-            all_final_data = []
-            
-            for input_file in self.input_files:
-                self.progress_signal.emit(f'开始读取文件：{os.path.basename(input_file)}')
-                logging.info(f'开始读取文件：{input_file}')
-                
-                # 读取原始文件
-                df = pd.read_excel(input_file, skiprows=8)
-                logging.info(f'文件读取完成，共{len(df)}行数据')
-                self.progress_signal.emit(f'文件读取完成，共{len(df)}行数据')
-                
-                # 获取收货单号的行索引
-                receipt_rows = df[df['Unnamed: 0'].astype(str).str.match(r'^(RTS)?000\d+$', na=False)].index
-                
-                # 创建一个空的列表来存储所有明细数据
-                all_details = []
-                
-                # 遍历每个收货单号之间的行
-                total_receipts = len(receipt_rows)
-                for i in range(total_receipts):
-                    start_idx = receipt_rows[i]
-                    end_idx = receipt_rows[i+1] if i < len(receipt_rows)-1 else len(df)
-                    
-                    receipt = df.loc[start_idx, 'Unnamed: 0']
-                    supplier = df.loc[start_idx, 'Unnamed: 3']
-                    date = df.loc[start_idx, 'Unnamed: 25']
-                    
-                    # 清理供应商名称和日期中的发票信息
-                    if pd.notna(supplier):
-                        supplier = re.sub(r'[（(].*[)）]|（专票.*|（普票.*|\s+专票.*|\s+普票.*|\d+%$', '', str(supplier)).strip()
-                    
-                    if pd.notna(date):
-                        date = pd.to_datetime(date).strftime('%Y-%m-%d')
-                    
-                    # 获取明细行（跳过收货单号行）
-                    details = df.loc[start_idx+1:end_idx-1].copy()
-                    
-                    # 只保留非空行且不包含Page和Delivery Date的行
-                    details = details[details['Unnamed: 0'].notna()]
-                    details = details[~details['Unnamed: 0'].astype(str).str.contains('Page|Delivery Date', na=False)]
-                    
-                    if not details.empty:
-                        details['收货单号'] = receipt
-                        details['供应商名称'] = supplier
-                        details['收货日期'] = date
-                        details['商品名称'] = details['Unnamed: 0'].apply(self.format_mixed_text)
-                        details['实收数量'] = details['Unnamed: 9']
-                        details['基本单位'] = details['Unnamed: 11']
-                        details['单价'] = details['Unnamed: 15']
-                        details['小计金额'] = details['Unnamed: 27']
-                        details['税额'] = details['Unnamed: 32']
-                        details['税率'] = details['Unnamed: 32'] / details['Unnamed: 27']
-                        details['小计价税'] = details['Unnamed: 37']
-                        details['部门'] = details['Unnamed: 39'].apply(self.format_mixed_text)
-                        
-                        all_details.append(details[['收货单号', '收货日期', '商品名称', '实收数量', '基本单位',
-                                                   '单价', '小计金额', '税额', '税率', '小计价税', '部门', '供应商名称']])
-                    
-                    progress = f'处理进度：{i+1}/{total_receipts}'
-                    self.progress_signal.emit(progress)
-                    logging.info(progress)
-                
-                # 合并所有明细数据
-                if all_details:
-                    file_df = pd.concat(all_details, ignore_index=True)
-                    all_final_data.append(file_df)
-                    logging.info(f'文件处理完成，共整理{len(file_df)}条记录')
-                    self.progress_signal.emit(f'文件处理完成，共整理{len(file_df)}条记录')
-            
-            # 合并所有文件的数据
-            final_df = pd.concat(all_final_data, ignore_index=True)
-            logging.info(f'所有文件处理完成，共整理{len(final_df)}条记录')
-            self.progress_signal.emit(f'所有文件处理完成，共整理{len(final_df)}条记录')
-            
-            # 创建供应商对账明细表文件夹
-            if not os.path.exists('供应商对账明细'):
-                os.makedirs('供应商对账明细')
-                logging.info('创建供应商对账明细文件夹')
-            
-            # 按供应商名称分组并生成对账明细表
-            total_suppliers = len(final_df['供应商名称'].unique())
-            current_supplier = 0
-            
-            for supplier_name, supplier_data in final_df.groupby('供应商名称'):
-                if pd.notna(supplier_name) and supplier_name.strip():
-                    current_supplier += 1
-                    self.progress_signal.emit(f'正在生成供应商对账单 ({current_supplier}/{total_suppliers}): {supplier_name}')
-                    
-                    # 按收货日期和收货单号排序
-                    supplier_data = supplier_data.sort_values(['收货日期', '收货单号'])
-                    
-                    # 获取年月信息
-                    first_date = pd.to_datetime(supplier_data['收货日期'].iloc[0])
-                    year_month = first_date.strftime('%Y%m')
-                    
-                    # 创建年月目录
-                    year_month_dir = os.path.join('供应商对账明细', year_month)
-                    if not os.path.exists(year_month_dir):
-                        os.makedirs(year_month_dir)
-                    
-                    # 计算合计金额
-                    total_amount = supplier_data['小计价税'].sum()
-                    
-                    # 创建一个包含合计行的新数据框
-                    summary_row = pd.DataFrame([{
-                        '收货单号': '合计',
-                        '收货日期': '',
-                        '商品名称': '',
-                        '实收数量': '',
-                        '基本单位': '',
-                        '单价': '',
-                        '小计金额': supplier_data['小计金额'].sum(),
-                        '税额': supplier_data['税额'].sum(),
-                        '税率': '',
-                        '小计价税': total_amount,
-                        '部门': '',
-                        '供应商名称': ''
-                    }])
-                    
-                    supplier_data_with_summary = pd.concat([supplier_data, summary_row], ignore_index=True)
-                    
-                    # 创建新的Excel工作簿
-                    wb = Workbook()
-                    ws = wb.active
-                    
-                    # 设置页面布局
-                    ws.page_setup.orientation = ws.ORIENTATION_PORTRAIT
-                    ws.page_setup.paperSize = ws.PAPERSIZE_A4
-                    ws.page_setup.fitToPage = True
-                    ws.page_setup.fitToHeight = 0
-                    ws.page_setup.fitToWidth = 1
-                    ws.print_options.horizontalCentered = True
-                    ws.print_options.verticalCentered = False
-                    # 设置页脚文本、字体和大小
-                    ws.oddFooter.center.text = '\n第 &P 页，共 &N 页\nSofitel Sanya Leeman Resort'
-                    ws.oddFooter.center.size = 11
-                    ws.oddFooter.center.font = '微软雅黑'
+        # 每次处理单独的日志文件，日志写入由后台线程完成
+        with get_log_manager().run('process') as run_log:
+            success, error_msg = self._process(run_log)
+        self.finished_signal.emit(success, error_msg)
 
-                    
-                    # 设置页边距（单位：厘米）
-                    ws.page_margins = PageMargins(left=0.31, right=0.31, top=0.31, bottom=0.39, header=0.31, footer=0.11)
-                    
-                    # 设置列宽
-                    column_widths = {
-                        '收货单号': 15,
-                        '收货日期': 15,
-                        '商品名称': 45,
-                        '实收数量': 10,
-                        '基本单位': 13,
-                        '单价': 12,
-                        '小计金额': 12,
-                        '税额': 12,
-                        '税率': 10,
-                        '小计价税': 12,
-                        '部门': 35,
-                        '供应商名称': 36
-                    }
-                    
-                    # 设置酒店名称标题
-                    hotel_title_row = 1
-                    ws.merge_cells(start_row=hotel_title_row, start_column=1, end_row=hotel_title_row, end_column=len(column_widths))
-                    hotel_title_cell = ws.cell(row=hotel_title_row, column=1, value='对账明细表')
-                    hotel_title_cell.font = Font(name='微软雅黑', size=16, bold=True, color='FFFFFF')
-                    hotel_title_cell.fill = PatternFill(start_color='1F497D', end_color='1F497D', fill_type='solid')
-                    hotel_title_cell.alignment = Alignment(horizontal='center', vertical='center')
-                    ws.row_dimensions[hotel_title_row].height = 60
-                    
-                    # 设置对账明细表标题
-                    title_row = 2
-                    ws.merge_cells(start_row=title_row, start_column=1, end_row=title_row, end_column=len(column_widths))
-                    title_cell = ws.cell(row=title_row, column=1, value='')
-                    title_cell.font = Font(name='微软雅黑', size=20, bold=True, color='FFFFFF')
-                    title_cell.fill = PatternFill(start_color='1F497D', end_color='1F497D', fill_type='solid')
-                    title_cell.alignment = Alignment(horizontal='center', vertical='center')
-                    ws.row_dimensions[title_row].height = 10
-                    
-                    # 设置表头样式
-                    header_font = Font(name='微软雅黑', size=13, bold=True, color='FFFFFF')
-                    cell_font = Font(name='微软雅黑', size=13)
-                    
-                    # 设置对齐方式
-                    center_alignment = Alignment(horizontal='center', vertical='center')
-                    right_alignment = Alignment(horizontal='right', vertical='center', shrink_to_fit=False)
-                    wrap_alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
-                    
-                    # 设置边框样式
-                    thin_border = Border(
-                        left=Side(style='hair', color='D3D3D3'),
-                        right=Side(style='hair', color='D3D3D3'),
-                        top=Side(style='hair', color='D3D3D3'),
-                        bottom=Side(style='hair', color='D3D3D3')
-                    )
-                    thick_border = Border(
-                        left=Side(style='thin', color='1F497D'),
-                        right=Side(style='thin', color='1F497D'),
-                        top=Side(style='thin', color='1F497D'),
-                        bottom=Side(style='thin', color='1F497D')
-                    )
-
-                    # 写入表头
-                    headers = list(supplier_data.columns)
-                    header_row = 3
-                    for col, header in enumerate(headers, 1):
-                        cell = ws.cell(row=header_row, column=col, value=header)
-                        cell.font = header_font
-                        cell.alignment = center_alignment
-                        cell.fill = PatternFill(start_color='1F497D', end_color='1F497D', fill_type='solid')
-                        cell.border = thick_border
-                        ws.column_dimensions[get_column_letter(col)].width = column_widths[header]
-
-                    # 写入数据
-                    for row_idx, row in enumerate(supplier_data.values, header_row + 1):
-                        # 设置行高为40
-                        ws.row_dimensions[row_idx].height = 40
-                        
-                        # 检查是否为负数金额行
-                        has_negative = False
-                        for col_idx, value in enumerate(row, 1):
-                            if headers[col_idx-1] in ['小计金额', '税额', '小计价税'] and pd.notna(value) and float(value) < 0:
-                                has_negative = True
-                                break
-                        
-                        # 设置斑马线效果（偶数行）
-                        if row_idx % 2 == 0 and not has_negative:
-                            row_fill = PatternFill(start_color='F5F5F5', end_color='F5F5F5', fill_type='solid')
-                        else:
-                            row_fill = None
-                        
-                        # 写入单元格数据
-                        for col_idx, value in enumerate(row, 1):
-                            cell = ws.cell(row=row_idx, column=col_idx, value=value)
-                            cell.font = cell_font
-                            cell.border = thin_border
-                            
-                            # 如果是负数金额行，整行设置黄色背景
-                            if has_negative:
-                                cell.fill = PatternFill(start_color='FFFF00', end_color='FFFF00', fill_type='solid')
-                                if headers[col_idx-1] in ['小计金额', '税额', '小计价税'] and pd.notna(value) and float(value) < 0:
-                                    cell.font = Font(name='微软雅黑', size=11, color='FF0000')
-                            elif row_fill:
-                                cell.fill = row_fill
-                            
-                            # 设置数字列的对齐方式和格式
-                            if headers[col_idx-1] in ['商品名称', '部门']:
-                                cell.alignment = wrap_alignment
-                            elif headers[col_idx-1] in ['实收数量', '单价', '小计金额', '税额', '小计价税']:
-                                cell.alignment = right_alignment
-                                if pd.notna(value) and str(value).strip():
-                                    if headers[col_idx-1] in ['税额', '小计价税']:
-                                        cell.number_format = '#,##0.0000'
-                                    else:
-                                        cell.number_format = '#,##0.00'
-                            elif headers[col_idx-1] == '税率':
-                                cell.alignment = right_alignment
-                                if pd.notna(value) and str(value).strip():
-                                    cell.number_format = '0%'
-                            else:
-                                cell.alignment = center_alignment
-                    
-                    # 写入合计行
-                    row_idx = len(supplier_data) + header_row + 1
-                    for col_idx, value in enumerate(summary_row.iloc[0], 1):
-                        cell = ws.cell(row=row_idx, column=col_idx, value=value)
-                        cell.font = Font(name='微软雅黑', size=11, bold=True, color='FFFFFF')
-                        cell.fill = PatternFill(start_color='1F497D', end_color='1F497D', fill_type='solid')
-                        cell.border = thick_border
-                        
-                        # 设置数字列的对齐方式和格式
-                        if headers[col_idx-1] in ['小计金额', '税额', '小计价税']:
-                            cell.alignment = right_alignment
-                            if pd.notna(value) and str(value).strip():
-                                if headers[col_idx-1] in ['税额', '小计价税']:
-                                    cell.number_format = '#,##0.0000'
-                                else:
-                                    cell.number_format = '#,##0.00'
-                        else:
-                            cell.alignment = center_alignment
-                    
-                    # 设置重复打印的行
-
-                    # 设置重复打印的行
-                    ws.print_title_rows = '1:3'
-                    
-                    # 保存文件
-                    output_file = os.path.join(year_month_dir, f'{supplier_name}_对账明细.xlsx')
-                    wb.save(output_file)
-                    logging.info(f'已生成供应商对账单：{output_file}')
-            
-            # 创建备份文件夹
-            if not os.path.exists('bak'):
-                os.makedirs('bak')
-                logging.info('创建备份文件夹')
-            
-            # 获取当前时间作为备份文件名
-            current_time = pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')
+    def _process(self, run_log):
+        try:
+            logging.info(f'输入文件：{"、".join(self.input_files)}')
             
-            # 备份数据
-            backup_file = os.path.join('bak', f'cleaned_receiving_journal_{current_time}.xlsx')
-            final_df.to_excel(backup_file, index=False)
-            logging.info(f'数据已备份至：{backup_file}')
+            # 处理流程与命令行版共用；后台进程中的日志带有本次的运行编号，转发回来后写入本次的日志文件
+            job = {
+                'input_files': self.input_files,
+                'options': {
+                    'parse_workers': self.parse_workers,
+                    'render_workers': self.render_workers,
+                    'use_parse_cache': self.use_parse_cache,
+                    'force_rebuild': self.force_rebuild,
+                },
+                'run_id': run_log.run_id,
+                'log_file': run_log.log_file,
+            }
+            result = None
+            if self.worker is not None and self.worker.available:
+                try:
+                    result = self.worker.run_job(job, progress=self.progress_event_signal.emit)
+                except WorkerUnavailableError as e:
+                    # 后台进程在任务发出前变为不可用，改为在本线程中处理
+                    logging.warning(f'{e}，改为在界面进程中处理')
+            if result is None:
+                result = process_job(job, progress=self.progress_event_signal.emit)
             
-            self.progress_signal.emit('处理完成！')
-            self.finished_signal.emit(True, '')
+            # 各阶段摘要在完成时显示
+            self.stage_summary = result['stage_summary']
+            logging.info('处理完成！')
+            return True, ''
             
         except Exception as e:
             error_msg = f'处理过程中出现错误：{str(e)}'
-            logging.error(error_msg)
-            self.progress_signal.emit(error_msg)
-            self.finished_signal.emit(False, error_msg)
-
-class QTextEditLogger(logging.Handler):
-    def __init__(self, widget):
-        super().__init__()
-        self.widget = widget
-        self.widget.setReadOnly(True)
-        self.widget.setFont(QFont('Helvetica', 16))  # 使用Helvetica字体
-        
-        # 设置样式
-        self.widget.setStyleSheet("""
-            QTextEdit {
-                background-color: #2b2b2b;
-                color: #ffffff;
-                border: 1px solid #3c3c3c;
-                border-radius: 5px;
-                padding: 5px;
-            }
-        """)
-        
-        # 创建定时器用于更新日志
-        self.update_timer = QTimer()
-        self.update_timer.timeout.connect(self.update_log)
-        self.update_timer.start(100)  # 每100ms更新一次
-        self.pending_messages = []
-
-    def emit(self, record):
-        msg = self.format(record)
-        self.pending_messages.append(msg)
-
-    def update_log(self):
-        if self.pending_messages:
-            for msg in self.pending_messages:
-                self.widget.append(msg)
-            self.pending_messages.clear()
-            # 滚动到底部
-            self.widget.verticalScrollBar().setValue(
-                self.widget.verticalScrollBar().maximum()
-            )
+            logging.exception(error_msg)
+            return False, error_msg
 
 # 程序版本信息
 VERSION = '1.1.16'
@@ -411,11 +93,27 @@ class MainWindow(QMainWindow):
         super().__init__()
         self.selected_files = []
         self.version = VERSION
+        # 常驻的后台处理进程，窗口显示后由startWorker启动
+        self.worker = None
         self.initUI()
         
         # 记录应用程序启动日志
         logging.info(f"应用程序启动，版本：{self.version}")
         
+    def startWorker(self):
+        """启动常驻的后台处理进程，数据处理模块在其中预先导入；启动失败时在界面进程中处理"""
+        STARTUP.version = self.version
+        try:
+            self.worker = WorkerProcess(on_ready=lambda info: STARTUP.finish_warmup(info['imports'])).start()
+        except Exception as e:
+            logging.warning(f'无法启动后台处理进程，将在界面进程中处理：{e}')
+            STARTUP.start_warmup(version=self.version)
+
+    def closeEvent(self, event):
+        if self.worker is not None:
+            self.worker.stop()
+        super().closeEvent(event)
+
     def centerOnScreen(self):
         """将窗口居中显示在屏幕上"""
         # 获取屏幕几何信息
@@ -569,6 +267,7 @@ class MainWindow(QMainWindow):
             }
         """)
         self.progress_bar.setTextVisible(False)
+        self.progress_bar.setRange(0, 100)
         
         self.process_button = QPushButton('开始处理')
         self.process_button.setStyleSheet("""
@@ -595,8 +294,12 @@ class MainWindow(QMainWindow):
         self.process_button.clicked.connect(self.startProcess)
         self.process_button.setEnabled(False)
         
+        # 强制重新生成：忽略输出清单，所有供应商的对账单都重新生成
+        self.force_rebuild_checkbox = QCheckBox('强制重新生成全部对账单')
+        
         progress_layout.addWidget(progress_label)
         progress_layout.addWidget(self.progress_bar)
+        progress_layout.addWidget(self.force_rebuild_checkbox)
         progress_layout.addWidget(self.process_button)
         progress_layout.addStretch()
         progress_frame.setLayout(progress_layout)
@@ -621,11 +324,12 @@ class MainWindow(QMainWindow):
         log_layout = QVBoxLayout()
         log_label = QLabel('处理日志')
         log_label.setProperty('title', 'true')
-        self.progress_text = QTextEdit()
-        self.progress_text.setReadOnly(True)
+        # 日志面板直接接收日志记录，可按级别筛选和搜索
+        self.log_panel = LogPanel()
+        logging.getLogger().addHandler(self.log_panel.handler)
         
         log_layout.addWidget(log_label)
-        log_layout.addWidget(self.progress_text)
+        log_layout.addWidget(self.log_panel)
         log_frame.setLayout(log_layout)
         
         # 添加所有部件到主布局（调整顺序，将日志放到下方）
@@ -665,7 +369,7 @@ class MainWindow(QMainWindow):
             QListWidget, QListWidget::item {
                 font-size: 16px;
             }
-            QTextEdit {
+            QPlainTextEdit, QComboBox, QLineEdit {
                 font-size: 16px;
             }
             QProgressBar {
@@ -753,40 +457,53 @@ class MainWindow(QMainWindow):
         self.process_button.setEnabled(False)
         self.select_button.setEnabled(False)
         self.clear_button.setEnabled(False)
-        self.progress_text.clear()
-        self.progress_bar.setRange(0, 0)  # 设置进度条为忙碌状态
+        self.force_rebuild_checkbox.setEnabled(False)
+        self.log_panel.clear()
+        self.progress_bar.setValue(0)
+        self.progress_bar.setFormat('准备中…')
+        self.progress_bar.setTextVisible(True)
         
         # 创建并启动处理线程
-        self.process_thread = DataProcessThread(self.selected_files)
-        self.process_thread.progress_signal.connect(self.updateProgress)
+        self.process_thread = DataProcessThread(self.selected_files,
+                                                force_rebuild=self.force_rebuild_checkbox.isChecked(),
+                                                worker=self.worker)
+        self.process_thread.progress_event_signal.connect(self.updateProgressBar)
         self.process_thread.finished_signal.connect(self.processFinished)
         self.process_thread.start()
     
-    def updateProgress(self, message):
-        self.progress_text.append(message)
-        # 滚动到底部
-        self.progress_text.verticalScrollBar().setValue(
-            self.progress_text.verticalScrollBar().maximum()
-        )
+    def updateProgressBar(self, event):
+        self.progress_bar.setValue(event['percent'])
+        text = format_progress(event)
+        if event['stage_count']:
+            text = f'第{event["stage_index"]}/{event["stage_count"]}步 {text}'
+        self.progress_bar.setFormat(text)
     
     def processFinished(self, success, error_msg):
-        self.progress_bar.setRange(0, 100)  # 恢复进度条正常状态
         self.progress_bar.setValue(100 if success else 0)
+        self.progress_bar.setTextVisible(False)
         self.process_button.setEnabled(True)
         self.select_button.setEnabled(True)
         self.clear_button.setEnabled(True)
+        self.force_rebuild_checkbox.setEnabled(True)
         
         if success:
             # 获取处理的统计信息
             supplier_dir = '供应商对账明细'
             year_month_dirs = [d for d in os.listdir(supplier_dir) if os.path.isdir(os.path.join(supplier_dir, d))]
             
+            # 各阶段耗时、吞吐量和峰值内存
+            stage_text = ''
+            if self.process_thread.stage_summary:
+                stage_text = '\n\n各阶段耗时:\n' + '\n'.join(f'- {line}' for line in self.process_thread.stage_summary)
+            
             if year_month_dirs:
                 latest_dir = max(year_month_dirs)  # 获取最新的年月目录
                 full_dir_path = os.path.join(supplier_dir, latest_dir)
                 supplier_files = [f for f in os.listdir(full_dir_path) if f.endswith('.xlsx') and not f.startswith('~$')]
                 
-                stats_message = f'数据处理完成！\n\n处理结果:\n- 生成了{len(supplier_files)}个供应商对账单\n- 保存在目录: {full_dir_path}\n\n是否打开输出文件夹？'
+                stats_message = f'数据处理完成！\n\n处理结果:\n- 生成了{len(supplier_files)}个供应商对账单\n- 保存在目录: {full_dir_path}{stage_text}\n\n是否打开输出文件夹？'
+            elif stage_text:
+                stats_message = f'数据处理完成！{stage_text}\n\n是否打开输出文件夹？'
             else:
                 stats_message = '数据处理完成！是否打开输出文件夹？'
             
@@ -867,18 +584,12 @@ def main():
         # 确保必要的目录存在
         ensure_directories()
         
-        # 配置日志
-        log_filename = os.path.join('logs', f'app_{datetime.now().strftime("%Y%m%d_%H%M%S")}.log')
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(log_filename, encoding='utf-8'),
-                logging.StreamHandler()
-            ]
-        )
+        # 配置日志：应用日志和控制台输出由后台线程写入
+        setup_logging(app_prefix='app', console=True)
+        STARTUP.mark('logging_ready')
         
         app = QApplication(sys.argv)
+        STARTUP.mark('app_created')
         # 导入资源文件并设置全局窗口图标
         import resources
         icon = QIcon(':/icons/app_icon')
@@ -905,6 +616,8 @@ def main():
         window = MainWindow()
         window.show()
         logging.info('应用程序启动成功')
+        # 事件循环开始、窗口绘制后再启动后台处理进程，进程预热导入完成后把启动耗时报告写入应用日志
+        QTimer.singleShot(0, lambda: (STARTUP.mark('window_shown'), window.startWorker()))
         sys.exit(app.exec_())
     except Exception as e:
         logging.error(f'应用程序启动失败: {e}')
@@ -916,4 +629,6 @@ def main():
         sys.exit(1)
 
 if __name__ == '__main__':
+    # 打包后的程序启动解析子进程时需要
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
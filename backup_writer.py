@@ -0,0 +1,150 @@
+import contextvars
+import itertools
+import logging
+import os
+import threading
+import time
+
+import pandas as pd
+
+# 清洗后数据的备份目录
+BACKUP_ROOT = 'bak'
+BACKUP_PREFIX = 'cleaned_receiving_journal_'
+
+# 备份格式 → 文件扩展名。csv.gz为gzip压缩的CSV（UTF-8带BOM，解压后可直接用Excel打开），
+# 写入速度比xlsx快一个数量级以上；需要直接打开的工作簿时可选xlsx
+BACKUP_FORMATS = {
+    'csv.gz': '.csv.gz',
+    'csv': '.csv',
+    'xlsx': '.xlsx',
+}
+DEFAULT_BACKUP_FORMAT = 'csv.gz'
+
+# 备份的保留期限和最多保留的份数
+DEFAULT_RETENTION_DAYS = 90
+DEFAULT_MAX_BACKUPS = 30
+
+
+def _reserve_backup_file(backup_root, current_time, extension):
+    """以独占方式创建空的备份文件占用文件名，同一秒内已有备份时依次加上序号"""
+    for sequence in itertools.count(1):
+        suffix = '' if sequence == 1 else f'_{sequence}'
+        backup_file = os.path.join(backup_root, f'{BACKUP_PREFIX}{current_time}{suffix}{extension}')
+        try:
+            with open(backup_file, 'x'):
+                return backup_file
+        except FileExistsError:
+            continue
+
+
+def write_backup(final_df, backup_root=BACKUP_ROOT, backup_format=DEFAULT_BACKUP_FORMAT):
+    """将清洗后的数据备份到备份目录，返回备份文件路径"""
+    if backup_format not in BACKUP_FORMATS:
+        raise ValueError(f'不支持的备份格式：{backup_format}')
+    # 创建备份文件夹
+    if not os.path.exists(backup_root):
+        os.makedirs(backup_root, exist_ok=True)
+        logging.info('创建备份文件夹')
+
+    # 获取当前时间作为备份文件名
+    current_time = pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')
+    extension = BACKUP_FORMATS[backup_format]
+    backup_file = _reserve_backup_file(backup_root, current_time, extension)
+
+    # 先写临时文件再重命名，中断时不会留下不完整的备份。临时文件以“.”开头，不会被其他运行的
+    # prune_backups当作备份删除；文件名含进程号和线程号，同时写入的备份互不影响
+    temp_file = os.path.join(backup_root, f'.{BACKUP_PREFIX}{current_time}.{os.getpid()}.{threading.get_ident()}'
+                                          f'.tmp{extension}')
+    try:
+        if backup_format == 'xlsx':
+            final_df.to_excel(temp_file, index=False)
+        else:
+            compression = {'method': 'gzip', 'compresslevel': 1} if backup_format == 'csv.gz' else None
+            final_df.to_csv(temp_file, index=False, encoding='utf-8-sig', compression=compression)
+        os.replace(temp_file, backup_file)
+    except BaseException:
+        # 写入失败时同时删除预留的空文件
+        if os.path.exists(backup_file) and not os.path.getsize(backup_file):
+            os.remove(backup_file)
+        raise
+    finally:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+    logging.info(f'数据已备份至：{backup_file}')
+    return backup_file
+
+
+def prune_backups(backup_root=BACKUP_ROOT, retention_days=DEFAULT_RETENTION_DAYS, max_backups=DEFAULT_MAX_BACKUPS,
+                  keep=()):
+    """删除超过保留天数的备份，并只保留最新的max_backups份，返回删除的文件数"""
+    if not os.path.isdir(backup_root):
+        return 0
+    keep = {os.path.abspath(path) for path in keep}
+    entries = []
+    for name in os.listdir(backup_root):
+        path = os.path.join(backup_root, name)
+        if name.startswith(BACKUP_PREFIX) and os.path.isfile(path) and os.path.abspath(path) not in keep:
+            entries.append((os.path.getmtime(path), path))
+
+    removed = 0
+    expire_before = time.time() - retention_days * 24 * 3600
+    # 最新的在前，保留的文件也占用名额
+    for index, (mtime, path) in enumerate(sorted(entries, reverse=True), len(keep)):
+        if mtime < expire_before or index >= max_backups:
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+    return removed
+
+
+class BackupWriter:
+    """
+    后台备份
+
+    start()后在后台线程中写入备份并清理过期的备份，与生成对账单同时进行；
+    wait()等待完成并返回备份文件路径，后台线程中的异常在wait()中重新抛出。
+    备份期间调用方不能修改final_df。
+    """
+
+    def __init__(self, final_df, backup_root=BACKUP_ROOT, backup_format=DEFAULT_BACKUP_FORMAT,
+                 retention_days=DEFAULT_RETENTION_DAYS, max_backups=DEFAULT_MAX_BACKUPS):
+        self.final_df = final_df
+        self.backup_root = backup_root
+        self.backup_format = backup_format
+        self.retention_days = retention_days
+        self.max_backups = max_backups
+        self.backup_file = None
+        self.seconds = None
+        self._error = None
+        self._thread = None
+
+    def start(self):
+        # 在当前上下文的副本中运行，后台线程的日志仍带有本次运行的编号
+        context = contextvars.copy_context()
+        self._thread = threading.Thread(target=context.run, args=(self._run,), name='backup-writer', daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        start = time.perf_counter()
+        try:
+            self.backup_file = write_backup(self.final_df, self.backup_root, self.backup_format)
+            removed = prune_backups(self.backup_root, self.retention_days, self.max_backups,
+                                    keep=[self.backup_file])
+            if removed:
+                logging.info(f'已清理{removed}个过期的备份文件')
+        except Exception as e:
+            self._error = e
+        finally:
+            self.seconds = time.perf_counter() - start
+
+    def wait(self):
+        """等待后台备份完成，返回备份文件路径"""
+        if self._thread is None:
+            self.start()
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+        return self.backup_file
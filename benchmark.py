@@ -0,0 +1,148 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from backup_writer import write_backup
+from journal_generator import generate_journal
+from journal_parser import segment_receipts
+from statement_grouping import group_suppliers
+from statement_writer import render_statements
+from supplier_names import SupplierNormalizer
+from text_formatter import MixedTextFormatter
+
+BENCH_RESULTS_FILE = 'bench_results.json'
+DEFAULT_SIZES = [1000, 10000, 100000]
+
+# 各阶段的显示名称，顺序即执行顺序
+BENCH_STAGES = {
+    'read': '读取Excel',
+    'segment': '切分收货单',
+    'normalize': '供应商名称规范化',
+    'group': '按供应商分组排序',
+    'render': '生成对账单',
+    'backup': '备份',
+}
+
+
+def _record(stages, name, start, rows, notify):
+    seconds = time.perf_counter() - start
+    stages[name] = {
+        'seconds': round(seconds, 4),
+        'rows': rows,
+        'rows_per_sec': round(rows / seconds, 1) if seconds > 0 else None,
+    }
+    notify(f'  {BENCH_STAGES[name]}：{seconds:.2f}秒（{rows}行）')
+
+
+def benchmark_journal(journal_file, work_dir, render_workers=1, notify=None):
+    """
+    分阶段计时处理一个收货流水文件
+
+    每个阶段单独计时，文本格式化和供应商名称都使用新的缓存，结果不受之前运行的影响。
+    对账单和备份写入work_dir，不使用输出清单。
+
+    Returns:
+        dict: 每个阶段的seconds、rows、rows_per_sec
+    """
+    notify = notify or (lambda message: None)
+    stages = {}
+
+    start = time.perf_counter()
+    raw_df = pd.read_excel(journal_file, skiprows=8)
+    _record(stages, 'read', start, len(raw_df), notify)
+
+    start = time.perf_counter()
+    final_df = segment_receipts(raw_df, formatter=MixedTextFormatter(), clean_supplier=None)
+    _record(stages, 'segment', start, len(raw_df), notify)
+
+    start = time.perf_counter()
+    normalizer = SupplierNormalizer(cache_file=os.path.join(work_dir, 'supplier_names.json'),
+                                    alias_file=os.path.join(work_dir, 'supplier_aliases.json'))
+    final_df['供应商名称'] = normalizer.normalize_series(final_df['供应商名称'])
+    _record(stages, 'normalize', start, len(final_df), notify)
+
+    start = time.perf_counter()
+    groups = group_suppliers(final_df)
+    _record(stages, 'group', start, len(final_df), notify)
+
+    start = time.perf_counter()
+    render_statements(final_df, os.path.join(work_dir, 'statements'), workers=render_workers,
+                      notify=lambda message: None, incremental=False, groups=groups)
+    _record(stages, 'render', start, len(final_df), notify)
+
+    start = time.perf_counter()
+    write_backup(final_df, os.path.join(work_dir, 'bak'))
+    _record(stages, 'backup', start, len(final_df), notify)
+
+    return stages
+
+
+def run_benchmarks(sizes, work_dir, render_workers=1, supplier_count=50, seed=0, notify=None):
+    """按不同的明细行数生成模拟流水并逐一计时，返回可序列化为JSON的结果"""
+    notify = notify or (lambda message: None)
+    runs = []
+    for size in sizes:
+        size_dir = os.path.join(work_dir, f'rows_{size}')
+        os.makedirs(size_dir, exist_ok=True)
+        journal_file = os.path.join(work_dir, f'journal_{size}.xlsx')
+        if not os.path.exists(journal_file):
+            notify(f'生成模拟流水：{size}行明细')
+            generate_journal(journal_file, size, supplier_count=supplier_count, seed=seed)
+
+        notify(f'开始计时：{size}行明细')
+        stages = benchmark_journal(journal_file, size_dir, render_workers=render_workers, notify=notify)
+        runs.append({
+            'detail_rows': size,
+            'file_bytes': os.path.getsize(journal_file),
+            'total_seconds': round(sum(stage['seconds'] for stage in stages.values()), 4),
+            'stages': stages,
+        })
+
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'render_workers': render_workers,
+        'supplier_count': supplier_count,
+        'seed': seed,
+        'runs': runs,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='MC对账明细工具性能基准：分阶段计时并输出JSON结果')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help=f'明细行数，可指定多个（默认：{" ".join(map(str, DEFAULT_SIZES))}）')
+    parser.add_argument('--suppliers', type=int, default=50, help='供应商数量（默认：50）')
+    parser.add_argument('--render-workers', type=int, default=1, help='生成对账单的进程数（默认：1）')
+    parser.add_argument('--seed', type=int, default=0, help='随机数种子（默认：0）')
+    parser.add_argument('--work-dir', default=None, help='模拟流水和输出的目录，指定后可重复使用已生成的流水（默认：临时目录）')
+    parser.add_argument('--output', default=BENCH_RESULTS_FILE, help=f'结果文件（默认：{BENCH_RESULTS_FILE}）')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    if args.work_dir:
+        os.makedirs(args.work_dir, exist_ok=True)
+        results = run_benchmarks(args.sizes, args.work_dir, args.render_workers, args.suppliers, args.seed, print)
+    else:
+        with tempfile.TemporaryDirectory(prefix='recon_bench_') as work_dir:
+            results = run_benchmarks(args.sizes, work_dir, args.render_workers, args.suppliers, args.seed, print)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f'结果已写入：{args.output}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
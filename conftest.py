@@ -0,0 +1,46 @@
+import pandas as pd
+import pytest
+
+from journal_parser import DETAIL_COLUMNS, categorize_columns
+from test_journal_parser import detail, make_journal
+
+# 测试脚本共用的夹具，提供示例收货流水文件和清洗后的明细
+
+
+def _write_journal(path):
+    df = make_journal([
+        {0: 'RTS0001', 3: '海南鲜果贸易有限公司（专票13%）', 25: '2025-07-01'},
+        detail('Apple 苹果', 2, 5.0, 'Kitchen 厨房'),
+        detail('Milk', -1, 8.0, 'Bar'),
+    ])
+    with pd.ExcelWriter(path) as writer:
+        pd.DataFrame([['前导行']] * 8).to_excel(writer, index=False, header=False)
+        df.to_excel(writer, index=False, startrow=8)
+
+
+@pytest.fixture
+def write_journal():
+    """返回写入示例收货流水文件的函数：一张收货单、两行明细，8行前导行"""
+    return _write_journal
+
+
+def _make_details(rows, columns=None):
+    records = []
+    for receipt, date, supplier, amount, *product in rows:
+        record = {'收货单号': receipt, '收货日期': date, '商品名称': product[0] if product else f'商品{len(records)}',
+                  '实收数量': 1.0, '基本单位': 'KG', '单价': amount, '小计金额': amount, '税额': amount * 0.1,
+                  '税率': 0.1, '小计价税': amount * 1.1, '部门': '厨房', '供应商名称': supplier}
+        record.update(columns or {})
+        records.append(record)
+    return categorize_columns(pd.DataFrame(records, columns=DETAIL_COLUMNS))
+
+
+@pytest.fixture
+def make_details():
+    """
+    返回构造清洗后明细的函数
+
+    每行为(收货单号, 收货日期, 供应商名称, 金额)，可以再加商品名称，未给出时按行号生成；
+    columns中的值覆盖其他列的默认值。
+    """
+    return _make_details
@@ -0,0 +1,149 @@
+import argparse
+import random
+from datetime import datetime, timedelta
+
+from openpyxl import Workbook
+
+# 原始流水的列数及各字段所在列（与 pd.read_excel(skiprows=8) 得到的 Unnamed: N 对应）
+COLUMN_COUNT = 41
+RECEIPT_COL = 0
+SUPPLIER_COL = 3
+QTY_COL = 9
+UNIT_COL = 11
+PRICE_COL = 15
+DATE_COL = 25
+AMOUNT_COL = 27
+TAX_COL = 32
+TOTAL_COL = 37
+DEPARTMENT_COL = 39
+
+SUPPLIER_NAMES = [
+    '海南鲜果贸易有限公司', '三亚海鲜批发', '绿色蔬菜配送中心', '三亚市椰林食品有限公司', 'Sanya Fresh Co.',
+    'Hainan Meat Supply', 'ABC Foods', '南国乳业', '天涯酒水贸易', 'Golden Bakery 金色烘焙',
+]
+# 供应商名称后的发票信息写法
+SUPPLIER_SUFFIXES = ['', '', '（专票13%）', '（专票9%）', '（普票）', ' 专票', ' 普票', '(海南)', ' 9%']
+
+PRODUCTS = [
+    ('Apple 苹果', 'KG', 12.5), ('Beef Tenderloin 牛柳', 'KG', 168.0), ('鸡蛋', 'BOX', 45.0),
+    ('Milk 牛奶', 'L', 16.8), ('Salmon Fillet 三文鱼柳', 'KG', 198.0), ('Mineral Water', 'BTL', 3.5),
+    ('Chicken Breast 鸡胸肉', 'KG', 32.0), ('大米', 'BAG', 120.0), ('Coffee Beans 咖啡豆', 'KG', 260.0),
+    ('Tomato 番茄', 'KG', 8.6), ('Red Wine 红酒', 'BTL', 180.0), ('Butter 黄油', 'KG', 88.0),
+]
+DEPARTMENTS = [
+    'Main Kitchen 中厨房', 'Western Kitchen 西厨房', 'Bar 酒吧', 'Pastry 饼房', 'Housekeeping 管家部',
+    'Engineering 工程部', '员工餐厅',
+]
+TAX_RATES = [0.13, 0.09, 0.06, 0.0]
+
+PREAMBLE = [
+    'Sofitel Sanya Leeman Resort',
+    'Receiving Journal',
+    'Store: Main Store',
+    'Printed By: SYSTEM',
+    'Sort By: Receiving No.',
+    '',
+    'Receiving No.    Supplier    Delivery Date',
+    'Item Description    Qty    Unit    Price    Amount    Tax    Total    Department',
+]
+
+# 每页的行数，之后插入分页噪声行
+ROWS_PER_PAGE = 45
+
+
+def _row(values):
+    row = [None] * COLUMN_COUNT
+    for col, value in values.items():
+        row[col] = value
+    return row
+
+
+def iter_journal_rows(detail_rows, supplier_count=50, months=1, negative_ratio=0.03, seed=0,
+                      start_date=datetime(2025, 7, 1)):
+    """
+    按原始收货流水的版式逐行生成数据（不含前8行表头）
+
+    Args:
+        detail_rows: 明细行数
+        supplier_count: 供应商数量
+        months: 收货日期跨越的月数
+        negative_ratio: 退货（负数金额）行的比例
+        seed: 随机数种子，相同参数生成相同的数据
+        start_date: 第一天收货日期
+    """
+    rnd = random.Random(seed)
+    suppliers = []
+    for i in range(supplier_count):
+        base = SUPPLIER_NAMES[i % len(SUPPLIER_NAMES)]
+        if i >= len(SUPPLIER_NAMES):
+            base = f'{base}{i // len(SUPPLIER_NAMES) + 1}号店'
+        suppliers.append(base)
+    days = max(1, months * 30)
+
+    # 第9行作为pandas读取时的表头，除第2列外均为空，其余列名为 Unnamed: N
+    yield _row({1: 'Receiving Journal Detail'})
+    # 首个收货单之前的列标题行
+    yield _row({RECEIPT_COL: 'Receiving No.', SUPPLIER_COL: 'Supplier', DATE_COL: 'Delivery Date'})
+
+    written = 0
+    line_count = 2
+    page = 1
+    receipt_no = 1000
+    while written < detail_rows:
+        receipt_no += 1
+        prefix = 'RTS' if rnd.random() < 0.6 else ''
+        supplier = rnd.choice(suppliers) + rnd.choice(SUPPLIER_SUFFIXES)
+        receipt_date = start_date + timedelta(days=rnd.randrange(days))
+        yield _row({RECEIPT_COL: f'{prefix}000{receipt_no}', SUPPLIER_COL: supplier, DATE_COL: receipt_date})
+        line_count += 1
+
+        for _ in range(min(rnd.randint(1, 12), detail_rows - written)):
+            name, unit, base_price = rnd.choice(PRODUCTS)
+            qty = rnd.randint(1, 50)
+            if rnd.random() < negative_ratio:
+                qty = -qty
+            price = round(base_price * rnd.uniform(0.8, 1.2), 2)
+            amount = round(qty * price, 2)
+            tax = round(amount * rnd.choice(TAX_RATES), 4)
+            yield _row({
+                RECEIPT_COL: name, QTY_COL: qty, UNIT_COL: unit, PRICE_COL: price, AMOUNT_COL: amount,
+                TAX_COL: tax, TOTAL_COL: round(amount + tax, 4), DEPARTMENT_COL: rnd.choice(DEPARTMENTS),
+            })
+            written += 1
+            line_count += 1
+
+            # 分页：空行、页码行和重复的列标题行
+            if line_count >= ROWS_PER_PAGE:
+                page += 1
+                line_count = 0
+                yield _row({})
+                yield _row({RECEIPT_COL: f'Page {page}'})
+                yield _row({RECEIPT_COL: 'Delivery Date', DATE_COL: 'Delivery Date'})
+
+
+def generate_journal(path, detail_rows=1000, supplier_count=50, months=1, negative_ratio=0.03, seed=0):
+    """生成与ERP导出版式一致的收货流水工作簿，返回文件路径"""
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('Receiving Journal')
+    for text in PREAMBLE:
+        ws.append([text or None])
+    for row in iter_journal_rows(detail_rows, supplier_count, months, negative_ratio, seed):
+        ws.append(row)
+    wb.save(path)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='生成模拟的收货流水工作簿')
+    parser.add_argument('output', help='输出文件（.xlsx）')
+    parser.add_argument('--rows', type=int, default=1000, help='明细行数（默认：1000）')
+    parser.add_argument('--suppliers', type=int, default=50, help='供应商数量（默认：50）')
+    parser.add_argument('--months', type=int, default=1, help='收货日期跨越的月数（默认：1）')
+    parser.add_argument('--seed', type=int, default=0, help='随机数种子（默认：0）')
+    args = parser.parse_args(argv)
+    generate_journal(args.output, args.rows, args.suppliers, args.months, seed=args.seed)
+    print(f'已生成：{args.output}（{args.rows}行明细）')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,444 @@
+import logging
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pandas as pd
+
+from log_setup import current_run_id, drain_log_queue, forward_logs, log_context
+from run_metrics import measure
+from supplier_names import clean_supplier_name
+from text_formatter import mixed_text_formatter
+
+# 对账明细表的列顺序
+DETAIL_COLUMNS = ['收货单号', '收货日期', '商品名称', '实收数量', '基本单位',
+                  '单价', '小计金额', '税额', '税率', '小计价税', '部门', '供应商名称']
+
+# 解析器版本，切分或格式化规则变化时需要增加，使旧的解析缓存失效
+PARSER_VERSION = 3
+
+# 原始流水中用到的列：列号 → 类型，其余列不读取
+# text：原样保留；float：数值；datetime：日期；category：取值较少的文本
+JOURNAL_COLUMNS = {
+    0: 'text',       # 收货单号 / 商品名称
+    3: 'category',   # 供应商名称
+    9: 'float',      # 实收数量
+    11: 'category',  # 基本单位
+    15: 'float',     # 单价
+    25: 'datetime',  # 收货日期
+    27: 'float',     # 小计金额
+    32: 'float',     # 税额
+    37: 'float',     # 小计价税
+    39: 'category',  # 部门
+}
+
+# 前8行报表表头加1行列标题
+JOURNAL_SKIP_ROWS = 9
+
+# 默认版式中各字段所在的列号。原始数据始终以这些列号命名（Unnamed: N），
+# 列布局变化时由layout_sniffer识别实际列号，读取后仍使用默认列名
+JOURNAL_FIELDS = {
+    'receipt': 0,      # 收货单号 / 商品名称
+    'supplier': 3,     # 供应商名称
+    'qty': 9,          # 实收数量
+    'unit': 11,        # 基本单位
+    'price': 15,       # 单价
+    'date': 25,        # 收货日期
+    'amount': 27,      # 小计金额
+    'tax': 32,         # 税额
+    'total': 37,       # 小计价税
+    'department': 39,  # 部门
+}
+
+# 明细中以分类类型保存的列
+CATEGORY_COLUMNS = ['基本单位', '部门', '供应商名称']
+
+# 收货单号行及分页噪声行的匹配规则
+RECEIPT_PATTERN = r'^(RTS)?000\d+$'
+NOISE_PATTERN = 'Page|Delivery Date'
+
+# 每个解析进程至少分到的文件大小，文件较小时进程启动开销得不偿失，
+# 而且串行解析可以复用本进程中的文本格式化缓存
+MIN_BYTES_PER_PARSE_WORKER = 4 * 1024 * 1024
+
+
+def format_receipt_date(date):
+    """将收货日期统一为 YYYY-MM-DD 字符串"""
+    if pd.isna(date):
+        return date
+    return pd.to_datetime(date).strftime('%Y-%m-%d')
+
+
+def _coerce_datetime(series):
+    """转换为日期类型，每个不同的值只解析一次，无法识别的值（如分页噪声文字）为NaT"""
+    codes, uniques = pd.factorize(series)
+    parsed = pd.to_datetime([pd.to_datetime(value, errors='coerce') for value in uniques] + [pd.NaT])
+    return pd.Series(parsed[codes], index=series.index, name=series.name)
+
+
+def _warn_unparsed_dates(df, raw, parsed, input_file):
+    """收货单号行中有值但无法识别的收货日期会被置为空，记录警告；分页噪声行中的文字不算"""
+    receipt_name = f'Unnamed: {JOURNAL_FIELDS["receipt"]}'
+    unparsed = raw.notna() & parsed.isna()
+    if receipt_name not in df.columns or not unparsed.any():
+        return
+    unparsed &= raw.astype(str).str.strip().ne('') & df[receipt_name].astype(str).str.match(RECEIPT_PATTERN)
+    receipts = df.loc[unparsed, receipt_name].astype(str).tolist()
+    if not receipts:
+        return
+    shown = '、'.join(receipts[:10]) + (f'等{len(receipts)}张收货单' if len(receipts) > 10 else '')
+    file_name = os.path.basename(input_file) if input_file else '收货流水'
+    logging.warning(f'{file_name}中有{len(receipts)}个收货日期无法识别，已置为空：{shown}')
+
+
+def apply_column_types(df, columns=JOURNAL_COLUMNS, input_file=None):
+    """按列类型表转换原始数据的各列，列名为 Unnamed: N；input_file只用于警告信息"""
+    for position, kind in columns.items():
+        name = f'Unnamed: {position}'
+        if kind == 'float':
+            df[name] = pd.to_numeric(df[name], errors='coerce').astype(float)
+        elif kind == 'datetime':
+            parsed = _coerce_datetime(df[name])
+            _warn_unparsed_dates(df, df[name], parsed, input_file)
+            df[name] = parsed
+        elif kind == 'category':
+            df[name] = df[name].astype('category')
+    return df
+
+
+def read_journal(input_file, columns=JOURNAL_COLUMNS, layout=None, book=None):
+    """
+    读取收货流水的原始数据
+
+    只读取列类型表中的列，列名与 pd.read_excel(input_file, skiprows=8) 的结果一致
+    （Unnamed: N），数值列转为浮点数，日期列转为日期，取值较少的文本列转为分类类型。
+    提供layout（layout_sniffer.JournalLayout）时按识别出的表头行数和实际列号读取，
+    列名仍为默认版式的列号。提供book（journal_stream.open_workbook打开的工作簿）时从该工作簿读取，
+    读取后pandas会关闭它。
+    """
+    positions = sorted(columns)
+    if layout is None:
+        skip_rows, physical = JOURNAL_SKIP_ROWS, {position: position for position in positions}
+    else:
+        skip_rows, physical = layout.skip_rows, layout.physical_columns(positions)
+    # usecols按列在文件中的顺序返回，names也按此顺序给出
+    file_order = sorted(positions, key=physical.get)
+    source, engine = input_file, None
+    if book is not None:
+        source, engine = book, 'xlrd' if os.path.splitext(input_file)[1].lower() == '.xls' else 'openpyxl'
+    df = pd.read_excel(source, engine=engine, header=None, skiprows=skip_rows,
+                       usecols=[physical[p] for p in file_order],
+                       names=[f'Unnamed: {position}' for position in file_order])
+    if file_order != positions:
+        df = df.reindex(columns=[f'Unnamed: {position}' for position in positions])
+    return apply_column_types(df, columns, input_file)
+
+
+def categorize_columns(df, columns=CATEGORY_COLUMNS):
+    """将取值较少的文本列转为分类类型，减少内存并加快分组"""
+    for column in columns:
+        if column in df.columns:
+            df[column] = df[column].astype('category')
+    return df
+
+
+def _map_distinct(series, func):
+    """对每个不同的值只调用一次func，再映射回整列（空值统一映射到末尾一项）"""
+    codes, uniques = pd.factorize(series)
+    mapped = np.empty(len(uniques) + 1, dtype=object)
+    for i, value in enumerate(uniques):
+        mapped[i] = func(value)
+    mapped[-1] = func(np.nan)
+    return mapped[codes]
+
+
+def _broadcast(values, positions):
+    """按分组编号展开收货单表头的值，dtype与逐单赋值后合并的结果一致"""
+    expanded = values[positions]
+    missing = pd.isna(expanded)
+    if missing.all():
+        return pd.Series(expanded, dtype=float)
+    if missing.any():
+        return pd.Series(expanded, dtype=object)
+    return pd.Series(expanded)
+
+
+def segment_receipts(df, formatter=None, clean_supplier=clean_supplier_name):
+    """
+    将原始收货流水一次性切分为对账明细
+
+    每个收货单号行开始一个分组，其后的明细行通过分组编号取得所属的收货单号、
+    供应商名称和收货日期；空行以及Page、Delivery Date等分页噪声行在整表上一次过滤。
+
+    Args:
+        df: read_journal读取的原始数据（或 pd.read_excel(input_file, skiprows=8) 的结果）
+        formatter: 商品名称与部门的格式化器，为None时使用进程内共享的缓存格式化器
+        clean_supplier: 供应商名称清理函数，每个不同的原始名称只调用一次；为None时保留原始名称
+
+    Returns:
+        pd.DataFrame: 列顺序为DETAIL_COLUMNS的明细数据，CATEGORY_COLUMNS为分类类型
+    """
+    first_col = df['Unnamed: 0']
+    first_col_str = first_col.astype(str)
+    is_header = first_col_str.str.match(RECEIPT_PATTERN, na=False).to_numpy()
+
+    # 收货单号行 → 分组编号（第一个收货单号之前的行为0组，直接丢弃）
+    group_ids = np.cumsum(is_header)
+
+    keep = (
+        (group_ids > 0)
+        & ~is_header
+        & first_col.notna().to_numpy()
+        & ~first_col_str.str.contains(NOISE_PATTERN, na=False).to_numpy()
+    )
+
+    if not keep.any():
+        return pd.DataFrame(columns=DETAIL_COLUMNS)
+
+    # 收货单表头信息，每张收货单只处理一次
+    headers = df.loc[is_header, ['Unnamed: 0', 'Unnamed: 3', 'Unnamed: 25']]
+    header_receipts = headers['Unnamed: 0'].to_numpy(dtype=object)
+    if clean_supplier is None:
+        header_suppliers = headers['Unnamed: 3'].to_numpy(dtype=object)
+    else:
+        header_suppliers = _map_distinct(headers['Unnamed: 3'], clean_supplier)
+    header_dates = _map_distinct(headers['Unnamed: 25'], format_receipt_date)
+
+    details = df.loc[keep].reset_index(drop=True)
+    positions = group_ids[keep] - 1
+
+    if formatter is None:
+        formatter = mixed_text_formatter
+    product_names = formatter.format_series(details['Unnamed: 0'])
+    departments = formatter.format_series(details['Unnamed: 39'])
+
+    result = pd.DataFrame({
+        '收货单号': _broadcast(header_receipts, positions),
+        '收货日期': _broadcast(header_dates, positions),
+        '商品名称': product_names,
+        '实收数量': details['Unnamed: 9'],
+        '基本单位': details['Unnamed: 11'],
+        '单价': details['Unnamed: 15'],
+        '小计金额': details['Unnamed: 27'],
+        '税额': details['Unnamed: 32'],
+        '税率': details['Unnamed: 32'] / details['Unnamed: 27'],
+        '小计价税': details['Unnamed: 37'],
+        '部门': departments,
+        '供应商名称': _broadcast(header_suppliers, positions),
+    })
+    return categorize_columns(result)
+
+
+def parse_journal_file(input_file, notify=None, cache=None, streaming=None):
+    """
+    读取并切分单个收货流水文件，供应商名称保留原始值
+
+    先读取文件开头识别表头行和列布局（见layout_sniffer，提供cache时识别结果也会缓存）。
+    提供cache时再按文件内容、列布局和读取方式查找解析缓存，命中则跳过Excel读取和切分，
+    否则按识别结果读取整个文件。
+    streaming为True时逐行流式解析（见journal_stream），为None时按文件大小自动选择。
+    """
+    return _load_journal_file(input_file, notify, cache, streaming)[0]
+
+
+def _load_journal_file(input_file, notify=None, cache=None, streaming=None, on_rows=None):
+    """返回(明细数据, 是否命中解析缓存)，on_rows见journal_stream.stream_journal_file"""
+    notify = notify or logging.info
+    file_name = os.path.basename(input_file)
+
+    # 放在函数内导入，journal_stream和layout_sniffer依赖本模块
+    from journal_stream import close_workbook, open_workbook, should_stream, stream_journal_file
+    from layout_sniffer import LayoutCache, detect_layout
+
+    if streaming is None:
+        streaming = should_stream(input_file)
+    layout_cache = LayoutCache(os.path.join(cache.cache_dir, 'layouts')) if cache is not None else None
+
+    # 列布局已缓存时不需要打开文件就能确定解析缓存的键；否则识别列布局和整表读取共用一次打开的工作簿
+    book = None
+    try:
+        layout = layout_cache.get(layout_cache.signature(input_file)) if layout_cache is not None else None
+        if layout is None:
+            book = open_workbook(input_file)
+            layout = detect_layout(input_file, cache=layout_cache, book=book)
+
+        if cache is not None:
+            cache_key = cache.key_for(input_file, layout, streaming)
+            file_df = cache.get(cache_key)
+            if file_df is not None:
+                notify(f'使用解析缓存：{file_name}，共{len(file_df)}条记录')
+                return file_df, True
+
+        if layout.detected and layout.fields != JOURNAL_FIELDS:
+            notify(f'{file_name}的列布局与默认版式不同，按识别结果读取：{layout.describe()}')
+        if book is None:
+            book = open_workbook(input_file)
+
+        if streaming:
+            notify(f'开始流式读取文件：{file_name}')
+            file_df, row_count = stream_journal_file(input_file, layout=layout, book=book, on_rows=on_rows)
+            notify(f'文件读取完成：{file_name}，共{row_count}行数据')
+        else:
+            notify(f'开始读取文件：{file_name}')
+            df = read_journal(input_file, layout=layout, book=book)
+            notify(f'文件读取完成：{file_name}，共{len(df)}行数据')
+            file_df = segment_receipts(df, clean_supplier=None)
+            del df
+    finally:
+        if book is not None:
+            close_workbook(book)
+
+    if not file_df.empty:
+        notify(f'文件处理完成：{file_name}，共整理{len(file_df)}条记录')
+
+    if cache is not None:
+        cache.put(cache_key, file_df)
+    return file_df, False
+
+
+def _parse_with_stats(input_file, notify, cache, streaming=None, on_rows=None):
+    """解析单个文件并返回(明细数据, 文件指标)"""
+    before = mixed_text_formatter.cache_info()
+    with log_context(input_file=os.path.basename(input_file)):
+        (file_df, cached), seconds, memory_delta = measure(
+            _load_journal_file, input_file, notify, cache, streaming, on_rows)
+    # 本文件的文本格式化缓存命中情况，子进程中解析时随指标一起返回
+    after = mixed_text_formatter.cache_info()
+    text_cache = {key: after[key] - before[key] for key in ('hits', 'misses', 'rows')}
+    stats = {'file': input_file, 'rows': len(file_df), 'seconds': seconds, 'memory_delta': memory_delta,
+             'cached': cached, 'text_cache': text_cache}
+    return file_df, stats
+
+
+# 子进程中用于回传进度消息和日志记录的队列，由进程池初始化函数设置
+_worker_queue = None
+
+
+def _init_worker(progress_queue, run_id):
+    global _worker_queue
+    _worker_queue = progress_queue
+    forward_logs(progress_queue, run_id)
+
+
+def _parse_in_worker(index, input_file, cache, streaming):
+    def on_rows(rows_read, total_rows):
+        fraction = _file_fraction(rows_read, total_rows)
+        if fraction is not None:
+            _worker_queue.put((index, fraction))
+
+    return _parse_with_stats(input_file, _worker_queue.put, cache, streaming, on_rows)
+
+
+def _file_fraction(rows_read, total_rows):
+    """流式解析中当前文件已读取的比例，总行数未知时返回None；文件解析完成前不超过0.99"""
+    if not total_rows:
+        return None
+    return min(rows_read / total_rows, 0.99)
+
+
+def _total_size(input_files):
+    total = 0
+    for input_file in input_files:
+        try:
+            total += os.path.getsize(input_file)
+        except OSError:
+            pass
+    return total
+
+
+def default_parse_workers(input_files):
+    """默认进程数：文件较小时串行，否则不超过文件数和CPU核数"""
+    by_size = _total_size(input_files) // MIN_BYTES_PER_PARSE_WORKER
+    return max(1, min(len(input_files), os.cpu_count() or 1, by_size))
+
+
+def parse_journals(input_files, workers=None, notify=None, cache=None, file_stats=None, on_progress=None,
+                   streaming=None):
+    """
+    解析多个收货流水文件
+
+    workers大于1且文件多于一个时，每个文件在独立的子进程中读取和切分，结果按
+    输入文件的顺序返回；子进程的进度消息通过队列转发给notify，日志记录写入本进程的日志。进程池不可用时
+    退回到逐个文件的串行解析。返回的供应商名称为原始名称，由调用方统一规范化。
+
+    Args:
+        input_files: 收货流水文件路径列表
+        workers: 进程数，为None时使用default_parse_workers，为1时串行解析
+        notify: 进度消息回调，在调用方线程中执行
+        cache: 解析缓存（ParseCache），为None时不使用缓存
+        file_stats: 列表，提供时按输入文件的顺序追加每个文件的指标
+                    （file、rows、seconds、memory_delta、cached、text_cache）
+        on_progress: 每完成一个文件调用on_progress(已完成文件数, 文件总数)，在调用方线程中执行；
+                     流式解析时每读完一批也会调用，已完成文件数加上进行中文件已读取的比例（小数）
+        streaming: 是否流式解析，None表示按文件大小自动选择
+
+    Returns:
+        list[pd.DataFrame]: 与input_files一一对应的明细数据
+    """
+    notify = notify or logging.info
+    on_progress = on_progress or (lambda done, total: None)
+    if workers is None:
+        workers = default_parse_workers(input_files)
+
+    results = None
+    if workers > 1 and len(input_files) > 1:
+        try:
+            results = _parse_parallel(input_files, min(workers, len(input_files)), notify, cache, on_progress,
+                                      streaming)
+        except BrokenProcessPool as e:
+            logging.warning(f'多进程解析失败，改为串行解析：{e}')
+
+    if results is None:
+        results = []
+        for input_file in input_files:
+            def on_rows(rows_read, total_rows, done=len(results)):
+                fraction = _file_fraction(rows_read, total_rows)
+                if fraction is not None:
+                    on_progress(done + fraction, len(input_files))
+
+            results.append(_parse_with_stats(input_file, notify, cache, streaming, on_rows))
+            on_progress(len(results), len(input_files))
+
+    if file_stats is not None:
+        file_stats.extend(stats for _, stats in results)
+    return [file_df for file_df, _ in results]
+
+
+def _parse_parallel(input_files, workers, notify, cache, on_progress, streaming):
+    context = multiprocessing.get_context('spawn')
+    progress_queue = context.Queue()
+    results = [None] * len(input_files)
+    # 进行中的文件 → 子进程回传的已读取比例
+    fractions = {}
+
+    def report_progress():
+        running = {futures[future] for future in pending}
+        partial = sum(fraction for index, fraction in fractions.items() if index in running)
+        on_progress(len(futures) - len(running) + partial, len(input_files))
+
+    def on_message(item):
+        """子进程回传的(文件序号, 已读取比例)更新进度，其他内容为进度消息"""
+        if isinstance(item, tuple):
+            index, fraction = item
+            fractions[index] = fraction
+            report_progress()
+        else:
+            notify(item)
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker, initargs=(progress_queue, current_run_id())) as executor:
+        futures = {executor.submit(_parse_in_worker, index, input_file, cache, streaming): index
+                   for index, input_file in enumerate(input_files)}
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+            drain_log_queue(progress_queue, on_message)
+            for future in done:
+                results[futures[future]] = future.result()
+            if done:
+                report_progress()
+
+    drain_log_queue(progress_queue, on_message)
+    return results
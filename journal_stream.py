@@ -0,0 +1,237 @@
+import logging
+import os
+import re
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+from journal_parser import (DETAIL_COLUMNS, JOURNAL_COLUMNS, JOURNAL_SKIP_ROWS, NOISE_PATTERN, RECEIPT_PATTERN,
+                            apply_column_types, categorize_columns, segment_receipts)
+
+# 每批的原始行数上限（只在收货单边界处切分，一批可能略多于此数）
+DEFAULT_BATCH_ROWS = 20000
+
+# 超过此大小的文件默认使用流式解析
+STREAM_THRESHOLD_BYTES = 5 * 1024 * 1024
+
+# 与pandas读取Excel时默认识别为空值的文字一致
+NA_STRINGS = {
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN', '<NA>',
+    'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+}
+# Excel错误值，pandas读取时转为空值
+EXCEL_ERRORS = {'#NULL!', '#DIV/0!', '#VALUE!', '#REF!', '#NAME?', '#NUM!', '#N/A'}
+
+_RECEIPT_RE = re.compile(RECEIPT_PATTERN)
+_NOISE_RE = re.compile(NOISE_PATTERN)
+
+
+def _convert_value(value):
+    """单元格值按pandas读取Excel的规则转换：整数值的浮点数转为整数，空单元格和空值文字转为NaN"""
+    if value is None:
+        return np.nan
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str) and (value in NA_STRINGS or value in EXCEL_ERRORS):
+        return np.nan
+    return value
+
+
+def is_xls(input_file):
+    return os.path.splitext(input_file)[1].lower() == '.xls'
+
+
+def open_workbook(input_file):
+    """
+    打开工作簿：.xlsx使用openpyxl只读模式，.xls使用xlrd
+
+    打开.xlsx时会读取整个共享字符串表，大文件需要数秒，因此识别列布局和整表读取共用
+    同一个工作簿对象。用完后调用close_workbook关闭。
+    """
+    if is_xls(input_file):
+        import xlrd
+        return xlrd.open_workbook(input_file, on_demand=True)
+    from openpyxl import load_workbook
+    return load_workbook(input_file, read_only=True, data_only=True)
+
+
+def close_workbook(book):
+    if hasattr(book, 'release_resources'):
+        book.release_resources()
+    else:
+        book.close()
+
+
+def _iter_xlsx_rows(book, positions, skip_rows, max_rows):
+    ws = book.worksheets[0]
+    ws.reset_dimensions()
+    max_row = skip_rows + max_rows if max_rows else None
+    for row in ws.iter_rows(min_row=skip_rows + 1, max_row=max_row, values_only=True):
+        if positions is None:
+            yield list(row)
+        else:
+            yield [row[position] if position < len(row) else None for position in positions]
+
+
+def _iter_xls_rows(book, positions, skip_rows, max_rows):
+    import xlrd
+
+    sheet = book.sheet_by_index(0)
+    end_row = min(sheet.nrows, skip_rows + max_rows) if max_rows else sheet.nrows
+    for row_index in range(skip_rows, end_row):
+        values = []
+        for position in (range(sheet.ncols) if positions is None else positions):
+            if position >= sheet.ncols:
+                values.append(None)
+                continue
+            cell = sheet.cell(row_index, position)
+            if cell.ctype == xlrd.XL_CELL_DATE:
+                values.append(xlrd.xldate_as_datetime(cell.value, book.datemode))
+            elif cell.ctype in (xlrd.XL_CELL_EMPTY, xlrd.XL_CELL_BLANK, xlrd.XL_CELL_ERROR):
+                values.append(None)
+            elif cell.ctype == xlrd.XL_CELL_BOOLEAN:
+                values.append(bool(cell.value))
+            else:
+                values.append(cell.value)
+        yield values
+
+
+def sheet_row_count(input_file, book):
+    """
+    第一个工作表的行数（包括表头），用于估计流式解析的进度，无法获取时返回None
+
+    .xls直接取行数。.xlsx只读模式下没有可靠的行数，扫描一遍工作表XML中的行标记，
+    不解析单元格，耗时约为流式解析的几十分之一。
+    """
+    try:
+        if is_xls(input_file):
+            return book.sheet_by_index(0).nrows
+        worksheet_path = getattr(book.worksheets[0], '_worksheet_path', None)
+        if worksheet_path is None:
+            return None
+        count = 0
+        tail = b''
+        with zipfile.ZipFile(input_file) as archive, archive.open(worksheet_path) as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                # 带上一块末尾的几个字节，以免漏掉跨块的行标记
+                text = tail + chunk
+                count += text.count(b'<row ') + text.count(b'<row>')
+                tail = chunk[-4:]
+        return count
+    except (OSError, KeyError, zipfile.BadZipFile):
+        return None
+
+
+def iter_sheet_rows(input_file, positions=None, skip_rows=0, max_rows=None, book=None):
+    """
+    逐行读取第一个工作表，值按pandas读取Excel的规则转换
+
+    positions为None时返回整行，否则返回按positions顺序取出的各列；max_rows限制读取的行数。
+    book为open_workbook打开的工作簿，提供时直接使用且不关闭，否则打开input_file并在读完后关闭。
+    """
+    own_book = book is None
+    if own_book:
+        book = open_workbook(input_file)
+    try:
+        iterate = _iter_xls_rows if is_xls(input_file) else _iter_xlsx_rows
+        for row in iterate(book, positions, skip_rows, max_rows):
+            yield [_convert_value(value) for value in row]
+    finally:
+        if own_book:
+            close_workbook(book)
+
+
+def iter_journal_rows(input_file, columns=JOURNAL_COLUMNS, layout=None, book=None):
+    """
+    逐行读取收货流水中用到的列，跳过表头
+
+    每行为按默认列号排序的值列表。提供layout时按识别出的表头行数和实际列号读取，
+    否则使用默认版式（前9行表头）。book的含义同iter_sheet_rows。
+    """
+    positions = sorted(columns)
+    if layout is None:
+        return iter_sheet_rows(input_file, positions, JOURNAL_SKIP_ROWS, book=book)
+    physical = layout.physical_columns(positions)
+    return iter_sheet_rows(input_file, [physical[position] for position in positions], layout.skip_rows, book=book)
+
+
+def iter_receipt_batches(input_file, batch_rows=DEFAULT_BATCH_ROWS, columns=JOURNAL_COLUMNS, layout=None,
+                         book=None):
+    """
+    按收货单分批读取原始数据
+
+    逐行运行一个小状态机：第一个收货单号之前的行直接丢弃；收货单号行开始新的收货单；
+    其后的明细行归入当前收货单；空行和分页噪声行随时丢弃。缓冲的行数达到batch_rows后，
+    在下一个收货单号行之前输出一批，因此每批只包含完整的收货单。layout和book的含义同iter_journal_rows。
+
+    Yields:
+        (pd.DataFrame, int): 与read_journal格式相同的原始数据（已转换列类型），以及到目前为止读取的原始行数
+    """
+    names = [f'Unnamed: {position}' for position in sorted(columns)]
+    buffer = []
+    rows_read = 0
+    in_receipt = False
+
+    for row in iter_journal_rows(input_file, columns, layout, book):
+        rows_read += 1
+        first = row[0]
+        if pd.isna(first):
+            continue
+        first_text = str(first)
+        if _RECEIPT_RE.match(first_text):
+            # 收货单号行：先输出已缓冲的完整收货单
+            if len(buffer) >= batch_rows:
+                yield apply_column_types(pd.DataFrame(buffer, columns=names), columns, input_file), rows_read - 1
+                buffer = []
+            in_receipt = True
+            buffer.append(row)
+        elif not in_receipt or _NOISE_RE.search(first_text):
+            continue
+        else:
+            buffer.append(row)
+
+    if buffer:
+        yield apply_column_types(pd.DataFrame(buffer, columns=names), columns, input_file), rows_read
+
+
+def stream_journal_file(input_file, batch_rows=DEFAULT_BATCH_ROWS, formatter=None, layout=None, book=None,
+                        on_rows=None):
+    """
+    流式读取并切分单个收货流水文件，供应商名称保留原始值
+
+    原始行每次只保留一批，切分后的明细逐批累积并在最后合并，结果与read_journal后segment_receipts一致。
+    layout和book的含义同iter_journal_rows。每批切分后调用on_rows(已读取行数, 表头之后的总行数)，
+    未提供book或无法获取总行数时总行数为None。
+
+    Returns:
+        (pd.DataFrame, int): 明细数据和读取的原始行数
+    """
+    file_name = os.path.basename(input_file)
+    frames = []
+    rows_read = 0
+    total_rows = None
+    if on_rows is not None and book is not None:
+        sheet_rows = sheet_row_count(input_file, book)
+        skip_rows = JOURNAL_SKIP_ROWS if layout is None else layout.skip_rows
+        total_rows = max(sheet_rows - skip_rows, 0) if sheet_rows is not None else None
+    batches = iter_receipt_batches(input_file, batch_rows, layout=layout, book=book)
+    for batch_index, (raw_batch, rows_read) in enumerate(batches, 1):
+        frames.append(segment_receipts(raw_batch, formatter=formatter, clean_supplier=None))
+        logging.debug(f'流式解析{file_name}：第{batch_index}批，已读取{rows_read}行')
+        if on_rows is not None:
+            on_rows(rows_read, total_rows)
+
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return pd.DataFrame(columns=DETAIL_COLUMNS), rows_read
+    # 各批的分类类型取值不同，合并后重新转换
+    return categorize_columns(pd.concat(frames, ignore_index=True)), rows_read
+
+
+def should_stream(input_file, threshold=STREAM_THRESHOLD_BYTES):
+    """文件较大时使用流式解析"""
+    try:
+        return os.path.getsize(input_file) >= threshold
+    except OSError:
+        return False
@@ -0,0 +1,385 @@
+import hashlib
+import json
+import logging
+import os
+import re
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from journal_parser import JOURNAL_FIELDS, JOURNAL_SKIP_ROWS, NOISE_PATTERN, RECEIPT_PATTERN
+from journal_stream import iter_sheet_rows
+
+# 识别列布局时读取的行数
+SAMPLE_ROWS = 60
+
+# 识别规则版本，规则变化时需要增加，使缓存的识别结果失效
+LAYOUT_VERSION = 3
+
+# 列标题文字（去掉标点、转为小写后完全相同才算匹配）
+FIELD_LABELS = {
+    'receipt': ['receiving no', 'receipt no', 'receiving number', '收货单号', '单号'],
+    'supplier': ['supplier', 'supplier name', 'vendor', '供应商', '供应商名称'],
+    'date': ['delivery date', 'receiving date', 'receipt date', 'date', '收货日期', '日期'],
+    'qty': ['qty', 'quantity', 'received qty', '数量', '实收数量'],
+    'unit': ['unit', 'uom', 'base unit', '单位', '基本单位'],
+    'price': ['price', 'unit price', 'unit cost', '单价'],
+    'amount': ['amount', 'net amount', 'subtotal', '金额', '小计金额'],
+    'tax': ['tax', 'vat', 'tax amount', '税额'],
+    'total': ['total', 'gross amount', 'total amount', '价税合计', '小计价税'],
+    'department': ['department', 'dept', 'cost center', '部门'],
+}
+
+# 字段名 → 错误信息中使用的中文列名
+FIELD_NAMES = {
+    'receipt': '收货单号', 'supplier': '供应商名称', 'date': '收货日期', 'qty': '实收数量', 'unit': '基本单位',
+    'price': '单价', 'amount': '小计金额', 'tax': '税额', 'total': '小计价税', 'department': '部门',
+}
+
+# 明细行中一列有多少比例的值为数值（或文字）时视为数值列（或文字列）
+COLUMN_TYPE_SHARE = 0.6
+# 金额关系（小计金额 = 数量 × 单价，小计价税 = 小计金额 + 税额）至少要在多少比例的明细行上成立
+RELATION_SHARE = 0.8
+# 日期文字解析出的年份至少为多少才视为日期
+MIN_DATE_YEAR = 1900
+
+_RECEIPT_RE = re.compile(RECEIPT_PATTERN)
+_NOISE_RE = re.compile(NOISE_PATTERN)
+_LABEL_STRIP_RE = re.compile(r'[\s.:：_()（）/]+')
+
+
+class JournalLayout:
+    """
+    收货流水的列布局
+
+    fields为字段名 → 文件中的实际列号（字段名同JOURNAL_FIELDS），skip_rows为第一个
+    收货单号行之前的行数。detected为False表示样本中没有可识别的数据，使用的是默认版式。
+    """
+
+    def __init__(self, fields=None, skip_rows=JOURNAL_SKIP_ROWS, detected=False):
+        self.fields = dict(fields or JOURNAL_FIELDS)
+        self.skip_rows = skip_rows
+        self.detected = detected
+
+    def physical_columns(self, positions):
+        """默认列号 → 文件中的实际列号"""
+        field_by_position = {position: field for field, position in JOURNAL_FIELDS.items()}
+        return {position: self.fields[field_by_position[position]] for position in positions}
+
+    def describe(self):
+        """各字段所在的列，如“receipt=A, supplier=D”"""
+        return ', '.join(f'{field}={_column_letter(position)}' for field, position in self.fields.items())
+
+    def to_dict(self):
+        return {'fields': self.fields, 'skip_rows': self.skip_rows, 'detected': self.detected}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls({field: int(position) for field, position in data['fields'].items()},
+                   int(data['skip_rows']), bool(data['detected']))
+
+
+def _column_letter(position):
+    letters = ''
+    position += 1
+    while position:
+        position, remainder = divmod(position - 1, 26)
+        letters = chr(ord('A') + remainder) + letters
+    return letters
+
+
+class LayoutCache:
+    """
+    列布局识别结果缓存
+
+    以文件签名（绝对路径、大小和修改时间）为键，每个文件的识别结果保存为一个小的JSON文件，
+    同一个文件再次解析时不需要重新读取开头的行。
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+
+    @staticmethod
+    def signature(input_file):
+        stat = os.stat(input_file)
+        text = f'{os.path.abspath(input_file)}|{stat.st_size}|{stat.st_mtime_ns}'
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    def _path(self, signature):
+        return os.path.join(self.cache_dir, f'{signature}.json')
+
+    def get(self, signature):
+        """读取缓存的列布局，未命中、版本不同或缓存损坏时返回None"""
+        path = self._path(signature)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != LAYOUT_VERSION:
+                return None
+            return JournalLayout.from_dict(data)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logging.warning(f'列布局缓存已损坏，将重新识别：{path}，{e}')
+            return None
+
+    def put(self, signature, layout):
+        """写入缓存，先写临时文件再重命名"""
+        path = self._path(signature)
+        temp_file = f'{path}.{os.getpid()}.tmp'
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump({'version': LAYOUT_VERSION, **layout.to_dict()}, f, ensure_ascii=False)
+            os.replace(temp_file, path)
+        except OSError as e:
+            logging.warning(f'无法写入列布局缓存：{path}，{e}')
+
+
+def detect_layout(input_file, cache=None, sample_rows=SAMPLE_ROWS, book=None):
+    """
+    读取文件开头的若干行，识别表头行数和各字段所在的列
+
+    提供cache（LayoutCache）时按文件签名缓存识别结果；book为已打开的工作簿（见journal_stream.open_workbook）。
+
+    Raises:
+        ValueError: 样本中有明细行，但无法可靠地确定各字段所在的列，且样本也不符合默认版式
+    """
+    signature = None
+    if cache is not None:
+        signature = cache.signature(input_file)
+        layout = cache.get(signature)
+        if layout is not None:
+            return layout
+
+    rows = list(iter_sheet_rows(input_file, max_rows=sample_rows, book=book))
+    try:
+        layout = sniff_layout(rows)
+    except ValueError as e:
+        # 识别失败但默认版式能读取样本时，按默认版式读取
+        if not fits_default_layout(rows):
+            raise
+        logging.warning(f'{e}，样本符合默认版式，按默认版式读取：{os.path.basename(input_file)}')
+        layout = JournalLayout()
+    if not layout.detected:
+        logging.warning(f'未能从文件开头识别列布局，使用默认版式：{os.path.basename(input_file)}')
+    if cache is not None:
+        cache.put(signature, layout)
+    return layout
+
+
+def sniff_layout(rows):
+    """
+    根据样本行识别列布局
+
+    先按收货单号的格式找到收货单号所在的列和第一个收货单号行；第一个收货单号行之前
+    的列标题（如 Supplier、数量）直接确定对应字段的列。其余字段按值的特征识别：
+    收货单号行中的日期列和文字列为收货日期和供应商名称，明细行中的文字列为基本单位
+    （较短）和部门（较长），数值列中满足“小计金额 = 数量 × 单价”和“小计价税 =
+    小计金额 + 税额”的列为相应字段。
+
+    Args:
+        rows: 从工作表第一行开始的样本行（值列表，长度可以不同）
+
+    Returns:
+        JournalLayout: 样本中没有收货单或没有明细行时为默认版式（detected为False）
+    """
+    width = max((len(row) for row in rows), default=0)
+    rows = [list(row) + [np.nan] * (width - len(row)) for row in rows]
+
+    receipt_counts = [sum(_is_receipt(row[col]) for row in rows) for col in range(width)]
+    if not any(receipt_counts):
+        return JournalLayout()
+    receipt_col = int(np.argmax(receipt_counts))
+    first_receipt = next(index for index, row in enumerate(rows) if _is_receipt(row[receipt_col]))
+
+    header_rows = [row for row in rows[first_receipt:] if _is_receipt(row[receipt_col])]
+    detail_rows = [row for row in rows[first_receipt:] if _is_detail(row, receipt_col)]
+    if not detail_rows:
+        return JournalLayout()
+
+    fields = _match_labels(rows[:first_receipt])
+    fields['receipt'] = receipt_col
+    fields = {field: col for field, col in fields.items() if field == 'receipt' or col != receipt_col}
+
+    def free(field=None):
+        """字段可选的列：已由列标题确定时只有该列，否则为尚未被其他字段占用的列"""
+        if field in fields:
+            return [fields[field]]
+        taken = set(fields.values())
+        return [col for col in range(width) if col not in taken]
+
+    # 收货单号行：日期列和供应商名称列
+    fields['date'] = _best_column(free('date'), header_rows, _is_date, 'date')
+    fields['supplier'] = _best_column(free('supplier'), header_rows, _is_text, 'supplier')
+
+    # 明细行：金额关系
+    numeric = [col for col in free() if _share(detail_rows, col, _is_number) >= COLUMN_TYPE_SHARE]
+    _match_amounts(fields, detail_rows, numeric)
+
+    # 明细行：基本单位和部门
+    if 'unit' not in fields or 'department' not in fields:
+        text = [col for col in free() if _share(detail_rows, col, _is_text) >= COLUMN_TYPE_SHARE]
+        lengths = {col: _mean_text_length(detail_rows, col) for col in text}
+        if 'unit' not in fields:
+            if not lengths:
+                raise ValueError('无法识别收货流水的列布局：找不到基本单位所在的列')
+            fields['unit'] = min(lengths, key=lambda col: (lengths[col], col))
+            lengths.pop(fields['unit'], None)
+        if 'department' not in fields:
+            if not lengths:
+                raise ValueError('无法识别收货流水的列布局：找不到部门所在的列')
+            fields['department'] = max(lengths, key=lambda col: (lengths[col], -col))
+
+    layout_fields = {field: int(fields[field]) for field in JOURNAL_FIELDS}
+    return JournalLayout(layout_fields, skip_rows=first_receipt, detected=True)
+
+
+def fits_default_layout(rows):
+    """样本行按默认版式读取时，收货单号列有收货单号，且明细行满足“小计金额 = 数量 × 单价”"""
+    fields = JOURNAL_FIELDS
+    width = max(fields.values()) + 1
+    rows = [list(row) + [np.nan] * (width - len(row)) for row in rows[JOURNAL_SKIP_ROWS:]]
+    receipt_col = fields['receipt']
+    if not any(_is_receipt(row[receipt_col]) for row in rows):
+        return False
+    detail_rows = [row for row in rows if _is_detail(row, receipt_col)]
+    qty, price, amount = fields['qty'], fields['price'], fields['amount']
+    score = _share(detail_rows, None, lambda row: _close(row[amount], row[qty] * row[price]),
+                   columns=(qty, price, amount))
+    return score >= RELATION_SHARE
+
+
+def _match_labels(rows):
+    """在表头行中按列标题文字确定字段所在的列"""
+    fields = {}
+    label_fields = {label: field for field, labels in FIELD_LABELS.items() for label in labels}
+    for row in rows:
+        for col, value in enumerate(row):
+            if isinstance(value, str):
+                field = label_fields.get(_LABEL_STRIP_RE.sub(' ', value).strip().lower())
+                if field and field not in fields:
+                    fields[field] = col
+    return fields
+
+
+def _best_column(candidates, rows, predicate, field):
+    """符合predicate的值最多的列，相同时取左边的列"""
+    scores = {col: _share(rows, col, predicate) for col in candidates}
+    col = max(scores, key=lambda col: (scores[col], -col), default=None)
+    if col is None or scores[col] < COLUMN_TYPE_SHARE:
+        raise ValueError(f'无法识别收货流水的列布局：找不到{FIELD_NAMES[field]}所在的列')
+    return col
+
+
+def _match_amounts(fields, rows, numeric):
+    """
+    在数值列中找出满足金额关系的数量、单价、小计金额，以及税额、小计价税
+
+    数量和单价可以互换，取整数值较多的一列为数量，再相同时取左边的列为数量；
+    满足关系的小计金额有多列时取左边的列。税额和小计价税中取绝对值较大的一列为小计价税；
+    样本中税额都为0时任何全为0的列都满足关系，优先取有非0值的列，再优先取默认版式的税额列。
+    """
+    def candidates(field):
+        return [fields[field]] if field in fields else numeric
+
+    best = None
+    for qty in candidates('qty'):
+        for price in candidates('price'):
+            for amount in candidates('amount'):
+                if len({qty, price, amount}) < 3:
+                    continue
+                score = _share(rows, None, lambda row: _close(row[amount], row[qty] * row[price]),
+                               columns=(qty, price, amount))
+                key = (score, _share(rows, qty, _is_integer) - _share(rows, price, _is_integer),
+                       price > qty, -amount)
+                if best is None or key > best[0]:
+                    best = (key, qty, price, amount)
+    if best is None or best[0][0] < RELATION_SHARE:
+        raise ValueError('无法识别收货流水的列布局：找不到满足“小计金额 = 数量 × 单价”的列')
+    _, fields['qty'], fields['price'], fields['amount'] = best
+
+    amount = fields['amount']
+    used = {fields['qty'], fields['price'], amount}
+    best = None
+    for tax in candidates('tax'):
+        for total in candidates('total'):
+            if tax == total or tax in used or total in used:
+                continue
+            score = _share(rows, None, lambda row: _close(row[total], row[amount] + row[tax]),
+                           columns=(amount, tax, total))
+            key = (score, _mean_abs(rows, total) >= _mean_abs(rows, tax), _mean_abs(rows, tax) > 0,
+                   tax == JOURNAL_FIELDS['tax'], -total, -tax)
+            if best is None or key > best[0]:
+                best = (key, tax, total)
+    if best is None or best[0][0] < RELATION_SHARE:
+        raise ValueError('无法识别收货流水的列布局：找不到满足“小计价税 = 小计金额 + 税额”的列')
+    _, fields['tax'], fields['total'] = best
+
+
+def _share(rows, col, predicate, columns=None):
+    """
+    predicate成立的行所占的比例
+
+    col不为None时对该列的值调用predicate；否则对整行调用，只统计columns中各列都是数值的行，
+    但比例仍以全部行为分母。
+    """
+    if not rows:
+        return 0.0
+    if col is not None:
+        return sum(bool(predicate(row[col])) for row in rows) / len(rows)
+    hits = sum(1 for row in rows if all(_is_number(row[c]) for c in columns) and predicate(row))
+    return hits / len(rows)
+
+
+def _close(actual, expected):
+    return abs(actual - expected) <= max(0.02, abs(expected) * 0.005)
+
+
+def _is_receipt(value):
+    return isinstance(value, str) and bool(_RECEIPT_RE.match(value))
+
+
+def _is_detail(row, receipt_col):
+    """明细行：收货单号列为非噪声的文字（商品名称），且至少有两个数值"""
+    value = row[receipt_col]
+    if pd.isna(value) or _is_receipt(str(value)) or _NOISE_RE.search(str(value)):
+        return False
+    return sum(_is_number(item) for col, item in enumerate(row) if col != receipt_col) >= 2
+
+
+def _is_number(value):
+    return isinstance(value, (int, float, np.number)) and not isinstance(value, bool) and not pd.isna(value)
+
+
+def _is_integer(value):
+    return _is_number(value) and float(value).is_integer()
+
+
+def _is_text(value):
+    return isinstance(value, str) and bool(value.strip()) and not _is_date(value)
+
+
+def _is_date(value):
+    """
+    日期值，或能按format_receipt_date的规则（pd.to_datetime）识别为日期的文字
+
+    不含年份的文字（如单位“Mar”）会被识别为公元1年，不算日期。
+    """
+    if isinstance(value, date):
+        return True
+    if not isinstance(value, str) or not value.strip():
+        return False
+    parsed = pd.to_datetime(value, errors='coerce')
+    return not pd.isna(parsed) and parsed.year >= MIN_DATE_YEAR
+
+
+def _mean_text_length(rows, col):
+    lengths = [len(row[col]) for row in rows if isinstance(row[col], str)]
+    return sum(lengths) / len(lengths) if lengths else 0.0
+
+
+def _mean_abs(rows, col):
+    values = [abs(row[col]) for row in rows if _is_number(row[col])]
+    return sum(values) / len(values) if values else 0.0
@@ -0,0 +1,160 @@
+import logging
+import threading
+from collections import deque
+
+from PyQt5.QtCore import QTimer
+from PyQt5.QtWidgets import QComboBox, QHBoxLayout, QLabel, QLineEdit, QPlainTextEdit, QVBoxLayout, QWidget
+
+# 内存中保留的日志条数，超出后丢弃最早的
+DEFAULT_MAX_RECORDS = 200000
+# 日志控件中显示的最大行数
+DEFAULT_MAX_BLOCKS = 5000
+# 批量刷新的间隔（毫秒）
+FLUSH_INTERVAL_MS = 100
+
+# 级别筛选选项：显示名称 → 最低级别
+LEVEL_FILTERS = [
+    ('全部', logging.NOTSET),
+    ('信息', logging.INFO),
+    ('警告', logging.WARNING),
+    ('错误', logging.ERROR),
+]
+
+
+class LogBuffer:
+    """
+    线程安全的日志缓冲
+
+    任意线程调用append只在加锁后放入待处理列表，界面线程定时调用take_pending
+    一次取走整批。已取走的日志保存在有上限的records中，供筛选和搜索使用。
+    """
+
+    def __init__(self, max_records=DEFAULT_MAX_RECORDS):
+        self._lock = threading.Lock()
+        self._pending = []
+        self.records = deque(maxlen=max_records)
+
+    def append(self, message, level=logging.INFO):
+        with self._lock:
+            self._pending.append((level, message))
+
+    def take_pending(self):
+        """取走所有待处理的日志并加入records，返回本批日志"""
+        with self._lock:
+            batch, self._pending = self._pending, []
+        self.records.extend(batch)
+        return batch
+
+    def clear(self):
+        with self._lock:
+            self._pending = []
+        self.records.clear()
+
+    @staticmethod
+    def matches(record, min_level=logging.NOTSET, keyword=''):
+        level, message = record
+        return level >= min_level and (not keyword or keyword.lower() in message.lower())
+
+    def filtered(self, min_level=logging.NOTSET, keyword='', limit=None):
+        """符合级别和关键字的日志文本，limit限制返回最新的条数"""
+        lines = [message for level, message in self.records if self.matches((level, message), min_level, keyword)]
+        return lines[-limit:] if limit else lines
+
+
+class LogPanelHandler(logging.Handler):
+    """将日志记录写入LogPanel的缓冲，可在任意线程中调用"""
+
+    def __init__(self, panel):
+        super().__init__()
+        self.panel = panel
+        self.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(message)s', datefmt='%H:%M:%S'))
+
+    def emit(self, record):
+        try:
+            self.panel.append(self.format(record), record.levelno)
+        except Exception:
+            self.handleError(record)
+
+
+class LogPanel(QWidget):
+    """
+    处理日志面板
+
+    使用纯文本控件并限制最大行数，日志由定时器从LogBuffer中批量取出后一次追加。
+    支持按级别筛选和关键字搜索，筛选条件变化时从缓冲中重新生成显示内容。
+    """
+
+    def __init__(self, parent=None, max_records=DEFAULT_MAX_RECORDS, max_blocks=DEFAULT_MAX_BLOCKS):
+        super().__init__(parent)
+        self.buffer = LogBuffer(max_records)
+        self.max_blocks = max_blocks
+        self.handler = LogPanelHandler(self)
+
+        self.level_combo = QComboBox()
+        for label, _ in LEVEL_FILTERS:
+            self.level_combo.addItem(label)
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText('搜索日志')
+        self.search_edit.setClearButtonEnabled(True)
+
+        self.text = QPlainTextEdit()
+        self.text.setReadOnly(True)
+        self.text.setMaximumBlockCount(max_blocks)
+
+        filter_layout = QHBoxLayout()
+        filter_layout.addWidget(QLabel('级别：'))
+        filter_layout.addWidget(self.level_combo)
+        filter_layout.addWidget(self.search_edit, 1)
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addLayout(filter_layout)
+        layout.addWidget(self.text)
+        self.setLayout(layout)
+
+        # 搜索输入停顿后再重新筛选
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(300)
+        self.search_timer.timeout.connect(self.refilter)
+        self.search_edit.textChanged.connect(self.search_timer.start)
+        self.level_combo.currentIndexChanged.connect(self.refilter)
+
+        self.flush_timer = QTimer(self)
+        self.flush_timer.timeout.connect(self.flush)
+        self.flush_timer.start(FLUSH_INTERVAL_MS)
+
+    def append(self, message, level=logging.INFO):
+        """追加一条日志，可在任意线程中调用"""
+        self.buffer.append(message, level)
+
+    def min_level(self):
+        return LEVEL_FILTERS[self.level_combo.currentIndex()][1]
+
+    def keyword(self):
+        return self.search_edit.text().strip()
+
+    def flush(self):
+        """把待处理的日志中符合筛选条件的部分一次追加到控件"""
+        batch = self.buffer.take_pending()
+        if not batch:
+            return
+        min_level, keyword = self.min_level(), self.keyword()
+        lines = [message for level, message in batch if LogBuffer.matches((level, message), min_level, keyword)]
+        if not lines:
+            return
+        scrollbar = self.text.verticalScrollBar()
+        at_bottom = scrollbar.value() >= scrollbar.maximum() - 2
+        self.text.appendPlainText('\n'.join(lines[-self.max_blocks:]))
+        # 用户向上翻看时不自动滚动
+        if at_bottom:
+            scrollbar.setValue(scrollbar.maximum())
+
+    def refilter(self):
+        self.buffer.take_pending()
+        lines = self.buffer.filtered(self.min_level(), self.keyword(), limit=self.max_blocks)
+        self.text.setPlainText('\n'.join(lines))
+        self.text.verticalScrollBar().setValue(self.text.verticalScrollBar().maximum())
+
+    def clear(self):
+        self.buffer.clear()
+        self.text.clear()
@@ -0,0 +1,305 @@
+import atexit
+import contextvars
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+LOG_DIR = 'logs'
+LOG_FORMAT = '%(asctime)s - %(levelname)s - [%(run_id)s|%(input_file)s] %(message)s'
+
+# 单个日志文件的大小上限和轮转保留的份数
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_BACKUP_COUNT = 3
+# 日志目录的保留期限和最多保留的日志文件数
+DEFAULT_RETENTION_DAYS = 30
+DEFAULT_MAX_FILES = 200
+
+# 当前线程（或上下文）的运行编号和输入文件，由RunContextFilter写入每条日志记录
+_run_id = contextvars.ContextVar('run_id', default='-')
+_input_file = contextvars.ContextVar('input_file', default='-')
+
+
+@contextmanager
+def log_context(run_id=None, input_file=None):
+    """在with块内为本线程的日志记录附加运行编号和/或输入文件"""
+    tokens = []
+    if run_id is not None:
+        tokens.append((_run_id, _run_id.set(run_id)))
+    if input_file is not None:
+        tokens.append((_input_file, _input_file.set(input_file)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+class RunContextFilter(logging.Filter):
+    """在产生日志的线程中写入run_id和input_file，之后才进入队列"""
+
+    def filter(self, record):
+        # 从后台处理进程转发的记录已带有运行编号和输入文件
+        if not hasattr(record, 'run_id'):
+            record.run_id = _run_id.get()
+            record.input_file = _input_file.get()
+        return True
+
+
+def current_run_id():
+    """当前上下文的运行编号，传给进程池的初始化函数后由forward_logs在子进程中恢复"""
+    return _run_id.get()
+
+
+def forward_logs(log_queue, run_id=None, level=logging.INFO):
+    """
+    进程池子进程的日志初始化：根日志记录器只保留一个把记录放入log_queue的处理器
+
+    记录在子进程中带上运行编号（run_id为父进程中的运行编号）和输入文件并格式化为文本，
+    由父进程的drain_log_queue写入父进程的日志系统。
+    """
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    handler = logging.handlers.QueueHandler(log_queue)
+    handler.addFilter(RunContextFilter())
+    root.addHandler(handler)
+    root.setLevel(level)
+    if run_id is not None:
+        _run_id.set(run_id)
+
+
+def handle_forwarded(record):
+    """把其他进程转发来的日志记录交给本进程的日志系统，按运行编号写入对应的运行日志"""
+    logging.getLogger(record.name).handle(record)
+
+
+def drain_log_queue(log_queue, on_message=None):
+    """取出队列中已有的全部内容：日志记录交给handle_forwarded，其他内容交给on_message"""
+    while True:
+        try:
+            item = log_queue.get_nowait()
+        except queue.Empty:
+            return
+        if isinstance(item, logging.LogRecord):
+            handle_forwarded(item)
+        elif on_message is not None:
+            on_message(item)
+
+
+class _RunFilter(logging.Filter):
+    """只保留指定运行编号的日志，用于每次运行单独的日志文件"""
+
+    def __init__(self, run_id):
+        super().__init__()
+        self.run_id = run_id
+
+    def filter(self, record):
+        return getattr(record, 'run_id', None) == self.run_id
+
+
+class _Router(logging.Handler):
+    """监听线程中的分发器，运行期间可以增减下游处理器"""
+
+    def __init__(self):
+        super().__init__()
+        self._handlers = []
+        self._handlers_lock = threading.Lock()
+
+    def add(self, handler):
+        with self._handlers_lock:
+            self._handlers = self._handlers + [handler]
+
+    def remove(self, handler):
+        with self._handlers_lock:
+            self._handlers = [item for item in self._handlers if item is not handler]
+
+    def emit(self, record):
+        flush_event = getattr(record, 'flush_event', None)
+        if flush_event is not None:
+            flush_event.set()
+            return
+        for handler in self._handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+
+def prune_logs(log_dir=LOG_DIR, retention_days=DEFAULT_RETENTION_DAYS, max_files=DEFAULT_MAX_FILES, keep=()):
+    """删除超过保留天数的日志和运行报告，并只保留最新的max_files个文件，返回删除的文件数"""
+    if not os.path.isdir(log_dir):
+        return 0
+    keep = {os.path.abspath(path) for path in keep}
+    entries = []
+    for name in os.listdir(log_dir):
+        path = os.path.join(log_dir, name)
+        if ('.log' in name or name.endswith('.json')) and os.path.isfile(path) and os.path.abspath(path) not in keep:
+            entries.append((os.path.getmtime(path), path))
+
+    removed = 0
+    expire_before = time.time() - retention_days * 24 * 3600
+    # 最新的在前
+    for index, (mtime, path) in enumerate(sorted(entries, reverse=True)):
+        if mtime < expire_before or index >= max_files:
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+    return removed
+
+
+class RunLog:
+    """一次运行的日志：运行编号和日志文件路径"""
+
+    def __init__(self, run_id, log_file):
+        self.run_id = run_id
+        self.log_file = log_file
+
+
+class LogManager:
+    """
+    基于队列的日志
+
+    根日志记录器只挂一个QueueHandler，各线程写日志时只把记录放入队列；
+    文件和控制台输出由后台的QueueListener线程完成，不占用处理线程的时间。
+    每次处理通过run()获得单独的、按大小轮转的日志文件，文件中只包含该次运行的记录。
+    """
+
+    def __init__(self, log_dir=LOG_DIR, max_bytes=DEFAULT_MAX_BYTES, backup_count=DEFAULT_BACKUP_COUNT,
+                 retention_days=DEFAULT_RETENTION_DAYS, max_files=DEFAULT_MAX_FILES, level=logging.INFO):
+        self.log_dir = log_dir
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.retention_days = retention_days
+        self.max_files = max_files
+        self.level = level
+        self.app_log_file = None
+        self._router = _Router()
+        self._queue_handler = None
+        self._listener = None
+
+    def _file_handler(self, path):
+        handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=self.max_bytes, backupCount=self.backup_count, encoding='utf-8', delay=True)
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        return handler
+
+    def _log_path(self, prefix):
+        return os.path.join(self.log_dir, f'{prefix}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.log')
+
+    @property
+    def started(self):
+        return self._listener is not None
+
+    def start(self, app_prefix='app', console=True):
+        """
+        启动队列和监听线程
+
+        Args:
+            app_prefix: 应用日志文件名前缀，记录所有日志；为None时不写应用日志
+            console: 是否同时输出到控制台
+        """
+        if self.started:
+            return self
+        os.makedirs(self.log_dir, exist_ok=True)
+        if app_prefix:
+            self.app_log_file = self._log_path(app_prefix)
+            self._router.add(self._file_handler(self.app_log_file))
+        if console:
+            stream_handler = logging.StreamHandler()
+            stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+            self._router.add(stream_handler)
+
+        self._queue_handler = logging.handlers.QueueHandler(queue.SimpleQueue())
+        self._queue_handler.addFilter(RunContextFilter())
+        root = logging.getLogger()
+        root.setLevel(self.level)
+        root.addHandler(self._queue_handler)
+
+        self._listener = logging.handlers.QueueListener(self._queue_handler.queue, self._router)
+        self._listener.start()
+        atexit.register(self.stop)
+        return self
+
+    def stop(self):
+        """写完队列中剩余的日志并关闭所有文件"""
+        if not self.started:
+            return
+        logging.getLogger().removeHandler(self._queue_handler)
+        self._listener.stop()
+        self._listener = None
+        for handler in list(self._router._handlers):
+            self._router.remove(handler)
+            handler.close()
+
+    @contextmanager
+    def run(self, prefix='process', run_id=None):
+        """
+        一次处理的日志上下文
+
+        with块内本线程的日志都带有运行编号，并另外写入该次运行的日志文件；
+        结束时关闭该文件并按保留期限清理日志目录。
+
+        Yields:
+            RunLog: run_id和log_file
+        """
+        run_id = run_id or uuid.uuid4().hex[:12]
+        log_file = self._log_path(prefix)
+        if os.path.exists(log_file):
+            # 同一秒内的多次运行
+            log_file = f'{os.path.splitext(log_file)[0]}_{run_id}.log'
+        run_log = RunLog(run_id, log_file)
+        handler = self._file_handler(run_log.log_file)
+        handler.addFilter(_RunFilter(run_log.run_id))
+        self._router.add(handler)
+        try:
+            with log_context(run_id=run_log.run_id):
+                yield run_log
+        finally:
+            # 等待队列中本次运行的日志写完后再关闭文件
+            self.flush()
+            self._router.remove(handler)
+            handler.close()
+            removed = prune_logs(self.log_dir, self.retention_days, self.max_files,
+                                 keep=[run_log.log_file, self.app_log_file or ''])
+            if removed:
+                logging.info(f'已清理{removed}个过期的日志文件')
+
+    def flush(self, timeout=5.0):
+        """等待监听线程处理完当前队列中的日志"""
+        if not self.started:
+            return
+        done = threading.Event()
+        marker = logging.makeLogRecord({'msg': '', 'levelno': logging.NOTSET})
+        marker.flush_event = done
+        self._queue_handler.queue.put_nowait(marker)
+        done.wait(timeout)
+
+
+# 进程内共享的日志管理器
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_log_manager():
+    """返回已启动的日志管理器，尚未启动时以默认设置（只写运行日志）启动"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = LogManager().start(app_prefix=None, console=False)
+        return _manager
+
+
+def setup_logging(log_dir=LOG_DIR, app_prefix='app', console=True, **options):
+    """启动进程内共享的日志管理器，options传给LogManager"""
+    global _manager
+    with _manager_lock:
+        if _manager is not None:
+            _manager.stop()
+        _manager = LogManager(log_dir, **options).start(app_prefix=app_prefix, console=console)
+        return _manager
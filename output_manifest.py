@@ -0,0 +1,81 @@
+import hashlib
+import json
+import logging
+import os
+
+import pandas as pd
+
+MANIFEST_FILE = 'manifest.json'
+MANIFEST_VERSION = 2
+
+
+def statement_content_digest(supplier_data):
+    """供应商明细（已排序）的内容哈希，包含列名、行顺序和每个单元格的值"""
+    digest = hashlib.sha256()
+    digest.update('\x1f'.join(map(str, supplier_data.columns)).encode('utf-8'))
+    row_hashes = pd.util.hash_pandas_object(supplier_data, index=False)
+    digest.update(row_hashes.to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def settings_digest(settings):
+    """渲染设置的哈希，settings为可JSON序列化的字典"""
+    payload = json.dumps(settings, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class OutputManifest:
+    """
+    对账单输出清单
+
+    以“年月/供应商”为键记录每份对账单的文件路径、明细内容哈希和渲染设置哈希。再次运行时，
+    内容和设置都未变化且文件仍然存在的对账单可以跳过重新生成。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+
+    @classmethod
+    def load(cls, output_root):
+        """读取输出目录下的清单，不存在或损坏时返回空清单"""
+        manifest = cls(os.path.join(output_root, MANIFEST_FILE))
+        if os.path.exists(manifest.path):
+            try:
+                with open(manifest.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('version') == MANIFEST_VERSION:
+                    manifest.entries = dict(data.get('statements', {}))
+            except (OSError, ValueError, AttributeError) as e:
+                logging.warning(f'无法读取输出清单{manifest.path}，将重新生成全部对账单：{e}')
+        return manifest
+
+    def is_current(self, key, content_digest, render_digest):
+        """对账单是否已按相同的内容和设置生成过"""
+        entry = self.entries.get(key)
+        return (
+            entry is not None
+            and entry.get('content') == content_digest
+            and entry.get('settings') == render_digest
+            and os.path.exists(entry.get('file', ''))
+        )
+
+    def output_file(self, key):
+        entry = self.entries.get(key)
+        return entry.get('file') if entry else None
+
+    def record(self, key, output_file, content_digest, render_digest):
+        self.entries[key] = {'file': output_file, 'content': content_digest, 'settings': render_digest}
+
+    def discard(self, key):
+        self.entries.pop(key, None)
+
+    def save(self):
+        """写回清单，先写临时文件再重命名"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_file = f'{self.path}.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump({'version': MANIFEST_VERSION, 'statements': self.entries}, f, ensure_ascii=False, indent=2)
+        os.replace(temp_file, self.path)
@@ -0,0 +1,111 @@
+import hashlib
+import json
+import logging
+import os
+import time
+
+import pandas as pd
+
+from journal_parser import PARSER_VERSION
+
+PARSE_CACHE_DIR = os.path.join('cache', 'parsed')
+
+# 缓存上限：总大小和最长保留天数
+DEFAULT_MAX_BYTES = 500 * 1024 * 1024
+DEFAULT_MAX_AGE_DAYS = 30
+
+
+def file_digest(path, chunk_size=1024 * 1024):
+    """计算文件内容的SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ParseCache:
+    """
+    收货流水解析结果缓存
+
+    以文件内容哈希、解析器版本、列布局和读取方式（流式或整表）为键，保存切分后的明细数据。
+    数据以pandas的pickle格式按列块原样保存，读取时不需要再次解析Excel，分类类型等dtype
+    也与解析结果完全一致。缓存目录只由本程序在本机写入和读取，不要放入来源不明的文件。
+    命中时会更新文件的修改时间，清理时先删除超过保留天数的条目，再按最久未使用的
+    顺序删除，直到总大小不超过上限。
+    """
+
+    def __init__(self, cache_dir=PARSE_CACHE_DIR, parser_version=PARSER_VERSION, max_bytes=DEFAULT_MAX_BYTES,
+                 max_age_days=DEFAULT_MAX_AGE_DAYS):
+        self.cache_dir = cache_dir
+        self.parser_version = parser_version
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+
+    def key_for(self, input_file, layout=None, streaming=False):
+        """缓存键：文件内容哈希 + 解析器版本 + 列布局签名 + 读取方式"""
+        key = f'{file_digest(input_file)}_v{self.parser_version}'
+        if layout is not None:
+            text = json.dumps(layout.to_dict(), sort_keys=True)
+            key += f'_l{hashlib.sha1(text.encode("utf-8")).hexdigest()[:12]}'
+        return f'{key}_{"stream" if streaming else "full"}'
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f'{key}.pkl')
+
+    def get(self, key):
+        """读取缓存，未命中或缓存损坏时返回None"""
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            df = pd.read_pickle(path)
+        except Exception as e:
+            logging.warning(f'解析缓存已损坏，将重新解析：{path}，{e}')
+            self._remove(path)
+            return None
+        os.utime(path, None)
+        return df
+
+    def put(self, key, df):
+        """写入缓存，先写临时文件再重命名"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(key)
+        temp_file = f'{path}.{os.getpid()}.tmp'
+        try:
+            df.to_pickle(temp_file)
+            os.replace(temp_file, path)
+        except OSError as e:
+            logging.warning(f'无法写入解析缓存：{path}，{e}')
+            self._remove(temp_file)
+
+    def prune(self):
+        """按保留天数和总大小清理缓存，返回删除的条目数"""
+        if not os.path.isdir(self.cache_dir):
+            return 0
+
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.endswith('.pkl') and os.path.isfile(path):
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        removed = 0
+        expire_before = time.time() - self.max_age_days * 24 * 3600
+        total_bytes = sum(size for _, size, _ in entries)
+        # 最久未使用的在前
+        for mtime, size, path in sorted(entries):
+            if mtime < expire_before or total_bytes > self.max_bytes:
+                if self._remove(path):
+                    total_bytes -= size
+                    removed += 1
+        return removed
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
@@ -0,0 +1,124 @@
+import logging
+import time
+
+# 进度事件的默认最小间隔（秒），即每秒最多约4次
+DEFAULT_MIN_INTERVAL = 0.25
+
+
+def format_eta(seconds):
+    """将剩余秒数格式化为“约N分N秒”，未知时返回空字符串"""
+    if seconds is None:
+        return ''
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f'约{seconds}秒'
+    minutes, seconds = divmod(seconds, 60)
+    if minutes < 60:
+        return f'约{minutes}分{seconds}秒'
+    hours, minutes = divmod(minutes, 60)
+    return f'约{hours}小时{minutes}分'
+
+
+def format_progress(event):
+    """进度条上显示的文字"""
+    text = f'{event["label"]} {int(event["done"])}/{event["total"]}（{event["percent"]}%）'
+    eta = format_eta(event['eta_seconds'])
+    if eta and event['done'] < event['total']:
+        text = f'{text} 剩余{eta}'
+    return text
+
+
+class ProgressTracker:
+    """
+    合并并限速的进度事件
+
+    每个阶段开始时调用start(stage, total)，之后用update(done)或advance()报告进度，
+    done可以是小数（如已完成的文件数加上当前文件已读取的比例）。
+    同一阶段内两次事件之间至少间隔min_interval秒，中间的更新只保留最新状态；
+    阶段开始和完成的事件总是发送。事件为字典：stage、label、done、total、percent、
+    eta_seconds、stage_index、stage_count。
+
+    日志只记录阶段开始、每完成25%和阶段完成这几个里程碑，不记录每次更新。
+    """
+
+    def __init__(self, callback=None, stage_names=None, min_interval=DEFAULT_MIN_INTERVAL, clock=time.monotonic):
+        self.callback = callback or (lambda event: None)
+        self.stage_names = stage_names or {}
+        self.min_interval = min_interval
+        self.clock = clock
+        self.stage = None
+        self.total = 0
+        self.done = 0
+        self._stage_index = 0
+        self._started = 0.0
+        self._last_emit = None
+        self._next_milestone = 0
+
+    def start(self, stage, total):
+        """开始一个阶段，total为该阶段的工作量（文件数、供应商数等）"""
+        self.stage = stage
+        self.total = max(0, int(total))
+        self.done = 0
+        self._stage_index += 1
+        self._started = self.clock()
+        self._last_emit = None
+        self._next_milestone = 25
+        logging.info(f'开始{self._label()}，共{self.total}项')
+        self._emit()
+
+    def update(self, done, total=None):
+        """报告已完成的数量，total提供时同时修正总数；未到最小间隔时只记录不发送"""
+        if self.stage is None:
+            return
+        if total is not None:
+            self.total = max(0, int(total))
+        self.done = min(done, self.total)
+        if self.done >= self.total:
+            self.finish()
+            return
+        percent = self._percent()
+        if percent >= self._next_milestone:
+            # 一次跨过多个里程碑时只记录一行
+            logging.info(f'{self._label()}进度：{int(self.done)}/{self.total}（{percent}%）')
+            self._next_milestone = (percent // 25 + 1) * 25
+        if self._last_emit is None or self.clock() - self._last_emit >= self.min_interval:
+            self._emit()
+
+    def advance(self, count=1):
+        self.update(self.done + count)
+
+    def finish(self):
+        """阶段完成，总是发送100%的事件"""
+        if self.stage is None:
+            return
+        self.done = self.total
+        logging.info(f'{self._label()}完成，共{self.total}项，耗时{self.clock() - self._started:.2f}秒')
+        self._emit()
+        self.stage = None
+
+    def _label(self):
+        return self.stage_names.get(self.stage, self.stage)
+
+    def _percent(self):
+        return 100 if self.total == 0 else int(self.done * 100 / self.total)
+
+    def _eta(self):
+        if not self.done:
+            return None
+        if self.done >= self.total:
+            return 0.0
+        elapsed = self.clock() - self._started
+        return elapsed / self.done * (self.total - self.done)
+
+    def _emit(self):
+        self._last_emit = self.clock()
+        self.callback({
+            'stage': self.stage,
+            'label': self._label(),
+            'done': self.done,
+            'total': self.total,
+            'percent': self._percent(),
+            'eta_seconds': self._eta(),
+            'stage_index': self._stage_index,
+            'stage_count': len(self.stage_names) or None,
+        })
@@ -0,0 +1,189 @@
+import logging
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from journal_parser import DETAIL_COLUMNS, categorize_columns, format_receipt_date
+
+# 清洗后收货明细的本地数据库
+RECEIPT_STORE_FILE = os.path.join('data', 'receipts.sqlite3')
+
+# 数据库结构版本，表结构变化时需要增加，旧版本的库会被重建
+STORE_VERSION = 1
+
+# 明细列 → 数据库列名
+STORE_COLUMNS = {
+    '收货单号': 'receipt_no',
+    '收货日期': 'receipt_date',
+    '商品名称': 'product',
+    '实收数量': 'quantity',
+    '基本单位': 'unit',
+    '单价': 'price',
+    '小计金额': 'amount',
+    '税额': 'tax',
+    '税率': 'tax_rate',
+    '小计价税': 'total',
+    '部门': 'department',
+    '供应商名称': 'supplier',
+}
+NUMERIC_COLUMNS = ['实收数量', '单价', '小计金额', '税额', '税率', '小计价税']
+
+# line_no为明细在收货单内的顺序，读取时按它还原流水中的顺序
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS receipt_lines (
+    receipt_no TEXT NOT NULL,
+    line_no INTEGER NOT NULL,
+    {', '.join(f'{name} {"REAL" if column in NUMERIC_COLUMNS else "TEXT"}'
+               for column, name in STORE_COLUMNS.items() if name != 'receipt_no')},
+    source_file TEXT,
+    imported_at TEXT,
+    PRIMARY KEY (receipt_no, line_no)
+);
+CREATE INDEX IF NOT EXISTS idx_receipt_lines_supplier ON receipt_lines (supplier, receipt_date);
+CREATE INDEX IF NOT EXISTS idx_receipt_lines_date ON receipt_lines (receipt_date);
+"""
+
+
+def normalize_date_bound(value):
+    """将日期范围的边界统一为收货日期的文本格式，None表示不限"""
+    if value is None or value == '':
+        return None
+    try:
+        return format_receipt_date(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'无法识别的日期：{value}')
+
+
+class ReceiptStore:
+    """
+    清洗后收货明细的本地数据库（SQLite）
+
+    每次处理后写入规范化后的明细，之后可以不重新解析收货流水，直接按供应商和
+    日期范围读出明细重新生成对账单。收货单号为去重的单位：再次导入包含相同
+    收货单号的流水时，库中该收货单的明细整单替换为新导入的明细。
+
+    连接只能在创建它的线程中使用。
+    """
+
+    def __init__(self, path=RECEIPT_STORE_FILE):
+        self.path = path
+        self._conn = None
+
+    def open(self):
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            version = self._conn.execute('PRAGMA user_version').fetchone()[0]
+            if version != STORE_VERSION:
+                if version:
+                    logging.warning(f'收货明细库版本{version}与当前版本{STORE_VERSION}不一致，已重建')
+                self._conn.execute('DROP TABLE IF EXISTS receipt_lines')
+                self._conn.executescript(_SCHEMA)
+                self._conn.execute(f'PRAGMA user_version={STORE_VERSION}')
+        return self
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def upsert(self, details, sources=None):
+        """
+        写入清洗后的明细
+
+        库中已有的收货单整单替换；sources为与details等长的来源文件名，同一收货单号出现在
+        本批多个来源文件中时只保留最后一个文件中的明细。
+
+        Returns:
+            dict: receipts（写入的收货单数）、lines（写入的明细数）、replaced（被替换的收货单数）
+        """
+        self.open()
+        frame = details[DETAIL_COLUMNS].reset_index(drop=True)
+        sources = np.full(len(frame), None, dtype=object) if sources is None else np.asarray(sources, dtype=object)
+        receipt_numbers = frame['收货单号'].astype(str)
+        if len(frame) and len(set(sources)) > 1:
+            last_source = pd.Series(sources).groupby(receipt_numbers.values, sort=False).transform('last')
+            keep = (last_source.values == sources)
+            frame, sources, receipt_numbers = frame[keep], sources[keep], receipt_numbers[keep]
+        line_numbers = receipt_numbers.groupby(receipt_numbers.values, sort=False).cumcount()
+
+        # 分类类型和空值统一转为Python对象，空值写为NULL
+        values = frame.astype(object).where(frame.notna(), None)
+        values['收货单号'] = receipt_numbers.values
+        imported_at = pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')
+        rows = zip(receipt_numbers.values, line_numbers.values.tolist(),
+                   *(values[column].values for column in DETAIL_COLUMNS[1:]), sources, [imported_at] * len(frame))
+        names = ['receipt_no', 'line_no'] + [STORE_COLUMNS[column] for column in DETAIL_COLUMNS[1:]]
+        names += ['source_file', 'imported_at']
+        unique_receipts = pd.unique(receipt_numbers.values)
+
+        with self._conn:
+            self._conn.execute('CREATE TEMP TABLE IF NOT EXISTS incoming (receipt_no TEXT PRIMARY KEY)')
+            self._conn.execute('DELETE FROM incoming')
+            self._conn.executemany('INSERT INTO incoming VALUES (?)', ((receipt,) for receipt in unique_receipts))
+            replaced = self._conn.execute('SELECT COUNT(*) FROM incoming WHERE receipt_no IN '
+                                          '(SELECT receipt_no FROM receipt_lines)').fetchone()[0]
+            self._conn.execute('DELETE FROM receipt_lines WHERE receipt_no IN (SELECT receipt_no FROM incoming)')
+            self._conn.executemany(
+                f'INSERT INTO receipt_lines ({", ".join(names)}) VALUES ({", ".join("?" * len(names))})', rows)
+            self._conn.execute('DELETE FROM incoming')
+        return {'receipts': len(unique_receipts), 'lines': len(frame), 'replaced': replaced}
+
+    def load(self, suppliers=None, date_from=None, date_to=None):
+        """
+        按供应商和收货日期范围读出明细，列与清洗后的明细相同
+
+        suppliers为None时不限供应商；date_from、date_to为包含在内的日期边界，None表示不限。
+        同一收货单内的明细保持导入时的顺序。
+        """
+        self.open()
+        conditions, params = [], []
+        if suppliers is not None:
+            suppliers = list(suppliers)
+            conditions.append(f'supplier IN ({", ".join("?" * len(suppliers))})')
+            params.extend(suppliers)
+        date_from, date_to = normalize_date_bound(date_from), normalize_date_bound(date_to)
+        if date_from is not None:
+            conditions.append('receipt_date >= ?')
+            params.append(date_from)
+        if date_to is not None:
+            conditions.append('receipt_date <= ?')
+            params.append(date_to)
+        where = f'WHERE {" AND ".join(conditions)}' if conditions else ''
+        cursor = self._conn.execute(
+            f'SELECT {", ".join(STORE_COLUMNS.values())} FROM receipt_lines {where} '
+            f'ORDER BY supplier, receipt_date, receipt_no, line_no', params)
+        rows = cursor.fetchall()
+
+        # 逐列构造，文本列的NULL还原为NaN，与解析结果一致
+        columns = list(zip(*rows)) if rows else [()] * len(DETAIL_COLUMNS)
+        data = {}
+        for column, values in zip(DETAIL_COLUMNS, columns):
+            if column in NUMERIC_COLUMNS:
+                data[column] = np.array([np.nan if value is None else value for value in values], dtype=float)
+            else:
+                data[column] = np.array([np.nan if value is None else value for value in values], dtype=object)
+        return categorize_columns(pd.DataFrame(data, columns=DETAIL_COLUMNS))
+
+    def suppliers(self):
+        """库中所有供应商名称"""
+        self.open()
+        return [row[0] for row in self._conn.execute(
+            'SELECT DISTINCT supplier FROM receipt_lines WHERE supplier IS NOT NULL ORDER BY supplier')]
+
+    def count(self):
+        """库中的明细条数"""
+        self.open()
+        return self._conn.execute('SELECT COUNT(*) FROM receipt_lines').fetchone()[0]
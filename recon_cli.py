@@ -0,0 +1,164 @@
+import argparse
+import logging
+import multiprocessing
+import os
+import sys
+
+from backup_writer import BACKUP_FORMATS, BACKUP_ROOT, DEFAULT_BACKUP_FORMAT
+from log_setup import setup_logging
+from progress import format_progress
+from receipt_store import RECEIPT_STORE_FILE, normalize_date_bound
+from recon_pipeline import REGENERATE_STAGE_NAMES, STAGE_NAMES, regenerate_statements, run_pipeline
+from run_metrics import RunMetrics, report_path_for
+from statement_writer import OUTPUT_ROOT
+
+# 退出码
+EXIT_OK = 0
+EXIT_ERROR = 1
+EXIT_USAGE = 2  # argparse参数错误
+EXIT_PARTIAL = 3  # 部分供应商对账单生成失败
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description='MC对账明细工具（命令行版）：处理收货流水并生成供应商对账明细')
+    parser.add_argument('input_files', nargs='*', help='收货流水文件（.xls/.xlsx），--regenerate时不需要')
+    parser.add_argument('--output-root', default=OUTPUT_ROOT, help=f'对账单输出根目录（默认：{OUTPUT_ROOT}）')
+    parser.add_argument('--backup-root', default=BACKUP_ROOT, help=f'清洗后数据的备份目录（默认：{BACKUP_ROOT}）')
+    parser.add_argument('--backup-format', choices=list(BACKUP_FORMATS), default=DEFAULT_BACKUP_FORMAT,
+                        help=f'备份格式（默认：{DEFAULT_BACKUP_FORMAT}，即gzip压缩的CSV）')
+    parser.add_argument('--parse-workers', type=int, default=None, help='解析进程数，1表示串行（默认自动）')
+    parser.add_argument('--render-workers', type=int, default=None, help='生成对账单的进程数，1表示串行（默认自动）')
+    parser.add_argument('--no-parse-cache', action='store_true', help='不使用解析缓存')
+    parser.add_argument('--stream', dest='streaming', action='store_true', default=None,
+                        help='逐行流式解析输入文件，降低读取时的内存峰值（默认按文件大小自动选择）')
+    parser.add_argument('--no-stream', dest='streaming', action='store_false', help='一次读入整个文件再解析')
+    parser.add_argument('--force', action='store_true', help='忽略输出清单，重新生成所有对账单')
+    parser.add_argument('--store-file', default=RECEIPT_STORE_FILE,
+                        help=f'收货明细库（默认：{RECEIPT_STORE_FILE}）')
+    parser.add_argument('--no-store', action='store_true', help='不把清洗后的明细写入收货明细库')
+    parser.add_argument('--regenerate', action='store_true',
+                        help='不解析收货流水，直接从收货明细库重新生成对账单')
+    parser.add_argument('--supplier', dest='suppliers', action='append', default=None,
+                        help='--regenerate时只生成该供应商的对账单，可重复指定（默认：所有供应商）')
+    parser.add_argument('--from', dest='date_from', default=None, help='--regenerate时的起始收货日期，如2025-07-01')
+    parser.add_argument('--to', dest='date_to', default=None, help='--regenerate时的截止收货日期，如2025-07-31')
+    parser.add_argument('--log-dir', default='logs', help='日志目录（默认：logs）')
+    parser.add_argument('-q', '--quiet', action='store_true', help='不输出处理进度')
+    return parser
+
+
+def print_progress(event):
+    """在终端同一行刷新进度，阶段完成时换行"""
+    end = '\n' if event['done'] >= event['total'] else ''
+    print(f'\r{format_progress(event)}\033[K', end=end, flush=True)
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    if args.regenerate:
+        if args.input_files:
+            print('--regenerate时不需要输入文件', file=sys.stderr)
+            return EXIT_USAGE
+        try:
+            args.date_from, args.date_to = normalize_date_bound(args.date_from), normalize_date_bound(args.date_to)
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return EXIT_USAGE
+        log_manager = setup_logging(args.log_dir, app_prefix=None, console=False)
+        with log_manager.run('regenerate') as run_log:
+            return _regenerate(args, run_log)
+    if not args.input_files:
+        print('请指定收货流水文件，或使用--regenerate从收货明细库重新生成', file=sys.stderr)
+        return EXIT_USAGE
+
+    missing = [path for path in args.input_files if not os.path.isfile(path)]
+    if missing:
+        print(f'找不到输入文件：{"、".join(missing)}', file=sys.stderr)
+        return EXIT_USAGE
+
+    # 日志只写入文件，控制台输出由进度回调负责
+    log_manager = setup_logging(args.log_dir, app_prefix=None, console=False)
+    with log_manager.run('cli') as run_log:
+        logging.info(f'输入文件：{"、".join(args.input_files)}')
+        return _run(args, run_log)
+
+
+def _run(args, run_log):
+    notify = None if args.quiet else print
+    # 输出被重定向时不刷新进度行
+    progress = print_progress if not args.quiet and sys.stdout.isatty() else None
+
+    try:
+        result = run_pipeline(
+            args.input_files,
+            output_root=args.output_root,
+            backup_root=args.backup_root,
+            backup_format=args.backup_format,
+            parse_workers=args.parse_workers,
+            render_workers=args.render_workers,
+            use_parse_cache=not args.no_parse_cache,
+            force_rebuild=args.force,
+            streaming=args.streaming,
+            store_file=None if args.no_store else args.store_file,
+            notify=notify,
+            progress=progress,
+            metrics=RunMetrics(run_id=run_log.run_id),
+        )
+    except Exception as e:
+        logging.exception('处理过程中出现错误')
+        print(f'处理过程中出现错误：{e}（日志：{run_log.log_file}）', file=sys.stderr)
+        return EXIT_ERROR
+
+    return _print_result(result, run_log, STAGE_NAMES)
+
+
+def _regenerate(args, run_log):
+    notify = None if args.quiet else print
+    progress = print_progress if not args.quiet and sys.stdout.isatty() else None
+    logging.info(f'从收货明细库重新生成：供应商{"、".join(args.suppliers) if args.suppliers else "全部"}，'
+                 f'日期{args.date_from or "不限"}至{args.date_to or "不限"}')
+
+    try:
+        result = regenerate_statements(
+            suppliers=args.suppliers,
+            date_from=args.date_from,
+            date_to=args.date_to,
+            output_root=args.output_root,
+            store_file=args.store_file,
+            render_workers=args.render_workers,
+            notify=notify,
+            progress=progress,
+            metrics=RunMetrics(run_id=run_log.run_id),
+        )
+    except Exception as e:
+        logging.exception('重新生成对账单时出现错误')
+        print(f'重新生成对账单时出现错误：{e}（日志：{run_log.log_file}）', file=sys.stderr)
+        return EXIT_ERROR
+
+    return _print_result(result, run_log, REGENERATE_STAGE_NAMES)
+
+
+def _print_result(result, run_log, stage_names):
+    """输出处理结果、各阶段摘要和运行报告路径，返回退出码"""
+    render_report = result['render_report']
+    failed = [item for item in render_report if not item['success']]
+    skipped = [item for item in render_report if item['skipped']]
+
+    suppliers = len({item['supplier'] for item in render_report})
+    print(f'共整理{result["records"]}条记录，供应商{suppliers}个，对账单{len(render_report)}份：'
+          f'生成{len(render_report) - len(failed) - len(skipped)}份，跳过{len(skipped)}份，失败{len(failed)}份')
+    for line in result['metrics'].summary_lines(stage_names):
+        print(f'  {line}')
+    report_file = result['metrics'].write_report(report_path_for(run_log.log_file))
+    print(f'运行报告：{report_file}')
+    for item in failed:
+        print(f'生成失败：{item["supplier"]}（{item["year_month"]}），{item["error"]}', file=sys.stderr)
+
+    return EXIT_PARTIAL if failed else EXIT_OK
+
+
+if __name__ == '__main__':
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,244 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+from backup_writer import BACKUP_ROOT, DEFAULT_BACKUP_FORMAT, BackupWriter
+from journal_parser import categorize_columns, parse_journals
+from parse_cache import ParseCache
+from progress import ProgressTracker
+from receipt_store import RECEIPT_STORE_FILE, ReceiptStore
+from run_metrics import RunMetrics
+from statement_grouping import group_suppliers
+from statement_writer import OUTPUT_ROOT, render_statements
+from supplier_names import SupplierNormalizer
+
+# 各阶段的显示名称
+STAGE_NAMES = {
+    'parse': '解析',
+    'normalize': '供应商名称规范化',
+    'store': '写入明细库',
+    'group': '按供应商分组',
+    'render': '生成对账单',
+    'backup': '备份',
+}
+
+# 从明细库重新生成对账单时各阶段的显示名称
+REGENERATE_STAGE_NAMES = {
+    'load': '读取明细库',
+    'group': '按供应商分组',
+    'render': '生成对账单',
+}
+
+
+def run_pipeline(input_files, output_root=OUTPUT_ROOT, backup_root=BACKUP_ROOT, parse_workers=None,
+                 render_workers=None, use_parse_cache=True, force_rebuild=False, notify=None, metrics=None,
+                 progress=None, streaming=None, backup_format=DEFAULT_BACKUP_FORMAT, store_file=RECEIPT_STORE_FILE):
+    """
+    处理收货流水并生成供应商对账明细
+
+    不依赖Qt，图形界面和命令行共用。出错时直接抛出异常，由调用方处理。
+
+    Args:
+        input_files: 收货流水文件路径列表
+        output_root: 对账单输出根目录
+        backup_root: 清洗后数据的备份目录
+        parse_workers: 解析进程数，None表示自动选择，1表示串行
+        render_workers: 生成对账单的进程数，None表示自动选择，1表示串行
+        use_parse_cache: 是否使用按文件内容缓存的解析结果
+        force_rebuild: 是否忽略输出清单，重新生成所有对账单
+        notify: 里程碑消息回调（文件读取完成、供应商名称合并、失败等）
+        progress: 结构化进度事件回调，事件格式见ProgressTracker，每秒最多几次
+        metrics: 记录各阶段、文件和供应商指标的RunMetrics，为None时新建
+        streaming: 是否逐行流式解析输入文件，None表示按文件大小自动选择
+        backup_format: 备份格式（见backup_writer.BACKUP_FORMATS），备份在后台线程中与生成对账单同时写入
+        store_file: 收货明细库的路径，清洗后的明细按收货单号去重写入，为None时不写入
+
+    Returns:
+        dict: records（明细条数）、render_report（每个供应商的生成结果）、
+              backup_file（备份文件路径）、timings（各阶段耗时，秒）、metrics（RunMetrics）
+    """
+    notify = notify or (lambda message: None)
+    metrics = metrics or RunMetrics()
+    tracker = ProgressTracker(progress, STAGE_NAMES)
+
+    def report(message):
+        logging.info(message)
+        notify(message)
+
+    # 解析所有输入文件（文件较多时使用多进程）
+    with metrics.stage('parse') as stage:
+        parse_cache = ParseCache() if use_parse_cache else None
+        file_stats = []
+        tracker.start('parse', len(input_files))
+        file_frames = parse_journals(input_files, workers=parse_workers, notify=report, cache=parse_cache,
+                                     file_stats=file_stats, on_progress=tracker.update, streaming=streaming)
+        for stats in file_stats:
+            metrics.record_file(stats['file'], stats['rows'], stats['seconds'], stats['memory_delta'],
+                                stats['cached'])
+        if parse_cache is not None:
+            removed = parse_cache.prune()
+            if removed:
+                logging.info(f'已清理{removed}个过期的解析缓存')
+        all_final_data = [file_df for file_df in file_frames if not file_df.empty]
+
+        # 合并所有文件的数据，并记录每行的来源文件
+        final_df = pd.concat(all_final_data, ignore_index=True)
+        row_sources = np.repeat(np.asarray(input_files, dtype=object), [len(file_df) for file_df in file_frames])
+        stage['rows'] = len(final_df)
+
+    # 统一规范化供应商名称，每个不同的原始名称只处理一次
+    with metrics.stage('normalize') as stage:
+        stage['rows'] = len(final_df)
+        tracker.start('normalize', 1)
+        supplier_normalizer = SupplierNormalizer().load()
+        final_df['供应商名称'] = supplier_normalizer.normalize_series(final_df['供应商名称'])
+        # 多个文件合并后分类类型会退化为普通文本，规范化后统一转换
+        final_df = categorize_columns(final_df)
+        report(f'所有文件处理完成，共整理{len(final_df)}条记录')
+
+        # 保存供应商名称缓存并报告被合并的名称，之前的运行已报告过的合并只记录调试日志
+        new_variants = supplier_normalizer.collapsed_variants(new_only=True)
+        supplier_normalizer.save()
+        for canonical, raw_names in supplier_normalizer.collapsed_variants().items():
+            if canonical in new_variants:
+                report(f'供应商名称合并：{canonical} ← {"、".join(raw_names)}')
+            else:
+                logging.debug(f'供应商名称合并：{canonical} ← {"、".join(raw_names)}')
+        tracker.finish()
+
+    # 记录本次解析中文本格式化缓存的命中情况（包括子进程中解析的文件）
+    cache_info = {key: sum(stats['text_cache'][key] for stats in file_stats) for key in ('hits', 'misses', 'rows')}
+    if cache_info['rows']:
+        logging.info(f'文本格式化缓存：命中{cache_info["hits"]}次，未命中{cache_info["misses"]}次，'
+                     f'共格式化{cache_info["rows"]}个单元格')
+
+    # 备份与分组、生成对账单同时进行，之后不再修改final_df
+    backup_writer = BackupWriter(final_df, backup_root, backup_format).start()
+
+    # 写入收货明细库，之后可以直接从库中重新生成对账单
+    with metrics.stage('store') as stage:
+        stage['rows'] = len(final_df)
+        tracker.start('store', 1)
+        if store_file is not None:
+            with ReceiptStore(store_file) as store:
+                stored = store.upsert(final_df, row_sources)
+            logging.info(f'已写入收货明细库：{stored["receipts"]}张收货单，{stored["lines"]}条明细，'
+                         f'其中{stored["replaced"]}张收货单替换了库中已有的明细')
+        tracker.finish()
+
+    render_report = _group_and_render(final_df, output_root, render_workers, force_rebuild, notify, metrics, tracker)
+
+    # 备份阶段的耗时为生成对账单后仍需等待的时间，与行数无关，不计算每秒行数
+    with metrics.stage('backup'):
+        tracker.start('backup', 1)
+        backup_file = backup_writer.wait()
+        tracker.finish()
+    logging.info(f'后台备份耗时{backup_writer.seconds:.2f}秒')
+
+    for line in metrics.summary_lines(STAGE_NAMES):
+        logging.info(f'阶段指标：{line}')
+
+    return {
+        'records': len(final_df),
+        'render_report': render_report,
+        'backup_file': backup_file,
+        'timings': metrics.timings(),
+        'metrics': metrics,
+    }
+
+
+def regenerate_statements(suppliers=None, date_from=None, date_to=None, output_root=OUTPUT_ROOT,
+                          store_file=RECEIPT_STORE_FILE, render_workers=None, notify=None, metrics=None,
+                          progress=None):
+    """
+    不解析收货流水，直接从收货明细库读出明细重新生成对账单
+
+    选中的供应商总是重新生成，并更新输出清单，之后的正常处理会按清单判断是否需要覆盖。
+
+    Args:
+        suppliers: 供应商名称列表，None表示库中所有供应商
+        date_from: 起始收货日期（包含），None表示不限
+        date_to: 截止收货日期（包含），None表示不限
+        output_root: 对账单输出根目录
+        store_file: 收货明细库的路径
+        render_workers: 生成对账单的进程数，None表示自动选择，1表示串行
+        notify: 里程碑消息回调
+        metrics: 记录各阶段指标的RunMetrics，为None时新建
+        progress: 结构化进度事件回调
+
+    Returns:
+        dict: records（明细条数）、render_report、timings、metrics，与run_pipeline相同
+    """
+    notify = notify or (lambda message: None)
+    metrics = metrics or RunMetrics()
+    tracker = ProgressTracker(progress, REGENERATE_STAGE_NAMES)
+
+    def report(message, level=logging.INFO):
+        logging.log(level, message)
+        notify(message)
+
+    with metrics.stage('load') as stage:
+        tracker.start('load', 1)
+        with ReceiptStore(store_file) as store:
+            final_df = store.load(suppliers, date_from, date_to)
+        stage['rows'] = len(final_df)
+        tracker.finish()
+    report(f'从收货明细库读取{len(final_df)}条记录')
+    if suppliers is not None:
+        missing = sorted(set(suppliers) - set(final_df['供应商名称'].dropna()))
+        if missing:
+            report(f'收货明细库中没有以下供应商在所选日期范围内的记录：{"、".join(missing)}', logging.WARNING)
+
+    render_report = _group_and_render(final_df, output_root, render_workers, True, notify, metrics, tracker)
+
+    for line in metrics.summary_lines(REGENERATE_STAGE_NAMES):
+        logging.info(f'阶段指标：{line}')
+
+    return {
+        'records': len(final_df),
+        'render_report': render_report,
+        'timings': metrics.timings(),
+        'metrics': metrics,
+    }
+
+
+def _group_and_render(final_df, output_root, render_workers, force, notify, metrics, tracker):
+    """按供应商分组并生成对账单，记录每个供应商的指标并报告结果，返回render_statements的结果"""
+    def report(message):
+        logging.info(message)
+        notify(message)
+
+    # 整体排序一次后按供应商和月份切分，同时算出各组的汇总
+    with metrics.stage('group') as stage:
+        stage['rows'] = len(final_df)
+        tracker.start('group', 1)
+        groups = group_suppliers(final_df)
+        tracker.finish()
+
+    # 生成对账明细表，每个供应商每个月一份
+    with metrics.stage('render') as stage:
+        stage['rows'] = len(final_df)
+        tracker.start('render', len(groups))
+        render_report = render_statements(final_df, output_root, workers=render_workers, notify=notify,
+                                          force=force, on_progress=tracker.update, groups=groups)
+        tracker.finish()
+    for result in render_report:
+        status = 'skipped' if result['skipped'] else 'rendered' if result['success'] else 'failed'
+        metrics.record_supplier(result['supplier'], result['rows'], result['seconds'], result['memory_delta'],
+                                status, result['year_month'])
+        if result['skipped']:
+            logging.debug(f'供应商对账单未变化，已跳过：{result["file"]}')
+        elif result['success']:
+            logging.debug(f'已生成供应商对账单：{result["file"]}')
+        else:
+            logging.error(f'供应商对账单生成失败：{result["supplier"]}（{result["year_month"]}），{result["error"]}')
+    skipped_count = sum(1 for result in render_report if result['skipped'])
+    rendered_count = sum(1 for result in render_report if result['success'] and not result['skipped'])
+    report(f'已生成{rendered_count}份供应商对账单')
+    if skipped_count:
+        report(f'共{skipped_count}份供应商对账单未变化，已跳过')
+    failed_count = sum(1 for result in render_report if not result['success'])
+    if failed_count:
+        report(f'共{failed_count}份供应商对账单生成失败，请查看日志')
+    return render_report
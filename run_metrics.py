@@ -0,0 +1,201 @@
+import json
+import os
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+
+def _windows_memory_counters():
+    import ctypes
+    from ctypes import wintypes
+
+    class ProcessMemoryCounters(ctypes.Structure):
+        _fields_ = [
+            ('cb', wintypes.DWORD),
+            ('PageFaultCount', wintypes.DWORD),
+            ('PeakWorkingSetSize', ctypes.c_size_t),
+            ('WorkingSetSize', ctypes.c_size_t),
+            ('QuotaPeakPagedPoolUsage', ctypes.c_size_t),
+            ('QuotaPagedPoolUsage', ctypes.c_size_t),
+            ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+            ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+            ('PagefileUsage', ctypes.c_size_t),
+            ('PeakPagefileUsage', ctypes.c_size_t),
+        ]
+
+    counters = ProcessMemoryCounters()
+    counters.cb = ctypes.sizeof(counters)
+    process = ctypes.windll.kernel32.GetCurrentProcess()
+    if not ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+        return None
+    return counters
+
+
+def peak_memory_bytes():
+    """
+    当前进程自启动以来的峰值常驻内存（字节），无法获取时返回None
+
+    常驻的工作进程中该值只增不减，不能反映某个阶段或某次处理的内存占用，见current_memory_bytes。
+    """
+    try:
+        if sys.platform == 'win32':
+            counters = _windows_memory_counters()
+            return None if counters is None else int(counters.PeakWorkingSetSize)
+
+        import resource
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS以字节为单位，Linux以KB为单位
+        return int(max_rss) if sys.platform == 'darwin' else int(max_rss) * 1024
+    except Exception:
+        return None
+
+
+def current_memory_bytes():
+    """当前进程此刻的常驻内存（字节），无法获取时返回None"""
+    try:
+        if sys.platform == 'win32':
+            counters = _windows_memory_counters()
+            return None if counters is None else int(counters.WorkingSetSize)
+
+        # Linux：/proc/self/statm的第二项为常驻内存页数
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except Exception:
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return int(psutil.Process().memory_info().rss)
+
+
+def _memory_delta(before, after):
+    return None if before is None or after is None else after - before
+
+
+def _rows_per_sec(rows, seconds):
+    if rows is None or not seconds:
+        return None
+    return round(rows / seconds, 1)
+
+
+def _megabytes(value):
+    return None if value is None else round(value / (1024 * 1024), 1)
+
+
+def measure(func, *args, **kwargs):
+    """调用func并返回(结果, 耗时秒数, 调用前后常驻内存的变化字节数)"""
+    memory_before = current_memory_bytes()
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    seconds = time.perf_counter() - start
+    return result, seconds, _memory_delta(memory_before, current_memory_bytes())
+
+
+def report_path_for(log_filename):
+    """运行报告与日志文件放在一起，文件名相同，扩展名为.json"""
+    return f'{os.path.splitext(log_filename)[0]}.json'
+
+
+class RunMetrics:
+    """
+    单次处理的性能指标
+
+    按阶段、输入文件和供应商记录耗时、行数、每秒行数和内存。阶段记录结束时的常驻内存
+    和阶段内的变化量，文件和供应商记录处理前后所在进程（可能是子进程）常驻内存的变化量。
+    运行报告中的process_peak_memory_mb为进程自启动以来的峰值，常驻的工作进程中会包含之前的处理。
+    """
+
+    def __init__(self, run_id=None):
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self.started_at = datetime.now()
+        self._start = time.perf_counter()
+        self.stages = {}
+        self.files = []
+        self.suppliers = []
+
+    @contextmanager
+    def stage(self, name):
+        """
+        记录一个阶段的指标
+
+        with块内可以设置yield出的字典的rows作为该阶段处理的行数，不设置时不计算每秒行数。
+        """
+        entry = {'rows': None}
+        memory_before = current_memory_bytes()
+        start = time.perf_counter()
+        try:
+            yield entry
+        finally:
+            seconds = time.perf_counter() - start
+            memory_after = current_memory_bytes()
+            self.stages[name] = {
+                'seconds': round(seconds, 4),
+                'rows': entry['rows'],
+                'rows_per_sec': _rows_per_sec(entry['rows'], seconds),
+                'memory_mb': _megabytes(memory_after),
+                'memory_delta_mb': _megabytes(_memory_delta(memory_before, memory_after)),
+            }
+
+    def record_file(self, input_file, rows, seconds, memory_delta=None, cached=False):
+        self.files.append({
+            'file': input_file,
+            'rows': rows,
+            'seconds': round(seconds, 4),
+            'rows_per_sec': _rows_per_sec(rows, seconds),
+            'memory_delta_mb': _megabytes(memory_delta),
+            'cached': cached,
+        })
+
+    def record_supplier(self, supplier, rows, seconds, memory_delta=None, status='rendered', year_month=None):
+        self.suppliers.append({
+            'supplier': supplier,
+            'year_month': year_month,
+            'rows': rows,
+            'seconds': round(seconds, 4),
+            'rows_per_sec': _rows_per_sec(rows, seconds),
+            'memory_delta_mb': _megabytes(memory_delta),
+            'status': status,
+        })
+
+    def timings(self):
+        """各阶段耗时（秒）"""
+        return {name: stage['seconds'] for name, stage in self.stages.items()}
+
+    def to_dict(self):
+        total_seconds = time.perf_counter() - self._start
+        return {
+            'run_id': self.run_id,
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'total_seconds': round(total_seconds, 4),
+            'process_peak_memory_mb': _megabytes(peak_memory_bytes()),
+            'stages': self.stages,
+            'files': self.files,
+            'suppliers': sorted(self.suppliers, key=lambda item: item['seconds'], reverse=True),
+        }
+
+    def write_report(self, path):
+        """写入JSON运行报告，先写临时文件再重命名，返回报告路径"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_file = f'{path}.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        os.replace(temp_file, path)
+        return path
+
+    def summary_lines(self, stage_names=None):
+        """每个阶段一行的摘要，stage_names为阶段的显示名称"""
+        stage_names = stage_names or {}
+        lines = []
+        for name, stage in self.stages.items():
+            parts = [f'{stage_names.get(name, name)}：{stage["seconds"]:.2f}秒']
+            if stage['rows_per_sec'] is not None:
+                parts.append(f'{stage["rows"]}行，{stage["rows_per_sec"]:.0f}行/秒')
+            if stage['memory_mb'] is not None:
+                parts.append(f'内存{stage["memory_mb"]:.0f}MB（{stage["memory_delta_mb"]:+.0f}MB）')
+            lines.append('，'.join(parts))
+        return lines
@@ -0,0 +1,136 @@
+import contextvars
+import importlib
+import logging
+import os
+import sys
+import threading
+import time
+
+# 窗口显示后在后台预热导入的数据处理模块，按依赖顺序排列，
+# 每个模块的耗时不包含已由前面的模块导入的依赖
+WARMUP_MODULES = ['numpy', 'pandas', 'openpyxl', 'recon_pipeline']
+
+# 启动里程碑的显示名称
+STARTUP_MARK_NAMES = {
+    'qt_imported': '导入PyQt5',
+    'logging_ready': '日志初始化',
+    'app_created': '创建QApplication',
+    'window_shown': '窗口显示',
+    'data_ready': '数据处理模块就绪',
+}
+
+
+def process_age_seconds():
+    """当前进程从创建到现在的秒数（包含打包程序解压和解释器启动），无法获取时返回None"""
+    try:
+        if sys.platform == 'win32':
+            import ctypes
+            from ctypes import wintypes
+
+            creation, exit_time, kernel, user, now = (wintypes.FILETIME() for _ in range(5))
+            process = ctypes.windll.kernel32.GetCurrentProcess()
+            if not ctypes.windll.kernel32.GetProcessTimes(process, ctypes.byref(creation), ctypes.byref(exit_time),
+                                                          ctypes.byref(kernel), ctypes.byref(user)):
+                return None
+            ctypes.windll.kernel32.GetSystemTimeAsFileTime(ctypes.byref(now))
+
+            def ticks(filetime):
+                return (filetime.dwHighDateTime << 32) | filetime.dwLowDateTime
+
+            # FILETIME以100纳秒为单位
+            return (ticks(now) - ticks(creation)) / 1e7
+
+        if os.path.exists('/proc/self/stat'):
+            with open('/proc/self/stat') as f:
+                # 进程名可能含空格，从最后一个右括号之后开始数，starttime为第22个字段
+                start_ticks = int(f.read().rsplit(')', 1)[1].split()[19])
+            with open('/proc/uptime') as f:
+                uptime = float(f.read().split()[0])
+            return uptime - start_ticks / os.sysconf('SC_CLK_TCK')
+        return None
+    except Exception:
+        return None
+
+
+class StartupTimer:
+    """
+    启动耗时记录
+
+    mark(name)记录从创建计时器到该时刻的秒数；start_warmup()在后台线程中依次导入
+    数据处理模块，记录每个模块的导入耗时，完成后把启动耗时报告写入应用日志。
+    计时器应在程序入口模块导入标准库之后立即创建。
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.origin = clock()
+        # 计时器创建前进程已经运行的时间（打包程序解压、解释器启动等）
+        self.preload_seconds = process_age_seconds()
+        self.marks = {}
+        self.imports = {}
+        self.error = None
+        # 程序版本，写入启动耗时报告
+        self.version = None
+        self.ready = threading.Event()
+        self._thread = None
+
+    def mark(self, name):
+        """记录一个启动里程碑"""
+        self.marks[name] = self.clock() - self.origin
+
+    def import_modules(self, modules=WARMUP_MODULES):
+        """依次导入模块并记录每个模块的耗时，已导入的模块记为0"""
+        for name in modules:
+            start = self.clock()
+            importlib.import_module(name)
+            self.imports[name] = self.clock() - start
+
+    def start_warmup(self, modules=WARMUP_MODULES, version=None):
+        """在后台线程中预热导入数据处理模块，不阻塞界面"""
+        self.version = version
+        # 在当前上下文的副本中运行，后台线程的日志与启动日志一致
+        context = contextvars.copy_context()
+        self._thread = threading.Thread(target=context.run, args=(self._warmup, modules), name='import-warmup',
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def _warmup(self, modules):
+        try:
+            self.import_modules(modules)
+        except Exception as e:
+            self.error = e
+            logging.warning(f'预热导入数据处理模块失败，将在开始处理时导入：{e}')
+            self.ready.set()
+            self.log_report()
+            return
+        self.finish_warmup()
+
+    def finish_warmup(self, imports=None):
+        """预热完成：记录就绪时间并写入启动耗时报告，imports为在其他进程中预热时各模块的导入耗时"""
+        if imports is not None:
+            self.imports = dict(imports)
+        self.mark('data_ready')
+        self.ready.set()
+        self.log_report()
+
+    def wait_ready(self, timeout=None):
+        """等待预热导入完成，返回是否已完成"""
+        return self.ready.wait(timeout)
+
+    def report_lines(self):
+        """启动耗时报告，每个里程碑和每个预热模块一行"""
+        lines = []
+        if self.preload_seconds is not None:
+            lines.append(f'进程启动至入口模块：{self.preload_seconds:.2f}秒')
+        for name, seconds in sorted(self.marks.items(), key=lambda item: item[1]):
+            lines.append(f'{STARTUP_MARK_NAMES.get(name, name)}：{seconds:.2f}秒')
+        for name, seconds in self.imports.items():
+            lines.append(f'导入{name}：{seconds:.2f}秒')
+        return lines
+
+    def log_report(self):
+        """把启动耗时报告写入日志，行首统一为“启动耗时”，便于跨版本比较"""
+        prefix = f'启动耗时（v{self.version}）' if self.version else '启动耗时'
+        for line in self.report_lines():
+            logging.info(f'{prefix}：{line}')
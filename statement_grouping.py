@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+
+# 对账单中明细的排列顺序
+SORT_COLUMNS = ['收货日期', '收货单号']
+# 合计行汇总的金额列
+SUMMARY_COLUMNS = ['小计金额', '税额', '小计价税']
+
+
+class SupplierGroup:
+    """
+    一个供应商一个月的对账明细及预先计算的汇总
+
+    data为已按收货日期和收货单号排序的明细；由group_suppliers生成时是全局排序结果中
+    连续的一段切片，不复制数据。first_date、last_date为最早和最晚的收货日期（空值除外），
+    totals为各金额列的合计，year_month为对账单所属的年月（YYYYMM）。
+    """
+
+    def __init__(self, supplier, data, first_date, last_date, totals, year_month):
+        self.supplier = supplier
+        self.data = data
+        self.first_date = first_date
+        self.last_date = last_date
+        self.totals = totals
+        self.year_month = year_month
+
+    @property
+    def rows(self):
+        return len(self.data)
+
+    @property
+    def key(self):
+        """对账单在输出清单中的键：年月/供应商名称"""
+        return f'{self.year_month}/{self.supplier}'
+
+    def summary_record(self):
+        """合计行：收货单号列为“合计”，金额列为合计值，其余列为空"""
+        record = {column: '' for column in self.data.columns}
+        record['收货单号'] = '合计'
+        record.update(self.totals)
+        return record
+
+
+def year_month_keys(dates):
+    """每行收货日期所属的年月（YYYYMM），每个不同的日期只解析一次，空值为NaN"""
+    codes, uniques = pd.factorize(dates)
+    months = pd.to_datetime(pd.Index(uniques)).strftime('%Y%m')
+    return np.append(np.asarray(months, dtype=object), np.nan)[codes]
+
+
+def supplier_group(supplier, supplier_data):
+    """由单个供应商的明细（顺序不限）生成SupplierGroup，年月取最早的收货日期，不按月份拆分"""
+    data = supplier_data.sort_values(SORT_COLUMNS)
+    dates = data['收货日期'].dropna()
+    first_date = dates.iloc[0] if len(dates) else np.nan
+    return SupplierGroup(supplier, data, first_date,
+                         dates.iloc[-1] if len(dates) else np.nan,
+                         {column: data[column].sum() for column in SUMMARY_COLUMNS},
+                         year_month_keys(pd.Series([first_date]))[0])
+
+
+def group_suppliers(final_df):
+    """
+    按供应商和收货月份切分明细并计算汇总
+
+    忽略空的供应商名称，其余明细的年月一次算出（每个不同的收货日期只解析一次），收货日期
+    为空的行归入该供应商最早的月份。明细按供应商名称、年月、收货日期、收货单号整体排序
+    一次（稳定排序，与逐个分组排序的结果相同），每个供应商每个月取排序结果中连续的一段切片。
+    各组的行数、收货日期范围和金额合计在一次分组聚合中算出。
+
+    Returns:
+        list[SupplierGroup]: 按供应商名称和年月排序，每组对应一份对账单
+    """
+    suppliers = final_df['供应商名称']
+    codes, names = pd.factorize(suppliers)
+    named = np.array([bool(str(name).strip()) for name in names] + [False])
+    positions = np.flatnonzero(named[codes])
+    if not len(positions):
+        return []
+
+    months = year_month_keys(final_df['收货日期'].iloc[positions])
+    undated = pd.isna(months)
+    if undated.any():
+        earliest = pd.Series(months).groupby(codes[positions]).transform('min').to_numpy()
+        months = np.where(undated, earliest, months)
+
+    # 只对排序用的几列排序，得到行号后一次取出整表
+    keys = final_df[['供应商名称'] + SORT_COLUMNS].iloc[positions].reset_index(drop=True)
+    keys.insert(1, '年月', months)
+    local_order = keys.sort_values(list(keys.columns)).index.to_numpy()
+    order = positions[local_order]
+    data = final_df.take(order)
+    months = months[local_order]
+
+    # 排序后同一供应商同一月份的行连续，供应商或月份变化处为新的一组
+    supplier_codes, supplier_names = pd.factorize(data['供应商名称'])
+    month_codes, _ = pd.factorize(months)
+    changes = (np.diff(supplier_codes) != 0) | (np.diff(month_codes) != 0)
+    group_ids = np.r_[0, np.cumsum(changes)]
+    aggregates = data.groupby(group_ids, sort=False).agg(
+        first_date=('收货日期', 'first'),
+        last_date=('收货日期', 'last'),
+        **{column: (column, 'sum') for column in SUMMARY_COLUMNS},
+    )
+    bounds = np.r_[np.flatnonzero(changes) + 1, len(data)]
+
+    groups = []
+    start = 0
+    for end, aggregate in zip(bounds, aggregates.to_dict('records')):
+        groups.append(SupplierGroup(
+            supplier_names[supplier_codes[start]], data.iloc[start:end], aggregate['first_date'],
+            aggregate['last_date'], {column: aggregate[column] for column in SUMMARY_COLUMNS}, months[start]))
+        start = end
+    return groups
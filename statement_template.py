@@ -0,0 +1,170 @@
+import logging
+import os
+
+from openpyxl import load_workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.header_footer import HeaderFooter
+from openpyxl.worksheet.page import PageMargins
+
+# 用户自定义版式文件，存在时优先使用
+STATEMENT_TEMPLATE_FILE = 'statement_template.xlsx'
+
+# 默认列宽
+DEFAULT_COLUMN_WIDTHS = {
+    '收货单号': 15,
+    '收货日期': 15,
+    '商品名称': 45,
+    '实收数量': 10,
+    '基本单位': 13,
+    '单价': 12,
+    '小计金额': 12,
+    '税额': 12,
+    '税率': 10,
+    '小计价税': 12,
+    '部门': 35,
+    '供应商名称': 36
+}
+
+DEFAULT_FOOTER_TEXT = '\n第 &P 页，共 &N 页\nSofitel Sanya Leeman Resort'
+
+# 标题行数（酒店名称标题、对账明细表标题、表头）
+HEADER_ROWS = 3
+
+
+class StatementTemplate:
+    """
+    对账单版式
+
+    页面设置、页脚、页边距、列宽、两行合并的标题和表头只构建一次，
+    每个供应商的工作表通过apply套用版式后只需写入明细行和合计行。
+    版式可以使用代码中的默认值，也可以从用户提供的.xlsx模板中读取。
+    """
+
+    def __init__(self, title='对账明细表', title_height=60, subtitle='', subtitle_height=10,
+                 column_widths=None, orientation='portrait', paper_size='9', fit_to_width=1, fit_to_height=0,
+                 horizontal_centered=True, footer_text=DEFAULT_FOOTER_TEXT, footer_size=11, footer_font='微软雅黑',
+                 margins=None):
+        self.title = title
+        self.title_height = title_height
+        self.subtitle = subtitle
+        self.subtitle_height = subtitle_height
+        self.column_widths = dict(DEFAULT_COLUMN_WIDTHS if column_widths is None else column_widths)
+        self.orientation = orientation
+        self.paper_size = paper_size
+        self.fit_to_width = fit_to_width
+        self.fit_to_height = fit_to_height
+        self.horizontal_centered = horizontal_centered
+        self.margins = margins or dict(left=0.31, right=0.31, top=0.31, bottom=0.39, header=0.31, footer=0.11)
+        self.footer_text = footer_text
+        self.footer_size = footer_size
+        self.footer_font = footer_font
+
+        # 预先构建页脚和页边距对象，各工作表共用
+        self.header_footer = HeaderFooter()
+        self.header_footer.oddFooter.center.text = footer_text
+        self.header_footer.oddFooter.center.size = footer_size
+        self.header_footer.oddFooter.center.font = footer_font
+        self.page_margins = PageMargins(**self.margins)
+
+    @classmethod
+    def from_workbook(cls, path):
+        """从用户提供的模板工作簿读取版式，表头位于第3行"""
+        ws = load_workbook(path).active
+        column_widths = dict(DEFAULT_COLUMN_WIDTHS)
+        for col in range(1, ws.max_column + 1):
+            header = ws.cell(row=HEADER_ROWS, column=col).value
+            width = ws.column_dimensions[get_column_letter(col)].width
+            if header in column_widths and width:
+                column_widths[header] = width
+
+        footer = ws.oddFooter.center
+        margins = ws.page_margins
+        return cls(
+            title=ws.cell(row=1, column=1).value or '',
+            title_height=ws.row_dimensions[1].height,
+            subtitle=ws.cell(row=2, column=1).value or '',
+            subtitle_height=ws.row_dimensions[2].height,
+            column_widths=column_widths,
+            orientation=ws.page_setup.orientation or 'portrait',
+            paper_size=ws.page_setup.paperSize or '9',
+            fit_to_width=ws.page_setup.fitToWidth,
+            fit_to_height=ws.page_setup.fitToHeight,
+            horizontal_centered=bool(ws.print_options.horizontalCentered),
+            footer_text=footer.text if footer.text is not None else DEFAULT_FOOTER_TEXT,
+            footer_size=footer.size or 11,
+            footer_font=footer.font or '微软雅黑',
+            margins=dict(left=margins.left, right=margins.right, top=margins.top,
+                         bottom=margins.bottom, header=margins.header, footer=margins.footer),
+        )
+
+    def settings(self):
+        """版式设置，用于判断已生成的对账单是否需要重新生成"""
+        return {
+            'title': self.title,
+            'title_height': self.title_height,
+            'subtitle': self.subtitle,
+            'subtitle_height': self.subtitle_height,
+            'column_widths': self.column_widths,
+            'orientation': self.orientation,
+            'paper_size': self.paper_size,
+            'fit_to_width': self.fit_to_width,
+            'fit_to_height': self.fit_to_height,
+            'horizontal_centered': self.horizontal_centered,
+            'footer_text': self.footer_text,
+            'footer_size': self.footer_size,
+            'footer_font': self.footer_font,
+            'margins': self.margins,
+        }
+
+    def apply(self, ws, headers, styles):
+        """
+        在只写工作表上套用版式并写入标题行和表头
+
+        Args:
+            ws: 只写模式的工作表，尚未写入任何行
+            headers: 表头列名
+            styles: 命名样式名称到样式数组的映射
+        """
+        ws.page_setup.orientation = self.orientation
+        ws.page_setup.paperSize = self.paper_size
+        ws.page_setup.fitToPage = True
+        ws.page_setup.fitToHeight = self.fit_to_height
+        ws.page_setup.fitToWidth = self.fit_to_width
+        ws.print_options.horizontalCentered = self.horizontal_centered
+        ws.print_options.verticalCentered = False
+        ws.HeaderFooter = self.header_footer
+        ws.page_margins = self.page_margins
+
+        for col, header in enumerate(headers, 1):
+            ws.column_dimensions[get_column_letter(col)].width = self.column_widths[header]
+
+        last_column = get_column_letter(len(headers))
+        ws.merged_cells.add(f'A1:{last_column}1')
+        ws.merged_cells.add(f'A2:{last_column}2')
+        ws.row_dimensions[1].height = self.title_height
+        ws.row_dimensions[2].height = self.subtitle_height
+        ws.append([styled_cell(ws, self.title, styles['recon.title.center'])])
+        ws.append([styled_cell(ws, self.subtitle, styles['recon.subtitle.center'])])
+        ws.append([styled_cell(ws, header, styles['recon.header.center']) for header in headers])
+
+        ws.print_title_rows = f'1:{HEADER_ROWS}'
+
+
+def styled_cell(ws, value, style_array):
+    """创建带样式的只写单元格，样式数组在工作簿内只读，各单元格直接共用"""
+    cell = WriteOnlyCell(ws, value)
+    cell._style = style_array
+    return cell
+
+
+def load_statement_template(path=STATEMENT_TEMPLATE_FILE):
+    """读取用户模板，不存在或无法读取时使用默认版式"""
+    if path and os.path.exists(path):
+        try:
+            template = StatementTemplate.from_workbook(path)
+            logging.info(f'已加载对账单模板：{path}')
+            return template
+        except Exception as e:
+            logging.warning(f'无法读取对账单模板{path}，使用默认版式：{e}')
+    return StatementTemplate()
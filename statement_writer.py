@@ -0,0 +1,404 @@
+import logging
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from copy import copy
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.styles import Alignment, Font, NamedStyle, PatternFill, Border, Side
+from openpyxl.styles.borders import DEFAULT_BORDER
+
+from log_setup import current_run_id, drain_log_queue, forward_logs
+from output_manifest import OutputManifest, settings_digest, statement_content_digest
+from run_metrics import measure
+from statement_grouping import group_suppliers, supplier_group
+from statement_template import HEADER_ROWS, StatementTemplate, load_statement_template, styled_cell
+
+# 供应商对账明细的输出根目录
+OUTPUT_ROOT = '供应商对账明细'
+
+# 对账单渲染版本，样式或写入逻辑变化时需要增加，使已生成的对账单重新生成
+RENDER_VERSION = 1
+
+# 每个渲染进程至少分到的供应商数，供应商较少时进程启动开销得不偿失
+MIN_SUPPLIERS_PER_WORKER = 10
+
+# 判断负数行的金额列
+AMOUNT_COLUMNS = ['小计金额', '税额', '小计价税']
+
+# 列格式表：列名 → (有值时的格式类别, 空值时的格式类别)，未列出的列居中
+COLUMN_SCHEMA = {
+    '商品名称': ('wrap', 'wrap'),
+    '部门': ('wrap', 'wrap'),
+    '实收数量': ('number', 'right'),
+    '单价': ('number', 'right'),
+    '小计金额': ('number', 'right'),
+    '税额': ('precise', 'right'),
+    '小计价税': ('precise', 'right'),
+    '税率': ('percent', 'right'),
+}
+DEFAULT_COLUMN_FORMAT = ('center', 'center')
+
+# 明细单元格的基础样式，下标即cell_style_codes中的样式编号除以2
+CELL_BASES = ['body', 'zebra', 'negative_row', 'negative_amount']
+
+# 单元格格式类别：对齐方式和数字格式
+CELL_FORMATS = {
+    'center': (Alignment(horizontal='center', vertical='center'), 'General'),
+    'wrap': (Alignment(horizontal='center', vertical='center', wrap_text=True), 'General'),
+    'right': (Alignment(horizontal='right', vertical='center', shrink_to_fit=False), 'General'),
+    'number': (Alignment(horizontal='right', vertical='center', shrink_to_fit=False), '#,##0.00'),
+    'precise': (Alignment(horizontal='right', vertical='center', shrink_to_fit=False), '#,##0.0000'),
+    'percent': (Alignment(horizontal='right', vertical='center', shrink_to_fit=False), '0%'),
+}
+
+HEADER_FILL = PatternFill(start_color='1F497D', end_color='1F497D', fill_type='solid')
+ZEBRA_FILL = PatternFill(start_color='F5F5F5', end_color='F5F5F5', fill_type='solid')
+NEGATIVE_FILL = PatternFill(start_color='FFFF00', end_color='FFFF00', fill_type='solid')
+
+THIN_BORDER = Border(
+    left=Side(style='hair', color='D3D3D3'),
+    right=Side(style='hair', color='D3D3D3'),
+    top=Side(style='hair', color='D3D3D3'),
+    bottom=Side(style='hair', color='D3D3D3')
+)
+THICK_BORDER = Border(
+    left=Side(style='thin', color='1F497D'),
+    right=Side(style='thin', color='1F497D'),
+    top=Side(style='thin', color='1F497D'),
+    bottom=Side(style='thin', color='1F497D')
+)
+
+# 命名样式的基础定义：字体、填充、边框
+STYLE_BASES = {
+    'header': (Font(name='微软雅黑', size=13, bold=True, color='FFFFFF'), HEADER_FILL, THICK_BORDER),
+    'body': (Font(name='微软雅黑', size=13), PatternFill(), THIN_BORDER),
+    'zebra': (Font(name='微软雅黑', size=13), ZEBRA_FILL, THIN_BORDER),
+    'negative_row': (Font(name='微软雅黑', size=13), NEGATIVE_FILL, THIN_BORDER),
+    'negative_amount': (Font(name='微软雅黑', size=11, color='FF0000'), NEGATIVE_FILL, THIN_BORDER),
+    'summary': (Font(name='微软雅黑', size=11, bold=True, color='FFFFFF'), HEADER_FILL, THICK_BORDER),
+}
+
+# 标题行样式
+TITLE_STYLES = {
+    'title': (Font(name='微软雅黑', size=16, bold=True, color='FFFFFF'), HEADER_FILL, DEFAULT_BORDER),
+    'subtitle': (Font(name='微软雅黑', size=20, bold=True, color='FFFFFF'), HEADER_FILL, DEFAULT_BORDER),
+}
+
+# 每个进程只构建一次的命名样式定义和默认版式
+_style_definitions = None
+_default_template = None
+
+
+def statement_style_definitions():
+    """
+    返回对账单使用的全部命名样式的定义，名称为“基础样式.格式类别”
+
+    定义只包含不可变的字体、填充、边框等属性，可以在进程内共享；NamedStyle对象加入工作簿时
+    会绑定到该工作簿，因此由register_statement_styles为每个工作簿分别创建。
+    """
+    global _style_definitions
+    if _style_definitions is None:
+        definitions = []
+        for base, (font, fill, border) in STYLE_BASES.items():
+            for kind, (alignment, number_format) in CELL_FORMATS.items():
+                definitions.append((f'recon.{base}.{kind}', {'font': font, 'fill': fill, 'border': border,
+                                                             'alignment': alignment, 'number_format': number_format}))
+        for base, (font, fill, border) in TITLE_STYLES.items():
+            definitions.append((f'recon.{base}.center', {'font': font, 'fill': fill, 'border': border,
+                                                         'alignment': CELL_FORMATS['center'][0]}))
+        _style_definitions = tuple(definitions)
+    return _style_definitions
+
+
+def register_statement_styles(wb):
+    """为工作簿创建并加入命名样式，返回样式名称到样式数组的映射，单元格直接复用"""
+    style_arrays = {}
+    for name, attributes in statement_style_definitions():
+        style = NamedStyle(name=name, **attributes)
+        wb.add_named_style(style)
+        style_arrays[name] = copy(style.as_tuple())
+    return style_arrays
+
+
+def column_format_kind(header, value):
+    """按列名和值决定单元格的格式类别"""
+    filled, empty = COLUMN_SCHEMA.get(header, DEFAULT_COLUMN_FORMAT)
+    return filled if pd.notna(value) and str(value).strip() else empty
+
+
+def summary_format_kind(header, value):
+    """合计行只对金额列设置右对齐和数字格式"""
+    if header in AMOUNT_COLUMNS:
+        return column_format_kind(header, value)
+    return 'center'
+
+
+def has_value_mask(column):
+    """单元格是否有值（非空且不是空白文字），与column_format_kind的判断一致"""
+    mask = column.notna().to_numpy()
+    if not pd.api.types.is_numeric_dtype(column):
+        mask &= column.astype(str).str.strip().ne('').to_numpy()
+    return mask
+
+
+def cell_style_codes(supplier_data, first_row):
+    """
+    按整个供应商的明细一次算出每个单元格的样式编号：基础样式在CELL_BASES中的下标 × 2 + 是否有值
+
+    有负数金额的行整行为negative_row，其中为负数的金额单元格为negative_amount；
+    其余行按Excel行号（第一行明细为first_row）的奇偶使用斑马线。
+
+    Returns:
+        np.ndarray: 行数 × 列数的整数数组
+    """
+    headers = list(supplier_data.columns)
+    negative = np.zeros(supplier_data.shape, dtype=bool)
+    for column in AMOUNT_COLUMNS:
+        negative[:, headers.index(column)] = pd.to_numeric(supplier_data[column], errors='coerce').to_numpy() < 0
+    row_numbers = np.arange(first_row, first_row + len(supplier_data))
+    bases = np.where(negative.any(axis=1), CELL_BASES.index('negative_row'),
+                     np.where(row_numbers % 2 == 0, CELL_BASES.index('zebra'), CELL_BASES.index('body')))
+    codes = np.repeat(bases[:, np.newaxis], len(headers), axis=1)
+    codes[negative] = CELL_BASES.index('negative_amount')
+
+    filled = np.ones(supplier_data.shape, dtype=bool)
+    for position, header in enumerate(headers):
+        kinds = COLUMN_SCHEMA.get(header, DEFAULT_COLUMN_FORMAT)
+        # 有值和空值格式相同的列不需要判断
+        if kinds[0] != kinds[1]:
+            filled[:, position] = has_value_mask(supplier_data[header])
+    return codes * 2 + filled
+
+
+def column_style_table(header, styles):
+    """某一列按样式编号排列的样式数组，与cell_style_codes的编号对应"""
+    filled, empty = COLUMN_SCHEMA.get(header, DEFAULT_COLUMN_FORMAT)
+    return [styles[f'recon.{base}.{kind}'] for base in CELL_BASES for kind in (empty, filled)]
+
+
+def save_workbook_atomic(wb, output_file):
+    """先写入临时文件再重命名，避免中断时留下损坏的对账单"""
+    temp_file = f'{output_file}.tmp'
+    try:
+        wb.save(temp_file)
+        os.replace(temp_file, output_file)
+    finally:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+
+
+def default_template():
+    """进程内共用的默认版式"""
+    global _default_template
+    if _default_template is None:
+        _default_template = StatementTemplate()
+    return _default_template
+
+
+def render_supplier_statement(supplier_name, supplier_data, output_root=OUTPUT_ROOT, template=None):
+    """
+    生成单个供应商的对账明细表
+
+    Args:
+        supplier_name: 供应商名称
+        supplier_data: 该供应商的明细数据，顺序不限
+        output_root: 输出根目录，对账单保存在其下的年月目录中
+        template: 对账单版式，为None时使用默认版式
+
+    Returns:
+        str: 生成的对账单路径
+    """
+    return render_supplier_group(supplier_group(supplier_name, supplier_data), output_root, template)
+
+
+def render_supplier_group(group, output_root=OUTPUT_ROOT, template=None):
+    """
+    按已排序并汇总的供应商明细（SupplierGroup）生成对账明细表
+
+    工作簿以只写（流式）模式生成，版式由模板套用，单元格样式取自预先注册的命名样式。
+
+    Returns:
+        str: 生成的对账单路径
+    """
+    supplier_data = group.data
+    if pd.isna(group.year_month):
+        raise ValueError('收货日期均为空，无法确定对账单所属的年月')
+
+    # 创建年月目录
+    year_month_dir = os.path.join(output_root, group.year_month)
+    os.makedirs(year_month_dir, exist_ok=True)
+
+    # 合计行
+    summary_values = group.summary_record()
+
+    # 创建新的Excel工作簿（只写模式），套用版式并写入标题和表头
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    styles = register_statement_styles(wb)
+    headers = list(supplier_data.columns)
+    (template or default_template()).apply(ws, headers, styles)
+
+    # 写入数据：样式编号按整个供应商预先算出，逐行只按编号取样式
+    first_row = HEADER_ROWS + 1
+    style_tables = [column_style_table(header, styles) for header in headers]
+    style_codes = cell_style_codes(supplier_data, first_row).tolist()
+    for row_idx, (row, row_codes) in enumerate(zip(supplier_data.values, style_codes), first_row):
+        # 设置行高为40
+        ws.row_dimensions[row_idx].height = 40
+        ws.append([styled_cell(ws, value, table[code]) for value, table, code in zip(row, style_tables, row_codes)])
+
+    # 写入合计行
+    ws.append([styled_cell(ws, summary_values[header],
+                            styles[f'recon.summary.{summary_format_kind(header, summary_values[header])}'])
+               for header in headers])
+
+    # 保存文件
+    output_file = os.path.join(year_month_dir, f'{group.supplier}_对账明细.xlsx')
+    save_workbook_atomic(wb, output_file)
+    return output_file
+
+
+def _render_task(group, output_root, template):
+    """渲染单个供应商并记录耗时和内存变化"""
+    result, seconds, memory_delta = measure(_render_group, group, output_root, template)
+    result.update(rows=group.rows, seconds=seconds, memory_delta=memory_delta)
+    return result
+
+
+def _render_group(group, output_root, template):
+    """渲染单个供应商并捕获异常，单个供应商失败不影响其他供应商"""
+    try:
+        output_file = render_supplier_group(group, output_root, template)
+        result = {'supplier': group.supplier, 'year_month': group.year_month, 'file': output_file, 'success': True,
+                  'skipped': False, 'error': ''}
+    except Exception as e:
+        result = {'supplier': group.supplier, 'year_month': group.year_month, 'file': None, 'success': False,
+                  'skipped': False, 'error': str(e)}
+    return result
+
+
+def render_settings_digest(template):
+    """渲染版本和版式设置的哈希"""
+    return settings_digest({'render_version': RENDER_VERSION, 'template': template.settings()})
+
+
+def default_render_workers(supplier_count):
+    """默认进程数：供应商较少时串行，否则按CPU核数并行"""
+    return max(1, min(os.cpu_count() or 1, supplier_count // MIN_SUPPLIERS_PER_WORKER))
+
+
+def render_statements(final_df, output_root=OUTPUT_ROOT, workers=None, notify=None, template=None,
+                      incremental=True, force=False, on_progress=None, groups=None):
+    """
+    按供应商和月份生成对账明细表，每个供应商每个月一份，保存在对应的年月目录中
+
+    workers大于1时每份对账单的数据交给进程池中的一个任务渲染并保存，
+    进程池不可用时退回到串行渲染。每份对账单的结果单独记录，
+    某份对账单失败不会中断整批生成。
+
+    incremental为True时，输出目录下的清单按“年月/供应商”记录每份对账单明细的内容哈希和渲染设置，
+    内容和设置都未变化的对账单跳过生成；force为True时忽略清单，全部重新生成。
+
+    Args:
+        final_df: 所有文件合并后的明细数据
+        output_root: 输出根目录
+        workers: 进程数，为None时使用default_render_workers，为1时串行渲染
+        notify: 消息回调，只报告生成失败的对账单，在调用方线程中执行
+        template: 对账单版式，为None时读取用户模板文件或使用默认版式
+        incremental: 是否使用输出清单跳过未变化的对账单
+        force: 是否忽略输出清单强制重新生成
+        on_progress: 每份对账单完成（生成、跳过或失败）后调用on_progress(已完成数, 对账单总数)
+        groups: group_suppliers(final_df)的结果，已分组时传入以免重复分组
+
+    Returns:
+        list[dict]: 每份对账单的生成结果，包含supplier、year_month、file、success、skipped、error，
+                    以及rows、seconds、memory_delta（渲染前后所在进程常驻内存的变化字节数）
+    """
+    notify = notify or logging.info
+    on_progress = on_progress or (lambda done, total: None)
+    if template is None:
+        template = load_statement_template()
+    if groups is None:
+        groups = group_suppliers(final_df)
+    total_statements = len(groups)
+
+    os.makedirs(output_root, exist_ok=True)
+    manifest = OutputManifest.load(output_root) if incremental else None
+    render_digest = render_settings_digest(template)
+
+    results = [None] * total_statements
+    content_digests = [None] * total_statements
+    done_count = 0
+
+    def on_result(index, result):
+        nonlocal done_count
+        results[index] = result
+        done_count += 1
+        if not result['success']:
+            notify(f'供应商对账单生成失败 ({done_count}/{total_statements}): {result["supplier"]}'
+                   f'（{result["year_month"]}），{result["error"]}')
+        on_progress(done_count, total_statements)
+
+    # 跳过内容和设置都未变化的供应商
+    tasks = []
+    for index, group in enumerate(groups):
+        if manifest is not None:
+            content_digests[index] = statement_content_digest(group.data)
+            if not force and manifest.is_current(group.key, content_digests[index], render_digest):
+                on_result(index, {'supplier': group.supplier, 'year_month': group.year_month,
+                                  'file': manifest.output_file(group.key), 'success': True, 'skipped': True,
+                                  'error': '', 'rows': group.rows, 'seconds': 0.0, 'memory_delta': None})
+                continue
+        tasks.append((index, group))
+
+    if workers is None:
+        workers = default_render_workers(len(tasks))
+
+    rendered = False
+    if workers > 1 and len(tasks) > 1:
+        try:
+            _render_parallel(tasks, output_root, template, min(workers, len(tasks)), on_result)
+            rendered = True
+        except BrokenProcessPool as e:
+            logging.warning(f'多进程生成对账单失败，改为串行生成：{e}')
+            tasks = [task for task in tasks if results[task[0]] is None]
+
+    if not rendered:
+        for index, group in tasks:
+            on_result(index, _render_task(group, output_root, template))
+
+    # 更新输出清单，失败的供应商下次重新生成
+    if manifest is not None:
+        for index, result in enumerate(results):
+            if result['skipped']:
+                continue
+            if result['success']:
+                manifest.record(groups[index].key, result['file'], content_digests[index], render_digest)
+            else:
+                manifest.discard(groups[index].key)
+        manifest.save()
+
+    return results
+
+
+def _render_parallel(tasks, output_root, template, workers, on_result):
+    context = multiprocessing.get_context('spawn')
+    # 子进程的日志记录（生成失败等）通过队列转发，写入本进程的日志
+    log_queue = context.Queue()
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=forward_logs, initargs=(log_queue, current_run_id())) as executor:
+        futures = {executor.submit(_render_task, group, output_root, template): index
+                   for index, group in tasks}
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+            drain_log_queue(log_queue)
+            for future in done:
+                on_result(futures[future], future.result())
+
+    drain_log_queue(log_queue)
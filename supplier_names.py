@@ -0,0 +1,111 @@
+import json
+import logging
+import os
+import re
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+# 供应商名称中的发票信息后缀
+SUPPLIER_SUFFIX_RE = re.compile(r'[（(].*[)）]|（专票.*|（普票.*|\s+专票.*|\s+普票.*|\d+%$')
+
+# 清理规则变化时需要同步增加版本号，使旧的缓存失效
+NORMALIZER_VERSION = 1
+
+SUPPLIER_CACHE_FILE = os.path.join('cache', 'supplier_names.json')
+SUPPLIER_ALIAS_FILE = 'supplier_aliases.json'
+
+
+def clean_supplier_name(supplier):
+    """清理供应商名称中的发票信息"""
+    if pd.isna(supplier):
+        return supplier
+    return SUPPLIER_SUFFIX_RE.sub('', str(supplier)).strip()
+
+
+class SupplierNormalizer:
+    """
+    供应商名称规范化
+
+    原始名称 → 清理后名称的对应关系保存在本地缓存文件中，之后的运行只需查字典；
+    用户可在别名文件中把多个名称指定为同一个规范名称，别名在查询时生效，
+    修改别名文件无需清空缓存。运行过程中记录每个规范名称对应的原始写法，
+    用于报告哪些原始名称被合并到了同一个供应商；不在缓存中的原始名称另外记录在new_names中。
+    """
+
+    def __init__(self, cache_file=SUPPLIER_CACHE_FILE, alias_file=SUPPLIER_ALIAS_FILE):
+        self.cache_file = cache_file
+        self.alias_file = alias_file
+        self.mapping = {}
+        self.aliases = {}
+        self.variants = defaultdict(set)
+        self.new_names = set()
+        self._dirty = False
+
+    def load(self):
+        """读取名称缓存和别名文件，文件不存在或损坏时忽略"""
+        cache = self._read_json(self.cache_file)
+        if cache.get('version') == NORMALIZER_VERSION:
+            self.mapping = dict(cache.get('mapping', {}))
+        self.aliases = {str(k).strip(): str(v).strip() for k, v in self._read_json(self.alias_file).items()}
+        logging.info(f'已加载供应商名称缓存{len(self.mapping)}条，别名{len(self.aliases)}条')
+        return self
+
+    def save(self):
+        """将新增的名称对应关系写回缓存文件"""
+        if not self._dirty:
+            return
+        directory = os.path.dirname(self.cache_file)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        temp_file = f'{self.cache_file}.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump({'version': NORMALIZER_VERSION, 'mapping': self.mapping}, f, ensure_ascii=False, indent=2)
+        os.replace(temp_file, self.cache_file)
+        self._dirty = False
+
+    def normalize(self, raw):
+        """返回原始供应商名称对应的规范名称"""
+        if pd.isna(raw):
+            return raw
+        key = str(raw)
+        cleaned = self.mapping.get(key)
+        if cleaned is None:
+            cleaned = clean_supplier_name(key)
+            self.mapping[key] = cleaned
+            self.new_names.add(key)
+            self._dirty = True
+        canonical = self.aliases.get(key.strip(), self.aliases.get(cleaned, cleaned))
+        self.variants[canonical].add(key)
+        return canonical
+
+    def normalize_series(self, series):
+        """整列规范化，每个不同的原始名称只处理一次"""
+        codes, uniques = pd.factorize(series)
+        normalized = np.empty(len(uniques) + 1, dtype=object)
+        for i, value in enumerate(uniques):
+            normalized[i] = self.normalize(value)
+        normalized[-1] = np.nan
+        return pd.Series(normalized[codes], index=series.index, name=series.name)
+
+    def collapsed_variants(self, new_only=False):
+        """
+        返回有多个原始写法的规范名称及其原始写法
+
+        new_only为True时只返回包含本次新出现（不在缓存中）的原始写法的规范名称。
+        """
+        return {canonical: sorted(raws) for canonical, raws in sorted(self.variants.items())
+                if len(raws) > 1 and (not new_only or raws & self.new_names)}
+
+    @staticmethod
+    def _read_json(path):
+        if not path or not os.path.exists(path):
+            return {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError) as e:
+            logging.warning(f'无法读取{path}：{e}')
+            return {}
@@ -0,0 +1,91 @@
+import os
+import time
+
+import pandas as pd
+import pytest
+
+from backup_writer import BACKUP_PREFIX, BackupWriter, prune_backups, write_backup
+
+# 测试脚本，用于检查清洗后数据的备份格式、后台写入和保留策略
+
+
+def make_cleaned_data():
+    return pd.DataFrame({
+        '收货单号': ['RTS0001', '0002'],
+        '商品名称': ['Apple 苹果', '鸡蛋'],
+        '小计金额': [10.5, -3.0],
+        '供应商名称': pd.Categorical(['甲公司', '乙公司']),
+    })
+
+
+@pytest.mark.parametrize('backup_format', ['csv.gz', 'csv', 'xlsx'])
+def test_write_backup_formats(tmp_path, backup_format):
+    backup_file = write_backup(make_cleaned_data(), str(tmp_path), backup_format)
+
+    assert backup_file.endswith(backup_format)
+    assert os.listdir(tmp_path) == [os.path.basename(backup_file)]
+    if backup_format == 'xlsx':
+        restored = pd.read_excel(backup_file)
+    else:
+        restored = pd.read_csv(backup_file, encoding='utf-8-sig', dtype={'收货单号': str})
+    assert restored['收货单号'].tolist() == ['RTS0001', '0002']
+    assert restored['小计金额'].tolist() == [10.5, -3.0]
+    assert restored['供应商名称'].tolist() == ['甲公司', '乙公司']
+
+
+def test_prune_backups(tmp_path):
+    now = time.time()
+    for index in range(5):
+        path = tmp_path / f'{BACKUP_PREFIX}2025070{index}.csv.gz'
+        path.write_bytes(b'')
+        os.utime(path, (now - index * 3600, now - index * 3600))
+    expired = tmp_path / f'{BACKUP_PREFIX}20240101.xlsx'
+    expired.write_bytes(b'')
+    os.utime(expired, (now - 400 * 24 * 3600, now - 400 * 24 * 3600))
+    (tmp_path / 'other.xlsx').write_bytes(b'')
+
+    removed = prune_backups(str(tmp_path), retention_days=90, max_backups=3,
+                            keep=[str(tmp_path / f'{BACKUP_PREFIX}20250704.csv.gz')])
+
+    assert removed == 3
+    assert sorted(os.listdir(tmp_path)) == [f'{BACKUP_PREFIX}20250700.csv.gz', f'{BACKUP_PREFIX}20250701.csv.gz',
+                                            f'{BACKUP_PREFIX}20250704.csv.gz', 'other.xlsx']
+
+
+def test_same_second_backups_get_distinct_names(tmp_path, monkeypatch):
+    now = pd.Timestamp('2025-07-01 08:00:00')
+    monkeypatch.setattr(pd.Timestamp, 'now', classmethod(lambda cls: now))
+    first = write_backup(make_cleaned_data(), str(tmp_path))
+    second = write_backup(make_cleaned_data(), str(tmp_path))
+
+    assert os.path.basename(first) == f'{BACKUP_PREFIX}20250701_080000.csv.gz'
+    assert os.path.basename(second) == f'{BACKUP_PREFIX}20250701_080000_2.csv.gz'
+    assert os.path.getsize(first) and os.path.getsize(second)
+
+
+def test_prune_during_write_keeps_temp_file(tmp_path, monkeypatch):
+    to_csv = pd.DataFrame.to_csv
+
+    def write_then_prune(df, path, **kwargs):
+        to_csv(df, path, **kwargs)
+        # 其他运行在本次写入期间清理备份，不会删除未完成的临时文件
+        prune_backups(str(tmp_path), max_backups=0)
+        assert os.path.exists(path)
+
+    monkeypatch.setattr(pd.DataFrame, 'to_csv', write_then_prune)
+    backup_file = write_backup(make_cleaned_data(), str(tmp_path))
+    assert os.listdir(tmp_path) == [os.path.basename(backup_file)]
+    assert os.path.getsize(backup_file)
+
+
+def test_backup_writer_runs_in_background(tmp_path):
+    writer = BackupWriter(make_cleaned_data(), str(tmp_path)).start()
+    backup_file = writer.wait()
+    assert os.path.exists(backup_file)
+    assert writer.seconds is not None
+
+
+def test_backup_writer_reraises_errors(tmp_path):
+    writer = BackupWriter(make_cleaned_data(), str(tmp_path), backup_format='parquet').start()
+    with pytest.raises(ValueError):
+        writer.wait()
@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+
+from journal_parser import DETAIL_COLUMNS, JOURNAL_COLUMNS, apply_column_types, read_journal, segment_receipts
+
+# 测试脚本，用于检查收货流水切分结果
+
+
+def make_journal(rows):
+    """按 read_excel(skiprows=8) 的列名构造原始数据"""
+    frame = []
+    for values in rows:
+        row = [np.nan] * 41
+        for col, value in values.items():
+            row[col] = value
+        frame.append(row)
+    return pd.DataFrame(frame, columns=[f'Unnamed: {i}' for i in range(41)])
+
+
+def detail(name, qty, price, dept):
+    amount = qty * price
+    return {0: name, 9: qty, 11: 'KG', 15: price, 27: amount, 32: amount * 0.09, 37: amount * 1.09, 39: dept}
+
+
+def test_segment_receipts():
+    df = make_journal([
+        {0: '前导行'},
+        {0: 'RTS0001', 3: '海南鲜果贸易有限公司（专票13%）', 25: pd.Timestamp(2025, 7, 1)},
+        detail('Apple 苹果', 2, 5.0, 'Kitchen 厨房'),
+        {0: 'Page 1 of 2'},
+        {},
+        detail('Milk', -1, 8.0, 'Bar'),
+        {0: '0002', 3: 'Sanya Fresh 普票', 25: '2025-07-03'},
+        {0: 'Delivery Date'},
+        {0: '0003', 3: np.nan, 25: np.nan},
+        detail('鸡蛋', 30, 1.0, '管家部'),
+    ])
+
+    result = segment_receipts(df)
+
+    assert list(result.columns) == DETAIL_COLUMNS
+    assert result['收货单号'].tolist() == ['RTS0001', 'RTS0001', '0003']
+    assert result['供应商名称'].tolist()[:2] == ['海南鲜果贸易有限公司', '海南鲜果贸易有限公司']
+    assert pd.isna(result['供应商名称'].iloc[2])
+    assert result['收货日期'].tolist()[:2] == ['2025-07-01', '2025-07-01']
+    assert result['小计金额'].tolist() == [10.0, -8.0, 30.0]
+    assert np.allclose(result['税率'], 0.09)
+
+
+def test_segment_receipts_without_details():
+    df = make_journal([{0: 'RTS0001', 3: '供应商'}, {0: 'Page 1'}])
+    result = segment_receipts(df)
+    assert result.empty
+    assert list(result.columns) == DETAIL_COLUMNS
+
+
+def test_read_journal_prunes_columns_and_applies_types(tmp_path):
+    df = make_journal([
+        {0: 'RTS0001', 3: '海南鲜果贸易有限公司', 25: '2025-07-01', 40: '不需要的列'},
+        detail('Apple 苹果', 2, 5.0, 'Kitchen 厨房'),
+        {0: 'Delivery Date', 25: 'Delivery Date', 9: 'Qty'},
+    ])
+    path = tmp_path / 'journal.xlsx'
+    with pd.ExcelWriter(path) as writer:
+        pd.DataFrame([['前导行']] * 8).to_excel(writer, index=False, header=False)
+        df.to_excel(writer, index=False, startrow=8)
+
+    raw = read_journal(str(path))
+
+    assert list(raw.columns) == [f'Unnamed: {i}' for i in sorted(JOURNAL_COLUMNS)]
+    assert len(raw) == 3
+    assert raw['Unnamed: 9'].dtype == float and pd.isna(raw['Unnamed: 9'].iloc[2])
+    assert raw['Unnamed: 25'].iloc[0] == pd.Timestamp(2025, 7, 1) and pd.isna(raw['Unnamed: 25'].iloc[2])
+    assert isinstance(raw['Unnamed: 39'].dtype, pd.CategoricalDtype)
+
+    result = segment_receipts(raw)
+    assert result['收货日期'].tolist() == ['2025-07-01']
+    assert isinstance(result['供应商名称'].dtype, pd.CategoricalDtype)
+
+
+def test_unparsed_receipt_dates_are_reported(caplog):
+    df = make_journal([
+        {0: 'RTS0001', 3: '供应商甲', 25: '2025-07-01'},
+        detail('Apple', 2, 5.0, 'Kitchen'),
+        {0: 'RTS0002', 3: '供应商乙', 25: '2025-13-45'},
+        detail('Milk', 1, 8.0, 'Bar'),
+        {0: 'Page 1 of 2', 25: 'Delivery Date'},
+        {0: '0003', 3: '供应商丙', 25: np.nan},
+    ])
+
+    result = apply_column_types(df, input_file='/data/journal.xlsx')
+
+    assert result['Unnamed: 25'].isna().sum() == 5
+    # 只有有值但无法识别的收货单号行会报告，空日期和分页噪声行不报告
+    assert 'journal.xlsx中有1个收货日期无法识别，已置为空：RTS0002' in caplog.text
@@ -0,0 +1,109 @@
+from datetime import datetime
+from functools import partial
+
+import pandas as pd
+import xlrd
+from openpyxl import load_workbook
+from xlrd.sheet import Cell
+
+import journal_stream
+from journal_generator import generate_journal
+from journal_parser import parse_journal_file, parse_journals, read_journal, segment_receipts
+from journal_stream import iter_receipt_batches, sheet_row_count, stream_journal_file
+
+# 测试脚本，用于检查流式解析与整表解析结果一致
+
+
+def test_batches_contain_only_complete_receipts(tmp_path):
+    path = generate_journal(str(tmp_path / 'journal.xlsx'), detail_rows=400, supplier_count=8, seed=3)
+
+    batches = [batch for batch, _ in iter_receipt_batches(path, batch_rows=50)]
+
+    assert len(batches) > 1
+    for batch in batches:
+        # 每批以收货单号行开始，不含分页噪声行
+        assert batch['Unnamed: 0'].astype(str).str.match(r'^(RTS)?000\d+$').iloc[0]
+        assert not batch['Unnamed: 0'].astype(str).str.contains('Page|Delivery Date').any()
+
+
+def test_stream_matches_whole_file_parse(tmp_path):
+    path = generate_journal(str(tmp_path / 'journal.xlsx'), detail_rows=400, supplier_count=8, seed=3)
+
+    expected = segment_receipts(read_journal(path), clean_supplier=None)
+    streamed, row_count = stream_journal_file(path, batch_rows=50)
+
+    pd.testing.assert_frame_equal(streamed, expected)
+    assert row_count >= len(expected)
+    pd.testing.assert_frame_equal(parse_journal_file(path, streaming=True), expected)
+
+
+
+def test_streaming_reports_progress_per_batch(tmp_path, monkeypatch):
+    path = generate_journal(str(tmp_path / 'journal.xlsx'), detail_rows=400, supplier_count=8, seed=3)
+    assert sheet_row_count(path, load_workbook(path, read_only=True)) == load_workbook(path).active.max_row
+
+    # 单个大文件流式解析时，每读完一批就报告进度，而不是读完整个文件才从0跳到100%
+    monkeypatch.setattr(journal_stream, 'stream_journal_file', partial(stream_journal_file, batch_rows=50))
+    progress = []
+    parse_journals([path], workers=1, notify=lambda message: None,
+                   on_progress=lambda done, total: progress.append(done), streaming=True)
+    assert len(progress) > 2
+    assert all(0 < done < 1 for done in progress[:-1])
+    assert progress == sorted(progress) and progress[-1] == 1
+
+
+class FakeXlsSheet:
+    """按xlrd的接口提供单元格，用于在没有.xls写入库时测试.xls的读取路径"""
+
+    def __init__(self, rows):
+        self.nrows = len(rows)
+        self.ncols = max(len(row) for row in rows)
+        self.rows = [row + [None] * (self.ncols - len(row)) for row in rows]
+
+    def cell(self, row_index, column_index):
+        value = self.rows[row_index][column_index]
+        if value is None:
+            return Cell(xlrd.XL_CELL_EMPTY, '')
+        if isinstance(value, datetime):
+            # .xls中日期为1900日期系统的序号
+            return Cell(xlrd.XL_CELL_DATE, (value - datetime(1899, 12, 30)).total_seconds() / 86400)
+        if isinstance(value, (int, float)):
+            # .xls中的数值都是浮点数
+            return Cell(xlrd.XL_CELL_NUMBER, float(value))
+        return Cell(xlrd.XL_CELL_TEXT, value)
+
+
+class FakeXlsBook:
+    datemode = 0
+
+    def __init__(self, rows):
+        self.sheet = FakeXlsSheet(rows)
+        self.released = False
+
+    def sheet_by_index(self, index):
+        return self.sheet
+
+    def release_resources(self):
+        self.released = True
+
+
+def test_stream_xls_matches_xlsx(tmp_path, monkeypatch):
+    path = generate_journal(str(tmp_path / 'journal.xlsx'), detail_rows=400, supplier_count=8, seed=3)
+    book = load_workbook(path, read_only=True)
+    rows = [list(row) for row in book.worksheets[0].iter_rows(values_only=True)]
+    book.close()
+    fake_book = FakeXlsBook(rows)
+    opened = []
+
+    def open_workbook(input_file, on_demand=False):
+        opened.append(input_file)
+        return fake_book
+
+    monkeypatch.setattr(xlrd, 'open_workbook', open_workbook)
+    streamed, row_count = stream_journal_file(str(tmp_path / 'journal.xls'), batch_rows=50)
+    expected, expected_count = stream_journal_file(path, batch_rows=50)
+
+    assert opened == [str(tmp_path / 'journal.xls')]
+    assert fake_book.released
+    assert row_count == expected_count
+    pd.testing.assert_frame_equal(streamed, expected)
@@ -0,0 +1,143 @@
+from datetime import datetime
+
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+
+import layout_sniffer
+from journal_generator import generate_journal
+from journal_parser import JOURNAL_FIELDS, parse_journal_file
+from layout_sniffer import LayoutCache, detect_layout, sniff_layout
+
+# 测试脚本，用于检查列布局识别
+
+
+def make_rows(columns, labels=None, details=None):
+    """按字段 → 列号构造样本行：前导行、可选的列标题行、一张收货单及其明细"""
+    width = max(columns.values()) + 1
+
+    def row(values):
+        cells = [None] * width
+        for field, value in values.items():
+            cells[columns[field]] = value
+        return cells
+
+    rows = [['Receiving Journal'], []]
+    if labels:
+        rows.append(row(labels))
+    rows.append(row({'receipt': 'RTS0001', 'supplier': '三亚海鲜批发', 'date': datetime(2025, 7, 1)}))
+    for name, qty, unit, price, dept in details or [
+        ('Apple 苹果', 2, 'KG', 12.5, 'Main Kitchen 中厨房'),
+        ('Milk 牛奶', 10, 'L', 16.8, 'Bar 酒吧'),
+        ('鸡蛋', 3, 'BOX', 45.0, 'Pastry 饼房'),
+    ]:
+        amount = round(qty * price, 2)
+        tax = round(amount * 0.09, 2)
+        rows.append(row({'receipt': name, 'qty': qty, 'unit': unit, 'price': price, 'amount': amount,
+                         'tax': tax, 'total': amount + tax, 'department': dept}))
+    return rows
+
+
+def test_sniff_default_layout():
+    layout = sniff_layout(make_rows(JOURNAL_FIELDS))
+    assert layout.detected
+    assert layout.fields == JOURNAL_FIELDS
+    assert layout.skip_rows == 2
+
+
+def test_sniff_reordered_columns_by_values():
+    # 单价在数量之前、部门在基本单位之前，没有列标题
+    columns = {'receipt': 1, 'date': 2, 'supplier': 4, 'department': 5, 'unit': 6, 'price': 7, 'qty': 8,
+               'total': 9, 'amount': 10, 'tax': 11}
+    layout = sniff_layout(make_rows(columns))
+    assert layout.fields == columns
+
+
+def test_sniff_prefers_header_labels():
+    # 数量和单价都是整数时只能按列标题区分
+    columns = {'receipt': 0, 'supplier': 1, 'date': 2, 'price': 3, 'qty': 4, 'unit': 5, 'amount': 6,
+               'tax': 7, 'total': 8, 'department': 9}
+    details = [('Apple', 2, 'KG', 12, 'Kitchen'), ('Milk', 10, 'L', 16, 'Bar'), ('Egg', 3, 'BOX', 45, 'Pastry')]
+    labels = {'receipt': 'Receiving No.', 'price': '单价', 'qty': 'Qty'}
+    assert sniff_layout(make_rows(columns, labels, details)).fields == columns
+
+
+def test_sniff_rejects_inconsistent_amounts():
+    rows = make_rows(JOURNAL_FIELDS)
+    for row in rows[3:]:
+        row[JOURNAL_FIELDS['amount']] = 1.0
+    with pytest.raises(ValueError):
+        sniff_layout(rows)
+
+
+def test_sniff_text_dates():
+    # 非ISO格式的文字日期也按pd.to_datetime识别
+    rows = make_rows(JOURNAL_FIELDS)
+    rows[2][JOURNAL_FIELDS['date']] = '07/04/2025'
+    assert sniff_layout(rows).fields == JOURNAL_FIELDS
+
+
+def test_detect_falls_back_to_default_layout(tmp_path, monkeypatch, caplog):
+    journal = generate_journal(str(tmp_path / 'journal.xlsx'), detail_rows=30, supplier_count=3)
+
+    def fail(rows):
+        raise ValueError('无法识别收货流水的列布局：找不到收货日期所在的列')
+
+    monkeypatch.setattr(layout_sniffer, 'sniff_layout', fail)
+    layout = detect_layout(journal)
+    assert layout.fields == JOURNAL_FIELDS
+    assert '按默认版式读取' in caplog.text
+
+
+def test_sniff_zero_tax_uses_default_tax_column():
+    # 税额都为0时，左边全为0的列不能被当作税额
+    rows = make_rows(JOURNAL_FIELDS)
+    for row in rows[3:]:
+        row[JOURNAL_FIELDS['tax'] - 2] = 0.0
+        row[JOURNAL_FIELDS['tax']] = 0.0
+        row[JOURNAL_FIELDS['total']] = row[JOURNAL_FIELDS['amount']]
+    assert sniff_layout(rows).fields == JOURNAL_FIELDS
+
+
+def test_sniff_error_names_column_in_chinese():
+    rows = make_rows(JOURNAL_FIELDS)
+    rows[2][JOURNAL_FIELDS['date']] = None
+    with pytest.raises(ValueError, match='找不到收货日期所在的列'):
+        sniff_layout(rows)
+
+
+def test_sniff_without_receipts_uses_default_layout():
+    layout = sniff_layout([['Receiving Journal'], ['Page 1']])
+    assert not layout.detected
+    assert layout.fields == JOURNAL_FIELDS
+
+
+def test_shifted_journal_parses_like_original(tmp_path):
+    original = generate_journal(str(tmp_path / 'original.xlsx'), detail_rows=200, supplier_count=5, seed=2)
+    wb = load_workbook(original)
+    ws = wb.active
+    ws.insert_rows(1, 2)
+    ws.insert_cols(3)
+    ws.insert_cols(20, 2)
+    shifted = str(tmp_path / 'shifted.xlsx')
+    wb.save(shifted)
+
+    layout = detect_layout(shifted)
+    assert layout.fields['supplier'] == JOURNAL_FIELDS['supplier'] + 1
+    assert layout.fields['date'] == JOURNAL_FIELDS['date'] + 3
+
+    expected = parse_journal_file(original)
+    pd.testing.assert_frame_equal(parse_journal_file(shifted), expected)
+    pd.testing.assert_frame_equal(parse_journal_file(shifted, streaming=True), expected)
+
+
+def test_layout_cache(tmp_path, monkeypatch):
+    journal = generate_journal(str(tmp_path / 'journal.xlsx'), detail_rows=30, supplier_count=3)
+    cache = LayoutCache(str(tmp_path / 'layouts'))
+    first = detect_layout(journal, cache=cache)
+
+    # 命中缓存时不再读取文件
+    monkeypatch.setattr(layout_sniffer, 'sniff_layout', None)
+    second = detect_layout(journal, cache=cache)
+    assert second.fields == first.fields
+    assert second.skip_rows == first.skip_rows
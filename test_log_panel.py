@@ -0,0 +1,46 @@
+import logging
+import threading
+
+import pytest
+
+pytest.importorskip('PyQt5')
+
+from log_panel import LogBuffer  # noqa: E402
+
+# 测试脚本，用于检查日志面板缓冲的线程安全、容量上限和筛选
+
+
+def test_buffer_collects_batches_from_threads():
+    buffer = LogBuffer(max_records=1000)
+
+    def produce(prefix):
+        for i in range(500):
+            buffer.append(f'{prefix}{i}')
+
+    threads = [threading.Thread(target=produce, args=(prefix,)) for prefix in 'ab']
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    batch = buffer.take_pending()
+    assert len(batch) == 1000
+    assert buffer.take_pending() == []
+
+    buffer.append('c0')
+    buffer.take_pending()
+    # 超过上限时丢弃最早的日志
+    assert len(buffer.records) == 1000
+    assert buffer.records[-1] == (logging.INFO, 'c0')
+
+
+def test_filter_by_level_and_keyword():
+    buffer = LogBuffer()
+    buffer.append('开始读取文件：a.xlsx')
+    buffer.append('无法打开文件夹', logging.WARNING)
+    buffer.append('供应商对账单生成失败：ABC Foods', logging.ERROR)
+    buffer.take_pending()
+
+    assert buffer.filtered(logging.WARNING) == ['无法打开文件夹', '供应商对账单生成失败：ABC Foods']
+    assert buffer.filtered(keyword='abc foods') == ['供应商对账单生成失败：ABC Foods']
+    assert buffer.filtered(limit=1) == ['供应商对账单生成失败：ABC Foods']
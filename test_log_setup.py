@@ -0,0 +1,95 @@
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from log_setup import LogManager, current_run_id, drain_log_queue, forward_logs, log_context, prune_logs
+
+# 测试脚本，用于检查队列日志、每次运行单独的日志文件和日志清理
+
+
+def read(path):
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+
+def test_run_log_only_contains_its_own_records(tmp_path):
+    manager = LogManager(str(tmp_path / 'logs')).start(app_prefix='app', console=False)
+    try:
+        with manager.run('process', run_id='run1') as run_log:
+            with log_context(input_file='a.xlsx'):
+                logging.info('读取文件')
+
+            # 其他线程中的日志不属于本次运行
+            other = threading.Thread(target=logging.info, args=('其他线程',))
+            other.start()
+            other.join()
+    finally:
+        manager.stop()
+
+    content = read(run_log.log_file)
+    assert '[run1|a.xlsx] 读取文件' in content
+    assert '其他线程' not in content
+    # 应用日志记录所有日志
+    app_content = read(manager.app_log_file)
+    assert '读取文件' in app_content and '[-|-] 其他线程' in app_content
+
+
+def test_new_run_gets_new_file_after_previous_run(tmp_path):
+    manager = LogManager(str(tmp_path / 'logs')).start(app_prefix=None, console=False)
+    try:
+        with manager.run('process', run_id='first') as first:
+            logging.info('第一次')
+        with manager.run('process', run_id='second') as second:
+            logging.info('第二次')
+    finally:
+        manager.stop()
+
+    assert first.log_file != second.log_file
+    assert '第二次' not in read(first.log_file)
+    assert '第二次' in read(second.log_file)
+
+
+def warn_in_child(name):
+    with log_context(input_file=name):
+        logging.warning(f'子进程警告：{name}')
+    return os.getpid()
+
+
+def test_pool_child_records_reach_run_log(tmp_path):
+    manager = LogManager(str(tmp_path / 'logs')).start(app_prefix='app', console=False)
+    try:
+        with manager.run('process', run_id='run1') as run_log:
+            context = multiprocessing.get_context('spawn')
+            log_queue = context.Queue()
+            with ProcessPoolExecutor(max_workers=1, mp_context=context,
+                                     initializer=forward_logs, initargs=(log_queue, current_run_id())) as executor:
+                child_pid = executor.submit(warn_in_child, 'a.xlsx').result()
+            drain_log_queue(log_queue)
+    finally:
+        manager.stop()
+
+    assert child_pid != os.getpid()
+    assert '[run1|a.xlsx] 子进程警告：a.xlsx' in read(run_log.log_file)
+
+
+def test_prune_logs_by_age_and_count(tmp_path):
+    log_dir = tmp_path / 'logs'
+    log_dir.mkdir()
+    now = time.time()
+    for i in range(5):
+        path = log_dir / f'process_{i}.log'
+        path.write_text('x')
+        os.utime(path, (now - i * 60, now - i * 60))
+    old = log_dir / 'process_old.json'
+    old.write_text('{}')
+    os.utime(old, (now - 40 * 24 * 3600, now - 40 * 24 * 3600))
+    (log_dir / 'notes.txt').write_text('keep')
+
+    removed = prune_logs(str(log_dir), retention_days=30, max_files=3, keep=[str(log_dir / 'process_4.log')])
+
+    assert removed == 2
+    assert sorted(os.listdir(log_dir)) == ['notes.txt', 'process_0.log', 'process_1.log', 'process_2.log',
+                                           'process_4.log']
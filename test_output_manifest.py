@@ -0,0 +1,40 @@
+import os
+
+from statement_template import StatementTemplate
+from statement_writer import render_statements
+from test_statement_template import make_supplier_data
+
+# 测试脚本，用于检查输出清单跳过未变化的供应商
+
+
+def test_unchanged_suppliers_are_skipped(tmp_path):
+    output_root = str(tmp_path)
+    df = make_supplier_data()
+
+    first = render_statements(df, output_root, workers=1)
+    second = render_statements(df, output_root, workers=1)
+    assert [result['skipped'] for result in first] == [False]
+    assert [result['skipped'] for result in second] == [True]
+    assert second[0]['file'] == first[0]['file']
+
+    # 明细变化、版式变化或强制重新生成时重新生成
+    df.loc[0, '实收数量'] = 3.0
+    assert not render_statements(df, output_root, workers=1)[0]['skipped']
+    assert not render_statements(df, output_root, workers=1, template=StatementTemplate(title='新标题'))[0]['skipped']
+    assert not render_statements(df, output_root, workers=1, force=True)[0]['skipped']
+
+
+def test_statements_are_split_by_month(tmp_path):
+    output_root = str(tmp_path)
+    df = make_supplier_data()
+    df.loc[0, '收货日期'] = '2025-08-02'
+
+    first = render_statements(df, output_root, workers=1)
+    assert [os.path.relpath(result['file'], output_root) for result in first] == [
+        os.path.join('202507', '绿色蔬菜公司_对账明细.xlsx'), os.path.join('202508', '绿色蔬菜公司_对账明细.xlsx')]
+    assert [result['year_month'] for result in first] == ['202507', '202508']
+
+    # 只有变化的月份重新生成
+    df.loc[0, '实收数量'] = 3.0
+    second = render_statements(df, output_root, workers=1)
+    assert [result['skipped'] for result in second] == [True, False]
@@ -0,0 +1,67 @@
+import os
+
+import pandas as pd
+
+from journal_parser import JOURNAL_FIELDS, default_parse_workers, parse_journal_file, parse_journals
+from layout_sniffer import JournalLayout
+from parse_cache import ParseCache
+
+# 测试脚本，用于检查按文件内容缓存的解析结果
+
+
+def test_parse_cache_hit(tmp_path, write_journal):
+    journal = str(tmp_path / 'journal.xlsx')
+    write_journal(journal)
+    cache = ParseCache(cache_dir=str(tmp_path / 'cache'))
+
+    messages = []
+    first = parse_journal_file(journal, notify=messages.append, cache=cache)
+    second = parse_journal_file(journal, notify=messages.append, cache=cache)
+
+    pd.testing.assert_frame_equal(first, second)
+    assert messages[-1].startswith('使用解析缓存')
+    assert not any(message.startswith('开始读取文件') for message in messages[3:])
+
+
+def test_parse_cache_key_depends_on_version(tmp_path, write_journal):
+    journal = str(tmp_path / 'journal.xlsx')
+    write_journal(journal)
+    assert ParseCache(parser_version=1).key_for(journal) != ParseCache(parser_version=2).key_for(journal)
+
+
+def test_parse_cache_key_depends_on_layout_and_mode(tmp_path, write_journal):
+    journal = str(tmp_path / 'journal.xlsx')
+    write_journal(journal)
+    cache = ParseCache(cache_dir=str(tmp_path / 'cache'))
+    shifted = dict(JOURNAL_FIELDS, supplier=JOURNAL_FIELDS['supplier'] + 1)
+    assert cache.key_for(journal, JournalLayout()) != cache.key_for(journal, JournalLayout(shifted))
+    assert cache.key_for(journal, JournalLayout()) != cache.key_for(journal, JournalLayout(), streaming=True)
+
+    # 流式和整表读取各自写入缓存，切换读取方式时不会命中另一种方式的结果
+    messages = []
+    parse_journal_file(journal, notify=messages.append, cache=cache, streaming=False)
+    parse_journal_file(journal, notify=messages.append, cache=cache, streaming=True)
+    assert not messages[-1].startswith('使用解析缓存')
+    assert len([name for name in os.listdir(tmp_path / 'cache') if name.endswith('.pkl')]) == 2
+
+
+def test_parse_cache_prune(tmp_path):
+    cache = ParseCache(cache_dir=str(tmp_path), max_bytes=0)
+    cache.put('a', pd.DataFrame({'x': [1]}))
+    cache.put('b', pd.DataFrame({'x': [2]}))
+    assert cache.prune() == 2
+    assert os.listdir(tmp_path) == []
+
+
+def test_small_files_parse_serially_with_text_cache_stats(tmp_path, write_journal):
+    journals = [str(tmp_path / 'a.xlsx'), str(tmp_path / 'b.xlsx')]
+    for journal in journals:
+        write_journal(journal)
+    assert default_parse_workers(journals) == 1
+
+    file_stats = []
+    parse_journals(journals, notify=lambda message: None, file_stats=file_stats)
+    # 第二个文件的商品名称和部门全部命中第一个文件留下的缓存
+    assert file_stats[0]['text_cache']['rows'] == 4
+    assert file_stats[1]['text_cache']['misses'] == 0
+    assert file_stats[1]['text_cache']['hits'] > 0
@@ -0,0 +1,51 @@
+from progress import ProgressTracker, format_eta, format_progress
+
+# 测试脚本，用于检查进度事件的合并限速和剩余时间估计
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_updates_are_rate_limited_but_start_and_finish_always_emit():
+    clock = FakeClock()
+    events = []
+    tracker = ProgressTracker(events.append, {'render': '生成对账单'}, min_interval=0.25, clock=clock)
+
+    tracker.start('render', 1000)
+    for done in range(1, 1000):
+        clock.now += 0.001
+        tracker.update(done)
+    clock.now += 0.001
+    tracker.update(1000)
+
+    # 约1秒内的1000次更新只发送开始、每0.25秒一次和完成的事件
+    assert 3 <= len(events) <= 7
+    assert events[0]['done'] == 0 and events[0]['percent'] == 0
+    assert events[-1]['done'] == 1000 and events[-1]['percent'] == 100
+    assert events[-1]['label'] == '生成对账单'
+    assert events[1]['eta_seconds'] > 0
+
+    # 阶段完成后的更新被忽略
+    tracker.update(1000)
+    tracker.finish()
+    assert events[-1]['done'] == 1000 and len(events) <= 7
+
+
+def test_total_can_be_corrected_and_eta_is_formatted():
+    clock = FakeClock()
+    events = []
+    tracker = ProgressTracker(events.append, min_interval=0, clock=clock)
+    tracker.start('render', 10)
+    clock.now = 2.0
+    tracker.update(1, total=5)
+
+    assert events[-1]['total'] == 5
+    assert events[-1]['eta_seconds'] == 8.0
+    assert format_progress(events[-1]) == 'render 1/5（20%） 剩余约8秒'
+    assert format_eta(125) == '约2分5秒'
+    assert format_eta(None) == ''
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from journal_parser import DETAIL_COLUMNS
+from receipt_store import ReceiptStore, normalize_date_bound
+
+# 测试脚本，用于检查收货明细库的写入、按收货单号去重和按条件读取
+
+
+@pytest.fixture
+def store_details(make_details):
+    """税额和部门为空，检查空值的写入和读取"""
+    return lambda rows: make_details(rows, columns={'税额': np.nan, '部门': np.nan})
+
+
+def test_upsert_and_load_round_trip(tmp_path, store_details):
+    details = store_details([
+        ('RTS0002', '2025-07-02', '甲公司', 3.0, '鸡蛋'),
+        ('RTS0001', '2025-07-01', '甲公司', 10.5, 'Apple 苹果'),
+        ('RTS0001', '2025-07-01', '甲公司', -2.0, '香蕉'),
+        ('0003', '2025-08-01', '乙公司', 8.0, '牛奶'),
+    ])
+    with ReceiptStore(str(tmp_path / 'receipts.sqlite3')) as store:
+        assert store.upsert(details) == {'receipts': 3, 'lines': 4, 'replaced': 0}
+        loaded = store.load()
+        assert store.suppliers() == ['乙公司', '甲公司']
+
+    assert list(loaded.columns) == DETAIL_COLUMNS
+    assert loaded['商品名称'].tolist() == ['牛奶', 'Apple 苹果', '香蕉', '鸡蛋']
+    assert loaded['小计金额'].tolist() == [8.0, 10.5, -2.0, 3.0]
+    assert loaded['税额'].isna().all() and loaded['部门'].isna().all()
+    assert isinstance(loaded['供应商名称'].dtype, pd.CategoricalDtype)
+
+
+def test_reimport_replaces_receipts(tmp_path, store_details):
+    path = str(tmp_path / 'receipts.sqlite3')
+    with ReceiptStore(path) as store:
+        store.upsert(store_details([('RTS0001', '2025-07-01', '甲公司', 1.0, '苹果'),
+                                    ('RTS0001', '2025-07-01', '甲公司', 2.0, '香蕉'),
+                                    ('RTS0002', '2025-07-02', '甲公司', 3.0, '鸡蛋')]))
+    # 重叠的流水：RTS0001修改为一行，新增RTS0003
+    with ReceiptStore(path) as store:
+        result = store.upsert(store_details([('RTS0001', '2025-07-01', '甲公司', 5.0, '苹果'),
+                                             ('RTS0003', '2025-07-03', '甲公司', 4.0, '牛奶')]))
+        loaded = store.load()
+        assert store.count() == 3
+
+    assert result == {'receipts': 2, 'lines': 2, 'replaced': 1}
+    assert loaded['收货单号'].tolist() == ['RTS0001', 'RTS0002', 'RTS0003']
+    assert loaded['小计金额'].tolist() == [5.0, 3.0, 4.0]
+
+
+def test_upsert_keeps_last_source_within_batch(tmp_path, store_details):
+    details = store_details([('RTS0001', '2025-07-01', '甲公司', 1.0, '苹果'),
+                             ('RTS0001', '2025-07-01', '甲公司', 2.0, '香蕉'),
+                             ('RTS0001', '2025-07-01', '甲公司', 1.5, '苹果'),
+                             ('RTS0002', '2025-07-02', '甲公司', 3.0, '鸡蛋')])
+    sources = ['a.xls', 'a.xls', 'b.xls', 'b.xls']
+    with ReceiptStore(str(tmp_path / 'receipts.sqlite3')) as store:
+        assert store.upsert(details, sources)['lines'] == 2
+        assert store.load()['小计金额'].tolist() == [1.5, 3.0]
+
+
+def test_load_filters_suppliers_and_dates(tmp_path, store_details):
+    details = store_details([('RTS0001', '2025-06-30', '甲公司', 1.0, '苹果'),
+                             ('RTS0002', '2025-07-01', '甲公司', 2.0, '香蕉'),
+                             ('RTS0003', '2025-07-31', '乙公司', 3.0, '鸡蛋'),
+                             ('RTS0004', '2025-08-01', '甲公司', 4.0, '牛奶')])
+    with ReceiptStore(str(tmp_path / 'receipts.sqlite3')) as store:
+        store.upsert(details)
+        july = store.load(date_from='2025-07-01', date_to='2025/7/31')
+        supplier = store.load(suppliers=['甲公司'], date_to='2025-07-31')
+        empty = store.load(suppliers=['丙公司'])
+
+    assert july['收货单号'].tolist() == ['RTS0003', 'RTS0002']
+    assert supplier['收货单号'].tolist() == ['RTS0001', 'RTS0002']
+    assert empty.empty and list(empty.columns) == DETAIL_COLUMNS
+
+
+def test_normalize_date_bound():
+    assert normalize_date_bound(None) is None
+    assert normalize_date_bound('2025/7/1') == '2025-07-01'
+    with pytest.raises(ValueError):
+        normalize_date_bound('七月')
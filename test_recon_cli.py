@@ -0,0 +1,48 @@
+import os
+
+from recon_cli import EXIT_OK, EXIT_USAGE, main
+
+# 测试脚本，用于检查命令行版的处理流程和退出码
+
+
+def test_cli_generates_statements(tmp_path, capsys, monkeypatch, write_journal):
+    monkeypatch.chdir(tmp_path)
+    journal = str(tmp_path / 'journal.xlsx')
+    write_journal(journal)
+    output_root = tmp_path / 'out'
+
+    exit_code = main([journal, '--output-root', str(output_root), '--backup-root', str(tmp_path / 'bak'),
+                      '--log-dir', str(tmp_path / 'logs'), '--parse-workers', '1', '--render-workers', '1',
+                      '--no-parse-cache'])
+
+    assert exit_code == EXIT_OK
+    assert os.listdir(output_root / '202507') == ['海南鲜果贸易有限公司_对账明细.xlsx']
+    assert len(os.listdir(tmp_path / 'bak')) == 1
+    assert '生成对账单' in capsys.readouterr().out
+
+
+def test_cli_missing_input(tmp_path):
+    assert main([str(tmp_path / 'missing.xlsx')]) == EXIT_USAGE
+
+
+def test_cli_regenerates_from_store(tmp_path, capsys, monkeypatch, write_journal):
+    monkeypatch.chdir(tmp_path)
+    journal = str(tmp_path / 'journal.xlsx')
+    write_journal(journal)
+    common = ['--output-root', str(tmp_path / 'out'), '--log-dir', str(tmp_path / 'logs'), '--render-workers', '1']
+    assert main([journal, '--backup-root', str(tmp_path / 'bak'), '--parse-workers', '1', '--no-parse-cache']
+                + common) == EXIT_OK
+    statement = tmp_path / 'out' / '202507' / '海南鲜果贸易有限公司_对账明细.xlsx'
+    statement.unlink()
+
+    exit_code = main(['--regenerate', '--supplier', '海南鲜果贸易有限公司', '--from', '2025-07-01',
+                      '--to', '2025-07-31'] + common)
+
+    assert exit_code == EXIT_OK
+    assert statement.exists()
+    assert '读取明细库' in capsys.readouterr().out
+
+
+def test_cli_regenerate_usage_errors(tmp_path):
+    assert main([]) == EXIT_USAGE
+    assert main(['--regenerate', '--from', '七月', '--log-dir', str(tmp_path / 'logs')]) == EXIT_USAGE
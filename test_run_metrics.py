@@ -0,0 +1,45 @@
+import json
+
+from run_metrics import RunMetrics, current_memory_bytes, report_path_for
+
+# 测试脚本，用于检查各阶段、文件和供应商的性能指标及JSON运行报告
+
+
+def test_stage_records_rows_per_sec_and_memory():
+    metrics = RunMetrics(run_id='test')
+    with metrics.stage('parse') as stage:
+        stage['rows'] = 1000
+
+    parse = metrics.stages['parse']
+    assert parse['rows'] == 1000
+    assert parse['seconds'] >= 0
+    if current_memory_bytes() is not None:
+        assert parse['memory_mb'] > 0
+        assert parse['memory_delta_mb'] is not None
+    assert metrics.timings() == {'parse': parse['seconds']}
+    assert metrics.summary_lines({'parse': '解析'})[0].startswith('解析：')
+
+
+def test_stage_without_rows_has_no_rate():
+    metrics = RunMetrics()
+    with metrics.stage('backup'):
+        pass
+    assert metrics.stages['backup']['rows_per_sec'] is None
+    assert '行/秒' not in metrics.summary_lines()[0]
+
+
+def test_write_report_next_to_log(tmp_path):
+    metrics = RunMetrics(run_id='abc')
+    metrics.record_file('a.xlsx', rows=200, seconds=0.5)
+    metrics.record_supplier('供应商甲', rows=10, seconds=0.1)
+    metrics.record_supplier('供应商乙', rows=0, seconds=0.0, status='skipped')
+
+    report_file = metrics.write_report(report_path_for(str(tmp_path / 'logs' / 'process_1.log')))
+    assert report_file.endswith('process_1.json')
+
+    with open(report_file, encoding='utf-8') as f:
+        report = json.load(f)
+    assert report['run_id'] == 'abc'
+    assert report['files'][0]['rows_per_sec'] == 400.0
+    assert [item['supplier'] for item in report['suppliers']] == ['供应商甲', '供应商乙']
+    assert report['suppliers'][1]['rows_per_sec'] is None
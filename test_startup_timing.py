@@ -0,0 +1,61 @@
+import logging
+import os
+import subprocess
+import sys
+
+import pytest
+
+from startup_timing import StartupTimer, process_age_seconds
+
+# 测试脚本，用于检查启动耗时记录、后台预热导入和界面模块的延迟导入
+
+
+def make_clock(times):
+    values = iter(times)
+    return lambda: next(values)
+
+
+def test_marks_and_report_lines():
+    timer = StartupTimer(clock=make_clock([10.0, 10.5, 11.25]))
+    timer.preload_seconds = 1.5
+    timer.mark('window_shown')
+    timer.mark('custom')
+
+    assert timer.report_lines() == ['进程启动至入口模块：1.50秒', '窗口显示：0.50秒', 'custom：1.25秒']
+
+
+def test_warmup_imports_in_background(caplog):
+    timer = StartupTimer()
+    with caplog.at_level(logging.INFO):
+        timer.start_warmup(['json', 'csv'], version='9.9.9')
+        assert timer.wait_ready(10)
+        timer._thread.join(10)
+
+    assert timer.error is None
+    assert list(timer.imports) == ['json', 'csv']
+    assert 'data_ready' in timer.marks
+    assert any(record.getMessage().startswith('启动耗时（v9.9.9）：导入csv') for record in caplog.records)
+
+
+def test_warmup_failure_is_reported():
+    timer = StartupTimer().start_warmup(['module_that_does_not_exist'])
+    assert timer.wait_ready(10)
+    assert isinstance(timer.error, ImportError)
+    assert 'data_ready' not in timer.marks
+
+
+def test_process_age_seconds():
+    age = process_age_seconds()
+    if sys.platform == 'win32' or os.path.exists('/proc/self/stat'):
+        assert age is not None and age >= 0
+    else:
+        assert age is None
+
+
+def test_ui_module_defers_data_stack_imports():
+    pytest.importorskip('PyQt5.QtWidgets')
+    env = dict(os.environ, QT_QPA_PLATFORM='offscreen')
+    code = 'import sys, MC_Recon_UI; print(sorted({"pandas", "numpy", "openpyxl"} & set(sys.modules)))'
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, env=env,
+                            cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout
+    assert output.strip().splitlines()[-1] == '[]'
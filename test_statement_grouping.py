@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+
+from statement_grouping import group_suppliers, supplier_group
+
+# 测试脚本，用于检查按供应商分组的排序和汇总
+
+
+def test_group_suppliers_matches_per_supplier_sort(make_details):
+    df = make_details([
+        ('RTS0003', '2025-07-03', '乙公司', 30.0),
+        ('RTS0001', '2025-07-01', '甲公司', 10.0),
+        ('RTS0002', '2025-07-01', '乙公司', -5.0),
+        ('RTS0004', np.nan, '甲公司', 7.0),
+        ('RTS0001', '2025-07-01', '甲公司', 2.5),
+        ('RTS0005', '2025-07-02', np.nan, 1.0),
+        ('RTS0006', '2025-07-02', '  ', 1.0),
+        ('RTS0000', '2025-07-05', '甲公司', 4.0),
+    ])
+
+    groups = group_suppliers(df)
+
+    expected = [(name, data.sort_values(['收货日期', '收货单号']))
+                for name, data in df.groupby('供应商名称', observed=True) if name.strip()]
+    assert [group.supplier for group in groups] == [name for name, _ in expected]
+    for group, (_, data) in zip(groups, expected):
+        pd.testing.assert_frame_equal(group.data, data)
+
+    first = groups[0]
+    assert first.supplier == '乙公司'
+    assert first.rows == 2
+    assert (first.first_date, first.last_date) == ('2025-07-01', '2025-07-03')
+    assert first.year_month == '202507'
+
+    second = groups[1]
+    assert second.data['小计金额'].tolist() == [10.0, 2.5, 4.0, 7.0]
+    assert (second.first_date, second.last_date) == ('2025-07-01', '2025-07-05')
+    assert second.totals['小计金额'] == 23.5
+    record = second.summary_record()
+    assert record['收货单号'] == '合计'
+    assert record['供应商名称'] == ''
+    assert np.isclose(record['小计价税'], 23.5 * 1.1)
+
+
+def test_supplier_group_from_unsorted_data(make_details):
+    df = make_details([('RTS0002', '2025-08-02', '甲公司', 1.0), ('RTS0001', '2025-08-01', '甲公司', 2.0)])
+    group = supplier_group('甲公司', df)
+    assert group.data['收货单号'].tolist() == ['RTS0001', 'RTS0002']
+    assert group.year_month == '202508'
+    assert group.totals['小计金额'] == 3.0
+
+
+def test_group_suppliers_without_named_suppliers(make_details):
+    assert group_suppliers(make_details([('RTS0001', '2025-07-01', np.nan, 1.0)])) == []
+
+
+def test_group_suppliers_partitions_by_month(make_details):
+    df = make_details([
+        ('RTS0003', '2025-08-01', '甲公司', 3.0),
+        ('RTS0001', '2025-07-01', '甲公司', 1.0),
+        ('RTS0004', np.nan, '甲公司', 4.0),
+        ('RTS0002', '2025-07-31', '甲公司', 2.0),
+        ('RTS0005', '2025-09-15', '乙公司', 5.0),
+    ])
+
+    groups = group_suppliers(df)
+
+    assert [group.key for group in groups] == ['202509/乙公司', '202507/甲公司', '202508/甲公司']
+    july = groups[1]
+    # 收货日期为空的明细归入该供应商最早的月份
+    assert july.data['收货单号'].tolist() == ['RTS0001', 'RTS0002', 'RTS0004']
+    assert (july.first_date, july.last_date) == ('2025-07-01', '2025-07-31')
+    assert july.totals['小计金额'] == 7.0
+    assert groups[2].totals['小计金额'] == 3.0
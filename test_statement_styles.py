@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+
+from journal_parser import DETAIL_COLUMNS
+from statement_writer import (AMOUNT_COLUMNS, CELL_FORMATS, STYLE_BASES, cell_style_codes, column_format_kind,
+                              column_style_table, register_statement_styles)
+
+# 测试脚本，用于检查预先计算的单元格样式与逐个单元格判断的结果一致
+
+
+def expected_style(row_idx, row, header):
+    """按逐个单元格的规则判断样式名称"""
+    negative = {column: pd.notna(row[column]) and float(row[column]) < 0 for column in AMOUNT_COLUMNS}
+    if negative.get(header):
+        base = 'negative_amount'
+    elif any(negative.values()):
+        base = 'negative_row'
+    else:
+        base = 'zebra' if row_idx % 2 == 0 else 'body'
+    return f'recon.{base}.{column_format_kind(header, row[header])}'
+
+
+def test_cell_style_codes_match_per_cell_rules():
+    rows = [
+        ['RTS0001', '2025-07-01', 'Apple', 2.0, 'KG', 5.0, 10.0, 0.9, 0.09, 10.9, 'Kitchen', '甲公司'],
+        ['RTS0001', '2025-07-01', 'Milk', -1.0, 'L', 8.0, -8.0, 0.0, 0.0, -8.0, 'Bar', '甲公司'],
+        ['RTS0002', '2025-07-02', '', np.nan, '', np.nan, np.nan, np.nan, np.nan, np.nan, ' ', '甲公司'],
+        ['RTS0002', '2025-07-02', 'Egg', 1.0, 'BOX', 3.0, 3.0, -0.1, np.nan, 2.9, 'Pastry', '甲公司'],
+    ]
+    df = pd.DataFrame(rows, columns=DETAIL_COLUMNS)
+    # 以样式名称代替样式数组，便于比较
+    styles = {f'recon.{base}.{kind}': f'recon.{base}.{kind}' for base in STYLE_BASES for kind in CELL_FORMATS}
+    tables = [column_style_table(header, styles) for header in DETAIL_COLUMNS]
+
+    codes = cell_style_codes(df, first_row=4)
+
+    assert codes.shape == df.shape
+    for offset, (_, row) in enumerate(df.iterrows()):
+        for position, header in enumerate(DETAIL_COLUMNS):
+            assert tables[position][codes[offset, position]] == expected_style(4 + offset, row, header)
+
+
+def test_each_workbook_gets_its_own_named_styles():
+    first, second = Workbook(), Workbook()
+    first_arrays = register_statement_styles(first)
+    second_arrays = register_statement_styles(second)
+    assert first_arrays == second_arrays
+    first_styles = {style.name: style for style in first._named_styles}
+    second_styles = {style.name: style for style in second._named_styles}
+    name = 'recon.header.center'
+    assert first_styles[name] is not second_styles[name]
+    # 加入第二个工作簿后，第一个工作簿中的样式仍绑定在第一个工作簿上
+    assert first_styles[name]._wb is first
@@ -0,0 +1,52 @@
+import pandas as pd
+from openpyxl import load_workbook
+
+from journal_parser import DETAIL_COLUMNS
+from statement_template import StatementTemplate
+from statement_writer import render_supplier_statement
+
+# 测试脚本，用于检查对账单版式的套用和从模板工作簿读取
+
+
+def make_supplier_data():
+    rows = [
+        ['RTS0002', '2025-07-02', 'Milk', -1.0, 'L', 8.0, -8.0, -0.72, 0.09, -8.72, 'Bar', '绿色蔬菜公司'],
+        ['RTS0001', '2025-07-01', 'Apple\n苹果', 2.0, 'KG', 5.0, 10.0, 0.9, 0.09, 10.9, 'Kitchen\n厨房', '绿色蔬菜公司'],
+    ]
+    return pd.DataFrame(rows, columns=DETAIL_COLUMNS)
+
+
+def test_render_with_default_template(tmp_path):
+    output_file = render_supplier_statement('绿色蔬菜公司', make_supplier_data(), str(tmp_path))
+    ws = load_workbook(output_file).active
+
+    assert ws['A1'].value == '对账明细表'
+    assert ws.print_title_rows == '$1:$3'
+    assert ws.column_dimensions['C'].width == 45
+    assert [ws.cell(row=row, column=1).value for row in range(4, 7)] == ['RTS0001', 'RTS0002', '合计']
+    assert ws['G6'].value == 2.0
+    # 负数金额行整行黄色背景，负数金额红字
+    assert ws['A5'].fill.fgColor.rgb == '00FFFF00'
+    assert ws['G5'].font.color.rgb == '00FF0000'
+
+
+def test_template_from_workbook(tmp_path):
+    output_file = render_supplier_statement('绿色蔬菜公司', make_supplier_data(), str(tmp_path))
+    wb = load_workbook(output_file)
+    ws = wb.active
+    ws['A1'] = '月度对账明细表'
+    ws.column_dimensions['C'].width = 50
+    ws.page_margins.left = 0.5
+    template_file = tmp_path / 'template.xlsx'
+    wb.save(template_file)
+
+    template = StatementTemplate.from_workbook(str(template_file))
+    assert template.title == '月度对账明细表'
+    assert template.column_widths['商品名称'] == 50
+    assert template.column_widths['部门'] == 35
+    assert template.margins['left'] == 0.5
+
+    output_file = render_supplier_statement('绿色蔬菜公司', make_supplier_data(), str(tmp_path / 'out'), template)
+    ws = load_workbook(output_file).active
+    assert ws['A1'].value == '月度对账明细表'
+    assert ws.column_dimensions['C'].width == 50
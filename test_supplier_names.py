@@ -0,0 +1,37 @@
+import json
+
+from supplier_names import SupplierNormalizer, clean_supplier_name
+
+# 测试脚本，用于检查供应商名称规范化、缓存和别名
+
+
+def test_clean_supplier_name():
+    assert clean_supplier_name('海南鲜果贸易有限公司（专票13%）') == '海南鲜果贸易有限公司'
+    assert clean_supplier_name('三亚海鲜批发 普票') == '三亚海鲜批发'
+    assert clean_supplier_name('ABC Foods 9%') == 'ABC Foods'
+
+
+def test_normalizer_cache_and_aliases(tmp_path):
+    cache_file = tmp_path / 'cache' / 'supplier_names.json'
+    alias_file = tmp_path / 'supplier_aliases.json'
+    alias_file.write_text(json.dumps({'三亚海鲜批发部': '三亚海鲜批发'}, ensure_ascii=False), encoding='utf-8')
+
+    normalizer = SupplierNormalizer(str(cache_file), str(alias_file)).load()
+    assert normalizer.normalize('三亚海鲜批发 普票') == '三亚海鲜批发'
+    assert normalizer.normalize('三亚海鲜批发部（专票）') == '三亚海鲜批发'
+    assert normalizer.normalize('绿色蔬菜公司') == '绿色蔬菜公司'
+    assert normalizer.collapsed_variants() == {'三亚海鲜批发': ['三亚海鲜批发 普票', '三亚海鲜批发部（专票）']}
+    normalizer.save()
+
+    cached = json.loads(cache_file.read_text(encoding='utf-8'))
+    assert cached['mapping']['三亚海鲜批发 普票'] == '三亚海鲜批发'
+
+    reloaded = SupplierNormalizer(str(cache_file), str(alias_file)).load()
+    assert reloaded.mapping == normalizer.mapping
+
+    # 再次运行时已在缓存中的合并不算新出现，出现新写法时整组算新出现
+    reloaded.normalize('三亚海鲜批发 普票')
+    reloaded.normalize('三亚海鲜批发部（专票）')
+    assert reloaded.collapsed_variants(new_only=True) == {}
+    reloaded.normalize('三亚海鲜批发部 专票')
+    assert list(reloaded.collapsed_variants(new_only=True)) == ['三亚海鲜批发']
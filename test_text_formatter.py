@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+
+from text_formatter import MixedTextFormatter, format_mixed_text
+
+# 测试脚本，用于检查中英文混合文本格式化及缓存统计
+
+
+def test_format_mixed_text():
+    assert format_mixed_text('Apple 苹果') == 'Apple\n苹果'
+    assert format_mixed_text('苹果') == '苹果'
+    assert format_mixed_text('Milk') == 'Milk'
+    assert pd.isna(format_mixed_text(np.nan))
+
+
+def test_format_series_uses_cache():
+    formatter = MixedTextFormatter(maxsize=10)
+    series = pd.Series(['Apple 苹果', 'Milk', np.nan, 'Apple 苹果'] * 50)
+
+    result = formatter.format_series(series)
+
+    assert result.iloc[0] == 'Apple\n苹果'
+    assert result.iloc[1] == 'Milk'
+    assert pd.isna(result.iloc[2])
+    assert formatter.misses == 2
+
+    formatter.format_series(series)
+    info = formatter.cache_info()
+    assert info['misses'] == 2
+    assert info['hits'] == 2
+    assert info['rows'] == 400
+
+
+def test_cache_is_bounded():
+    formatter = MixedTextFormatter(maxsize=3)
+    formatter.format_series(pd.Series([f'Item{i} 商品' for i in range(10)]))
+    assert formatter.cache_info()['size'] == 3
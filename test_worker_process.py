@@ -0,0 +1,138 @@
+import logging
+import os
+import time
+
+import pytest
+
+from worker_process import WorkerProcess, WorkerUnavailableError
+
+# 测试脚本，用于检查常驻后台处理进程的任务执行、进度和日志转发以及意外退出后的自动重启
+
+
+@pytest.fixture
+def make_job(tmp_path, write_journal):
+    """返回构造处理任务的函数，所有任务使用同一个示例收货流水"""
+    journal = str(tmp_path / 'journal.xlsx')
+    write_journal(journal)
+    return lambda run_id: {
+        'input_files': [journal],
+        'options': {'parse_workers': 1, 'render_workers': 1, 'use_parse_cache': False,
+                    'output_root': str(tmp_path / 'out'), 'backup_root': str(tmp_path / 'bak'),
+                    'store_file': str(tmp_path / 'receipts.sqlite3')},
+        'run_id': run_id,
+        'log_file': str(tmp_path / 'logs' / f'{run_id}.log'),
+    }
+
+
+@pytest.fixture
+def worker(tmp_path, monkeypatch):
+    # 后台进程继承当前目录，供应商名称缓存等相对路径写在临时目录中
+    monkeypatch.chdir(tmp_path)
+    worker = WorkerProcess().start()
+    assert worker.ready.wait(60)
+    yield worker
+    worker.stop()
+
+
+def test_worker_runs_jobs_and_streams_progress(tmp_path, worker, make_job, caplog):
+    events = []
+    with caplog.at_level(logging.INFO):
+        result = worker.run_job(make_job('run1'), progress=events.append)
+
+    assert result['records'] == 2
+    assert os.path.exists(result['report_file'])
+    assert os.listdir(tmp_path / 'out' / '202507') == ['海南鲜果贸易有限公司_对账明细.xlsx']
+    # 里程碑消息和阶段摘要通过日志转发回来
+    messages = [record.getMessage() for record in caplog.records]
+    assert any('生成' in message for message in messages)
+    assert any(message.startswith('运行报告：') for message in messages)
+    assert {event['stage'] for event in events} >= {'parse', 'render'}
+    # 后台进程中的日志带着运行编号转发回来
+    assert any(getattr(record, 'run_id', None) == 'run1' and record.process != os.getpid()
+               for record in caplog.records)
+
+    # 同一个进程继续处理后续任务
+    pid = worker.pid
+    assert worker.run_job(make_job('run2'))['records'] == 2
+    assert worker.pid == pid
+
+
+def test_worker_restarts_after_crash(worker, make_job):
+    first_pid = worker.pid
+
+    def crash(event):
+        worker.process.kill()
+
+    with pytest.raises(RuntimeError, match='意外退出'):
+        worker.run_job(make_job('crash'), progress=crash)
+
+    assert worker.available
+    assert worker.run_job(make_job('after'))['records'] == 2
+    assert worker.pid != first_pid
+    assert worker.restarts == 1
+
+
+def test_failed_job_is_reported(tmp_path, worker, make_job):
+    job = make_job('missing')
+    job['input_files'] = [str(tmp_path / 'missing.xlsx')]
+    with pytest.raises(RuntimeError):
+        worker.run_job(job)
+    assert worker.run_job(make_job('next'))['records'] == 2
+
+
+def test_worker_unavailable_when_restart_fails(worker, make_job):
+    def spawn():
+        raise OSError('无法创建进程')
+
+    worker._spawn = spawn
+    worker.process.kill()
+    worker._reader.join(30)
+
+    assert not worker.available
+    assert worker.restarts == 0
+    with pytest.raises(WorkerUnavailableError):
+        worker.run_job(make_job('unavailable'))
+
+
+def child_pids(pid):
+    pids = []
+    for task in os.listdir(f'/proc/{pid}/task'):
+        with open(f'/proc/{pid}/task/{task}/children') as f:
+            pids.extend(int(child) for child in f.read().split())
+    return pids
+
+
+def is_running(pid):
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            return f.read().rsplit(')', 1)[1].split()[0] != 'Z'
+    except FileNotFoundError:
+        return False
+
+
+@pytest.mark.skipif(not os.path.exists('/proc/self/task'), reason='需要/proc查看子进程')
+def test_stop_during_job_ends_pool_processes(tmp_path, worker, make_job, write_journal):
+    job = make_job('stop')
+    second = str(tmp_path / 'journal2.xlsx')
+    write_journal(second)
+    job['input_files'].append(second)
+    job['options']['parse_workers'] = 2
+    pool_pids = []
+
+    def stop_when_pool_started(event):
+        if pool_pids:
+            return
+        deadline = time.time() + 30
+        while not pool_pids and time.time() < deadline:
+            pool_pids.extend(child_pids(worker.pid))
+            time.sleep(0.05)
+        worker.stop()
+
+    with pytest.raises(RuntimeError, match='已停止'):
+        worker.run_job(job, progress=stop_when_pool_started)
+
+    assert pool_pids
+    deadline = time.time() + 10
+    while any(is_running(pid) for pid in pool_pids) and time.time() < deadline:
+        time.sleep(0.05)
+    assert not any(is_running(pid) for pid in pool_pids)
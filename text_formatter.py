@@ -0,0 +1,89 @@
+import re
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+CHINESE_PATTERN = re.compile('[\u4e00-\u9fff]')
+
+
+def format_mixed_text(text):
+    """将中英文混合文本拆分为英文、中文两行"""
+    if pd.isna(text):
+        return text
+    text = str(text)
+    match = CHINESE_PATTERN.search(text)
+    if match:
+        english_part = text[:match.start()].strip()
+        chinese_part = text[match.start():].strip()
+        if english_part and chinese_part:
+            return f'{english_part}\n{chinese_part}'
+    return text
+
+
+class MixedTextFormatter:
+    """
+    带缓存的中英文混合文本格式化器
+
+    商品名称和部门在一个月的流水中会重复出现成千上万次，因此整列格式化时
+    先按不同的值去重，每个值只格式化一次再映射回原列。格式化结果保存在
+    有上限的LRU缓存中，同一会话内处理多个文件或多次运行时可以继续复用。
+    """
+
+    def __init__(self, maxsize=50000):
+        self.maxsize = maxsize
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.rows = 0
+
+    def format(self, text):
+        """格式化单个值"""
+        if pd.isna(text):
+            return text
+        try:
+            result = self._cache[text]
+        except KeyError:
+            self.misses += 1
+            result = format_mixed_text(text)
+            self._cache[text] = result
+            if len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+        else:
+            self.hits += 1
+            self._cache.move_to_end(text)
+        return result
+
+    def format_series(self, series):
+        """格式化整列，每个不同的值只查一次缓存"""
+        self.rows += len(series)
+        codes, uniques = pd.factorize(series)
+        formatted = np.empty(len(uniques) + 1, dtype=object)
+        for i, value in enumerate(uniques):
+            formatted[i] = self.format(value)
+        values = formatted[codes]
+        # 空值保持原样
+        missing = codes < 0
+        values[missing] = series.to_numpy(dtype=object)[missing]
+        return pd.Series(values, index=series.index, name=series.name)
+
+    def cache_info(self):
+        """返回缓存命中统计"""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'rows': self.rows,
+            'size': len(self._cache),
+            'maxsize': self.maxsize,
+        }
+
+    def clear(self):
+        """清空缓存和统计"""
+        self._cache.clear()
+        self.hits = 0
+        self.misses = 0
+        self.rows = 0
+
+
+# 进程内共享的格式化器，跨文件、跨运行复用缓存
+mixed_text_formatter = MixedTextFormatter()
@@ -0,0 +1,329 @@
+import atexit
+import itertools
+import logging
+import logging.handlers
+import multiprocessing
+import os
+import queue
+import threading
+from multiprocessing.connection import wait as wait_connections
+
+from log_setup import RunContextFilter, handle_forwarded, log_context
+from startup_timing import WARMUP_MODULES, StartupTimer
+
+# 连续多少次未就绪就退出后不再重启，改为在界面进程中处理
+MAX_START_FAILURES = 3
+# 停止时等待后台进程退出的秒数，超时后强制结束
+STOP_TIMEOUT = 5.0
+
+
+def process_job(job, progress=None):
+    """
+    执行一次处理任务，后台进程和界面进程中的后备处理共用
+
+    里程碑消息和各阶段指标只写入日志，界面通过日志面板显示。
+
+    Args:
+        job: dict，input_files（收货流水文件列表）、options（传给run_pipeline的其他参数）、
+             run_id（运行编号）、log_file（运行日志路径，运行报告与它放在一起）
+        progress: 结构化进度事件回调
+
+    Returns:
+        dict: records（明细条数）、stage_summary（各阶段摘要行）、report_file（运行报告路径）
+    """
+    # 数据处理模块在这里才导入，界面进程启动时不需要它们
+    from recon_pipeline import STAGE_NAMES, run_pipeline
+    from run_metrics import RunMetrics, report_path_for
+
+    result = run_pipeline(job['input_files'], progress=progress, metrics=RunMetrics(run_id=job['run_id']),
+                          **job['options'])
+
+    # 运行报告与日志放在一起，各阶段摘要在完成时的对话框中显示
+    metrics = result['metrics']
+    report_file = metrics.write_report(report_path_for(job['log_file']))
+    stage_summary = metrics.summary_lines(STAGE_NAMES)
+    logging.info(f'运行报告：{report_file}')
+    return {'records': result['records'], 'stage_summary': stage_summary, 'report_file': report_file}
+
+
+class _Channel:
+    """后台进程向界面进程发送事件的管道，处理线程和备份线程共用时加锁"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.lock = threading.Lock()
+
+    def send(self, kind, job_id=None, payload=None):
+        with self.lock:
+            self.conn.send((kind, job_id, payload))
+
+
+class WorkerUnavailableError(RuntimeError):
+    """后台处理进程不可用，任务没有发给后台进程，调用方可以改为在本进程中处理"""
+
+
+def _watch_jobs(job_conn, jobs, busy):
+    """
+    后台进程中读取任务的线程，任务交给主线程执行
+
+    收到None或管道关闭时，如果还有任务未完成，先结束本进程的子进程（解析和生成对账单的进程池）
+    再立即退出，不留下孤立的子进程；否则通知主线程正常退出。
+    """
+    while True:
+        try:
+            job = job_conn.recv()
+        except (EOFError, OSError):
+            job = None
+        if job is not None:
+            busy.set()
+            jobs.put(job)
+            continue
+        if busy.is_set():
+            for child in multiprocessing.active_children():
+                child.terminate()
+            os._exit(0)
+        jobs.put(None)
+        return
+
+
+class _ForwardHandler(logging.handlers.QueueHandler):
+    """把日志记录（已格式化为文本，可以序列化）转发给界面进程，由界面进程写入日志文件和日志面板"""
+
+    def __init__(self, channel):
+        super().__init__(None)
+        self.channel = channel
+
+    def enqueue(self, record):
+        self.channel.send('log', payload=record)
+
+
+def _worker_main(job_conn, event_conn):
+    """后台进程的入口：预先导入数据处理模块，然后逐个执行任务，收到None或管道关闭时退出"""
+    channel = _Channel(event_conn)
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    handler = _ForwardHandler(channel)
+    handler.addFilter(RunContextFilter())
+    root.addHandler(handler)
+    root.setLevel(logging.INFO)
+
+    timer = StartupTimer()
+    try:
+        timer.import_modules(WARMUP_MODULES)
+    except Exception as e:
+        channel.send('start_failed', payload=str(e))
+        return
+    channel.send('ready', payload={'pid': os.getpid(), 'imports': timer.imports})
+
+    jobs = queue.Queue()
+    busy = threading.Event()
+    threading.Thread(target=_watch_jobs, args=(job_conn, jobs, busy), name='job-watcher', daemon=True).start()
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        job_id = job['job_id']
+        with log_context(run_id=job['run_id']):
+            try:
+                result = process_job(job, progress=lambda event: channel.send('progress', job_id, event))
+            except Exception as e:
+                logging.exception('后台处理进程中出现错误')
+                channel.send('failed', job_id, str(e))
+            else:
+                channel.send('done', job_id, result)
+            finally:
+                busy.clear()
+
+
+class WorkerProcess:
+    """
+    常驻的后台处理进程
+
+    进程启动时预先导入数据处理模块，之后反复接收处理任务，界面进程中不再进行CPU密集的处理。
+    任务、进度、日志记录和结果通过两条单向管道传递：界面进程中的读取线程把日志记录交给本进程的
+    日志系统（写入运行日志和日志面板），把进度和结果交给等待该任务的线程。
+
+    进程意外退出时正在执行的任务失败，进程自动重新启动；连续MAX_START_FAILURES次未就绪就退出或
+    无法启动时不再重启，available变为False，调用方应改为在本进程中处理。一次只执行一个任务。
+    """
+
+    def __init__(self, on_ready=None, max_start_failures=MAX_START_FAILURES):
+        # 进程就绪时在读取线程中调用on_ready(info)，info包含pid和imports（各模块的导入耗时）
+        self.on_ready = on_ready or (lambda info: None)
+        self.max_start_failures = max_start_failures
+        self.process = None
+        self.pid = None
+        self.restarts = 0
+        self.ready = threading.Event()
+        self._context = multiprocessing.get_context('spawn')
+        self._job_lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._job_ids = itertools.count(1)
+        self._job_events = queue.Queue()
+        self._active_job = None
+        self._start_failures = 0
+        self._stopping = False
+        self._job_conn = None
+        self._event_conn = None
+        self._reader = None
+
+    @property
+    def available(self):
+        """是否可以接收任务（正在启动或重新启动时也为True）"""
+        return (not self._stopping and self._start_failures < self.max_start_failures
+                and self._reader is not None and self._reader.is_alive())
+
+    def start(self):
+        self._spawn()
+        self._reader = threading.Thread(target=self._read_events, name='worker-reader', daemon=True)
+        self._reader.start()
+        # 程序退出时先停止后台进程，否则multiprocessing会一直等待它结束
+        atexit.register(self.stop)
+        return self
+
+    def _spawn(self):
+        job_recv, job_send = self._context.Pipe(duplex=False)
+        event_recv, event_send = self._context.Pipe(duplex=False)
+        self.process = self._context.Process(target=_worker_main, args=(job_recv, event_send), name='recon-worker')
+        try:
+            self.process.start()
+        except Exception:
+            for conn in (job_recv, job_send, event_recv, event_send):
+                conn.close()
+            raise
+        # 子进程使用的一端在本进程中关闭，子进程退出后读取端才能收到EOF
+        job_recv.close()
+        event_send.close()
+        self._job_conn, self._event_conn = job_send, event_recv
+
+    def _read_events(self):
+        while True:
+            conn, process = self._event_conn, self.process
+            ready = wait_connections([conn, process.sentinel])
+            if conn in ready:
+                try:
+                    kind, job_id, payload = conn.recv()
+                except (EOFError, OSError):
+                    pass
+                else:
+                    self._dispatch(kind, job_id, payload)
+                    continue
+            # 管道已关闭或进程已退出，正在执行的任务失败
+            process.join()
+            conn.close()
+            with self._state_lock:
+                was_ready = self.ready.is_set()
+                self.ready.clear()
+                if self._active_job is not None:
+                    self._job_events.put(('crashed', process.exitcode))
+            if self._stopping or not self._restart(process.exitcode, was_ready):
+                return
+
+    def _dispatch(self, kind, job_id, payload):
+        if kind == 'log':
+            # 记录已带有后台进程中的运行编号，按运行编号写入对应的运行日志
+            handle_forwarded(payload)
+        elif kind == 'ready':
+            self.pid = payload['pid']
+            self._start_failures = 0
+            self.ready.set()
+            logging.info(f'后台处理进程已就绪（PID {self.pid}）')
+            self.on_ready(payload)
+        elif kind == 'start_failed':
+            logging.error(f'后台处理进程启动失败：{payload}')
+        elif job_id is not None and job_id == self._active_job:
+            self._job_events.put((kind, payload))
+
+    def _restart(self, exitcode, was_ready):
+        """后台进程意外退出后重新启动，返回是否已重新启动"""
+        if not was_ready:
+            self._start_failures += 1
+        if self._start_failures < self.max_start_failures:
+            logging.warning(f'后台处理进程意外退出（退出码{exitcode}），正在重新启动')
+        while self._start_failures < self.max_start_failures:
+            try:
+                self._spawn()
+            except Exception as e:
+                # 无法创建进程也算一次启动失败
+                self._start_failures += 1
+                logging.error(f'后台处理进程重新启动失败：{e}')
+            else:
+                self.restarts += 1
+                return True
+        logging.error(f'后台处理进程连续{self._start_failures}次启动失败，改为在界面进程中处理')
+        return False
+
+    def run_job(self, job, progress=None):
+        """
+        在后台进程中执行处理任务并等待结果
+
+        progress在调用线程中回调。后台进程不可用、任务未发出时抛出WorkerUnavailableError；
+        任务出错或后台进程退出时抛出RuntimeError。
+
+        Args:
+            job: 与process_job相同，不含job_id
+
+        Returns:
+            dict: process_job的返回值
+        """
+        progress = progress or (lambda event: None)
+        with self._job_lock:
+            job_id = next(self._job_ids)
+            self._job_events = queue.Queue()
+            # 等待进程就绪（首次启动或重新启动中）
+            while True:
+                if not self.available:
+                    raise WorkerUnavailableError('后台处理进程不可用')
+                if self.ready.wait(0.1):
+                    with self._state_lock:
+                        if self.ready.is_set():
+                            self._active_job = job_id
+                            break
+            try:
+                try:
+                    self._job_conn.send(dict(job, job_id=job_id))
+                except OSError:
+                    # 进程恰好退出，读取线程随后会报告
+                    pass
+                while True:
+                    try:
+                        kind, payload = self._job_events.get(timeout=0.5)
+                    except queue.Empty:
+                        # 读取线程意外结束时不会再有事件
+                        if not self._reader.is_alive():
+                            raise RuntimeError('后台处理进程不可用，请重新处理')
+                        continue
+                    if kind == 'progress':
+                        progress(payload)
+                    elif kind == 'done':
+                        return payload
+                    elif kind == 'failed':
+                        raise RuntimeError(payload)
+                    elif kind == 'crashed':
+                        if self._stopping:
+                            raise RuntimeError('后台处理进程已停止')
+                        raise RuntimeError(f'后台处理进程意外退出（退出码{payload}），已自动重新启动，请重新处理')
+            finally:
+                self._active_job = None
+
+    def stop(self, timeout=STOP_TIMEOUT):
+        """
+        通知后台进程退出并等待，超时后强制结束
+
+        正在处理任务时后台进程先结束自己的解析和生成对账单子进程再退出，正在执行的任务失败。
+        """
+        if self._stopping or self.process is None:
+            self._stopping = True
+            return
+        self._stopping = True
+        try:
+            self._job_conn.send(None)
+        except OSError:
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        if self._reader is not None:
+            self._reader.join(timeout)